@@ -1,20 +1,54 @@
 from flask import Flask, request, jsonify, g
 import firebase_admin
 from firebase_admin import credentials, auth, firestore
-import requests
 import time
 from dotenv import load_dotenv 
 import os
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from functools import wraps
-import random
+from functools import partial, wraps
+from contextlib import closing
+from google.api_core.exceptions import AlreadyExists, NotFound
+
+# Local modules read their settings from the environment at import time
+load_dotenv()
+
+import upstream
+import spoonacular
+from veg_classifier import VEGETABLE_TYPES, canonical_ingredients, classify, normalize_name
+from ttl_cache import TTLCache
+from images import ImageResolver
+from catalog import CatalogRefresher
+from catalog_filters import CatalogFilter, check_filters, parse_list
+from diversity import DiversitySelector
+import offer_pricing
+import json_stream
+from compression import Compressor
+import fast_json
+from http_cache import conditional_json, content_etag
+from singleflight import SingleFlight
+from log_sink import create_sink
+from token_cache import TokenCache
+import cart as cart_store
+from catalog_index import CatalogIndex, catalog_id
+from product_store import OFF, USDA, ProductStore
+from product_search import SearchIndex
+from profiles import ProfileRepository
 
 app = Flask(__name__)
 CORS(app)
-
-load_dotenv()
+# orjson encoding when installed; JSON_PROVIDER=default keeps Flask's stdlib provider
+if fast_json.orjson and os.getenv("JSON_PROVIDER", "orjson") == "orjson":
+    app.json = fast_json.OrjsonProvider(app)
+# gzip/brotli for bodies of at least COMPRESS_MIN_SIZE bytes, when the client accepts it
+compressor = Compressor(
+    min_size=int(os.getenv("COMPRESS_MIN_SIZE", "1024")),
+    gzip_level=int(os.getenv("COMPRESS_GZIP_LEVEL", "6")),
+    # Each filtered catalog page is cached under its own ETag
+    cache_size=int(os.getenv("COMPRESS_CACHE_SIZE", "64"))
+)
+compressor.init_app(app)
 
 cred = credentials.Certificate("firebase_config.json")  
 firebase_admin.initialize_app(cred)
@@ -25,7 +59,6 @@ except Exception as e:
     print(f"Firestore initialization failed: {e}")
     db = None  
 
-
 # Get API keys
 SPOONACULAR_API_KEY = os.getenv("SPOONACULAR_API_KEY")
 USDA_API_KEY = os.getenv("USDA_API_KEY")
@@ -41,6 +74,49 @@ if not UNSPLASH_ACCESS_KEY:
     print("Warning: UNSPLASH_ACCESS_KEY not set")
 
 
+# api_logs records are queued in memory and written in background batches
+api_log = create_sink(
+    db,
+    "api_logs",
+    max_queue=int(os.getenv("API_LOG_MAX_QUEUE", "10000")),
+    batch_size=int(os.getenv("API_LOG_BATCH_SIZE", "100")),
+    flush_interval=float(os.getenv("API_LOG_FLUSH_INTERVAL", "2"))
+)
+recipe_info_cache = spoonacular.RecipeInfoCache.from_env(db=db)
+image_resolver = ImageResolver(db=db, access_key=UNSPLASH_ACCESS_KEY)
+# Grocery item details by catalog id, for hydrating the compact cart entries
+catalog_index = CatalogIndex(db=db, maxsize=int(os.getenv("CATALOG_INDEX_SIZE", "10000")))
+# Per-user profile cache; every profile write below must call profiles.invalidate
+profiles = ProfileRepository.from_env(db)
+CATALOG_REFRESH_INTERVAL = int(os.getenv("CATALOG_REFRESH_INTERVAL", "900"))
+# Local product index filled by `manage.py ingest-catalog`; without it the builders query the APIs
+product_store = ProductStore(os.getenv("PRODUCT_DB_PATH", "products.db"))
+GROCERY_COUNT = 20
+# Seeds the catalog builders' selection; unset picks a fresh selection on every build
+CATALOG_SEED = int(os.environ["CATALOG_SEED"]) if os.getenv("CATALOG_SEED") else None
+# /products/search result counts: default and maximum ?limit=
+SEARCH_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+# /daily-offers keeps one offer per vegetable type, topped up with mock offers
+OFFER_COUNT = 10
+ALL_VEG_TYPES = frozenset(VEGETABLE_TYPES.values()) | {"other"}
+OFFERS_CHUNK_SIZE = 16 * 1024
+# The day's offers and their prices follow from these; each region gets its own set
+OFFERS_SEED = os.getenv("OFFERS_SEED", "smartcart-offers")
+OFFERS_REGION = os.getenv("OFFERS_REGION", "default")
+# Browsers and CDNs reuse a catalog response this long, then revalidate it in the background
+CATALOG_MAX_AGE = int(os.getenv("CATALOG_MAX_AGE", "60"))
+CATALOG_CACHE_CONTROL = f"public, max-age={CATALOG_MAX_AGE}, stale-while-revalidate={CATALOG_REFRESH_INTERVAL}"
+# Per-user reads may be stored but are revalidated with their ETag on every use
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+# Final /meal-recommendations responses keyed by canonical ingredients + diet params
+meal_cache = TTLCache(
+    maxsize=int(os.getenv("MEAL_CACHE_SIZE", "500")),
+    ttl=int(os.getenv("MEAL_CACHE_TTL", "3600"))
+)
+meal_flight = SingleFlight()
+
+
 limiter = Limiter(
     app=app,
     key_func=get_remote_address,
@@ -48,6 +124,13 @@ limiter = Limiter(
     storage_uri="memory://"
 )
 
+# Decoded ID tokens are reused until their exp claim instead of re-verified per request
+token_cache = TokenCache(
+    lambda token, check_revoked=False: auth.verify_id_token(token, check_revoked=check_revoked),
+    maxsize=int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000")),
+    revocation_check_interval=float(os.getenv("AUTH_REVOCATION_CHECK_INTERVAL", "0"))
+)
+
 def firebase_auth(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -56,7 +139,7 @@ def firebase_auth(f):
             return jsonify({"error": "Missing or invalid token"}), 401
         token = auth_header.split("Bearer ")[1]
         try:
-            decoded_token = auth.verify_id_token(token)
+            decoded_token = token_cache.verify(token)
             g.user = decoded_token
         except Exception as e:
             return jsonify({"error": f"Invalid token: {str(e)}"}), 401
@@ -78,13 +161,14 @@ def test_apis():
             - On failure: {"error": "<error message>"}, 500
     """
     try:
-        open_food_response = requests.get("https://world.openfoodfacts.org/api/v0/product/737628064502.json").json()
-        usda_response = requests.get(
+        open_food_response = upstream.get("https://world.openfoodfacts.org/api/v0/product/737628064502.json").json()
+        usda_response = upstream.get(
             "https://api.nal.usda.gov/fdc/v1/foods/search",
             params={"api_key": USDA_API_KEY, "query": "vegetables", "pageSize": 1}
         ).json() if USDA_API_KEY else {"foods": [{"description": "Mock Vegetable"}]}
-        spoonacular_response = requests.get(
-            f"https://api.spoonacular.com/recipes/findByIngredients?ingredients=apple&apiKey={SPOONACULAR_API_KEY}"
+        spoonacular_response = upstream.get(
+            "https://api.spoonacular.com/recipes/findByIngredients",
+            params={"ingredients": "apple", "apiKey": SPOONACULAR_API_KEY}
         ).json() if SPOONACULAR_API_KEY else [{"title": "Mock Recipe"}]
         if db:
             db.collection("api_tests").add({
@@ -99,230 +183,75 @@ def test_apis():
     
 
 # Grocery items
-@app.route("/grocery-items", methods=["GET"])
-@limiter.limit("100/hour")
-def get_grocery_items():
-    """Retrieve a list of grocery items (vegetables) from the USDA API.
-
-    Fetches vegetable items from the USDA API, filters them to ensure diversity
-    and English names, and supplements with mock data if needed. Results are cached
-    in Firestore if available.
+def usda_candidates(filtered_out):
+    """Query USDA for vegetables and keep the first usable product of each veg type.
 
     Returns:
-        tuple: A JSON response and HTTP status code.
-            - On success: {"items": [list of items]}, 200
-            - On failure: {"error": "<error message>"}, 500
-            - If cached: Returns cached items if API fails, 200
+        list: Product dicts (``name``, ``norm_name``, ``veg_type``, ``keywords``,
+        ``category``, ``tags``) with distinct names and no shared keywords.
     """
-    start_time = time.time()
     try:
-        vegetable_types = {
-            "tomato": "fruit_vegetable",
-            "carrot": "root",
-            "potato": "root",
-            "beet": "root",
-            "radish": "root",
-            "spinach": "leafy",
-            "lettuce": "leafy",
-            "kale": "leafy",
-            "cabbage": "leafy",
-            "cilantro": "leafy",
-            "broccoli": "cruciferous",
-            "cauliflower": "cruciferous",
-            "brussels sprout": "cruciferous",
-            "zucchini": "squash",
-            "cucumber": "squash",
-            "squash": "squash",
-            "eggplant": "fruit_vegetable",
-            "pepper": "fruit_vegetable",
-            "onion": "bulb",
-            "garlic": "bulb",
-            "leek": "bulb",
-            "asparagus": "stem",
-            "celery": "stem",
-            "artichoke": "other",
-            "mushroom": "other"
+        url = "https://api.nal.usda.gov/fdc/v1/foods/search"
+        params = {
+            "api_key": USDA_API_KEY,
+            "query": "vegetables",
+            "pageSize": 30,
+            "dataType": "Foundation,SR Legacy,Branded"
         }
+        response = upstream.get(url, params=params)
+        response.raise_for_status()
+        data = response.json()
+    except Exception as e:
+        data = {"foods": []}
+        filtered_out.append({"name": "N/A", "reason": f"API fetch failed: {str(e)}"})
+
+    all_products = []
+    products = data.get("foods", [])
+    for product in products:
+        name = product.get("description", "Unknown Vegetable")
+        classification = classify(name)
+        if not name or not classification.is_english:
+            filtered_out.append({"name": name, "reason": "Non-English name or invalid"})
+            continue
+        category = product.get("foodCategory", "Vegetable").lower()
+        if "vegetable" not in category.lower():
+            filtered_out.append({"name": name, "reason": "Not a vegetable"})
+            continue
+        all_products.append({
+            "name": name,
+            "norm_name": classification.norm_name,
+            "veg_type": classification.veg_type,
+            "keywords": list(classification.keywords),
+            "category": category,
+            "tags": ["vegan", "gluten-free", "nut-free", "organic"]
+        })
 
-        known_english_veggies = {
-            "tomato", "carrot", "potato", "beet", "radish", "spinach", "lettuce", "kale", "cabbage",
-            "cilantro", "broccoli", "cauliflower", "brussels sprout", "zucchini", "cucumber", "squash",
-            "eggplant", "pepper", "bell pepper", "green pepper", "onion", "garlic", "leek", "asparagus",
-            "celery", "artichoke", "mushroom"
-        }
+    selector = DiversitySelector(GROCERY_COUNT, per_type=1, seed=CATALOG_SEED)
+    return selector.select(all_products, shuffle=True, rejected=filtered_out)
 
-        def normalize_name(name):
-            if not name:
-                return ""
-            normalized = name.lower()
-            normalized = ''.join(c for c in normalized if c.isalnum() or c == ' ')
-            normalized = normalized.replace(
-                "cherry red green yellow purple organic fresh baby plum grape roma heirloom paste concentrate chopped puree passata boiled raw", ""
-            ).strip()
-            normalized = normalized.replace("ies", "y").replace("s ", " ")
-            if "tomato" in normalized or "passata" in normalized or "pasta" in normalized:
-                return "tomato"
-            if "potato" in normalized:
-                return "potato"
-            if "brussels" in normalized:
-                return "brussels sprout"
-            if "cilantro" in normalized:
-                return "cilantro"
-            if "pepper" in normalized:
-                return "pepper"
-            return normalized
-
-        def is_english_name(name):
-            if not name:
-                return False
-            cleaned_name = name.replace("'", "").replace("  ", " ")
-            if not all(c.isalpha() or c.isspace() or c == '-' for c in cleaned_name):
-                return False
-            norm_name = normalize_name(name)
-            return any(veggie in norm_name for veggie in known_english_veggies)
-
-        def extract_keywords(name):
-            if not name:
-                return []
-            normalized = name.lower()
-            keywords = normalized.split()
-            keyword_mappings = {
-                "tomato": ["tomato", "tomaten", "passata", "paste", "puree", "tomatoe"],
-                "potato": ["potato", "potatoes"],
-                "brussels sprout": ["brussels", "brussel", "sprout", "sprouts"],
-                "carrot": ["carrot", "carrots", "carrote", "carottes"],
-                "beet": ["beet", "beets", "beetroot"],
-                "spinach": ["spinach", "spinache"],
-                "lettuce": ["lettuce"],
-                "kale": ["kale"],
-                "cabbage": ["cabbage"],
-                "cilantro": ["cilantro", "coriander"],
-                "broccoli": ["broccoli"],
-                "cauliflower": ["cauliflower"],
-                "zucchini": ["zucchini", "courgette", "courgettes"],
-                "cucumber": ["cucumber", "cucumbers"],
-                "squash": ["squash", "squashes"],
-                "eggplant": ["eggplant", "aubergine", "aubergines"],
-                "pepper": ["pepper", "peppers", "bell pepper", "green pepper"],
-                "onion": ["onion", "onions"],
-                "garlic": ["garlic"],
-                "leek": ["leek", "leeks"],
-                "asparagus": ["asparagus"],
-                "celery": ["celery"],
-                "artichoke": ["artichoke", "artichokes"],
-                "mushroom": ["mushroom", "mushrooms"]
-            }
-            matched_keywords = []
-            for main_key, variants in keyword_mappings.items():
-                if any(variant in keywords for variant in variants):
-                    matched_keywords.append(main_key)
-            return matched_keywords
-
-        def get_veg_type(norm_name):
-            for key, vtype in vegetable_types.items():
-                if key in norm_name:
-                    return vtype
-            return "other"
-
-        def get_vegetable_image(vegetable_name):
-            try:
-                cache_doc = db.collection("image_cache").document(vegetable_name.lower()).get()
-                if cache_doc.exists:
-                    return cache_doc.to_dict().get("image_url", "https://images.unsplash.com/photo-1600585154340-be6161a56a0c?w=300")
-                url = f"https://api.unsplash.com/search/photos?query={vegetable_name}&per_page=1"
-                headers = {"Authorization": f"Client-ID {UNSPLASH_ACCESS_KEY}"}
-                response = requests.get(url, headers=headers, timeout=5)
-                response.raise_for_status()
-                data = response.json()
-                image_url = data["results"][0]["urls"]["small"] if data["results"] else "https://images.unsplash.com/photo-1600585154340-be6161a56a0c?w=300"
-                db.collection("image_cache").document(vegetable_name.lower()).set({
-                    "image_url": image_url,
-                    "timestamp": firestore.SERVER_TIMESTAMP
-                })
-                return image_url
-            except Exception as e:
-                print(f"Error fetching image for {vegetable_name}: {str(e)}")
-                return "https://images.unsplash.com/photo-1600585154340-be6161a56a0c?w=300"
 
-        seen_names = set()
-        seen_types = set()
-        seen_keywords = set()
-        items = []
-        filtered_out = []
+def build_grocery_items():
+    """Build a list of grocery items (vegetables) from the local index or the USDA API.
 
-        try:
-            url = "https://api.nal.usda.gov/fdc/v1/foods/search"
-            params = {
-                "api_key": USDA_API_KEY,
-                "query": "vegetables",
-                "pageSize": 30,
-                "dataType": "Foundation,SR Legacy,Branded"
-            }
-            headers = {"User-Agent": "SmartCart - Python - Version 1.0"}
-            response = requests.get(url, params=params, headers=headers, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-        except Exception as e:
-            data = {"foods": []}
-            filtered_out.append({"name": "N/A", "reason": f"API fetch failed: {str(e)}"})
-
-        all_products = []
-        products = data.get("foods", [])
-        random.shuffle(products)
-        for product in products:
-            name = product.get("description", "Unknown Vegetable")
-            if not name or not is_english_name(name):
-                filtered_out.append({"name": name, "reason": "Non-English name or invalid"})
-                continue
-            norm_name = normalize_name(name)
-            veg_type = get_veg_type(norm_name)
-            keywords = extract_keywords(name)
-            category = product.get("foodCategory", "Vegetable").lower()
-            if "vegetable" not in category.lower():
-                filtered_out.append({"name": name, "reason": "Not a vegetable"})
-                continue
-            all_products.append({
-                "name": name,
-                "norm_name": norm_name,
-                "veg_type": veg_type,
-                "keywords": keywords,
-                "category": category,
-                "tags": ["vegan", "gluten-free", "nut-free", "organic"]
-            })
+    Draws diverse items from the local product index when it has been ingested,
+    otherwise fetches vegetable items from the USDA API and filters them to ensure
+    diversity and English names. Supplements with mock data if needed. Results are
+    cached in Firestore if available.
 
-        type_to_product = {}
-        for product in all_products:
-            veg_type = product["veg_type"]
-            if veg_type not in type_to_product:
-                type_to_product[veg_type] = []
-            type_to_product[veg_type].append(product)
-
-        for veg_type, products in type_to_product.items():
-            for product in products:
-                name = product["name"]
-                norm_name = product["norm_name"]
-                keywords = product["keywords"]
-                has_overlap = any(keyword in seen_keywords for keyword in keywords)
-                if has_overlap:
-                    filtered_out.append({"name": name, "reason": "Overlapping keyword"})
-                    continue
-                if norm_name in seen_names:
-                    filtered_out.append({"name": name, "reason": "Duplicate name"})
-                    continue
-                seen_names.add(norm_name)
-                seen_types.add(veg_type)
-                seen_keywords.update(keywords)
-                price = 1.50
-                image_url = get_vegetable_image(norm_name)
-                items.append({
-                    "name": name,
-                    "category": product["category"],
-                    "tags": product["tags"],
-                    "price": price,
-                    "image": image_url,
-                    "veg_type": veg_type
-                })
-                break
+    Returns:
+        list: Grocery item dicts.
+
+    Raises:
+        Exception: If no valid items could be assembled.
+    """
+    start_time = time.time()
+    try:
+        selector = DiversitySelector(GROCERY_COUNT, seed=CATALOG_SEED)
+        filtered_out = []
+
+        # The local product index, once ingested, replaces the USDA query
+        if not product_store.select(USDA, GROCERY_COUNT, rng=selector.rng, selector=selector):
+            selector.select(usda_candidates(filtered_out))
 
         mock_vegetables = [
             {"name": "Fresh Potatoes", "veg_type": "root", "keywords": ["potato"]},
@@ -337,66 +266,66 @@ def get_grocery_items():
             {"name": "Cauliflower Head", "veg_type": "cruciferous", "keywords": ["cauliflower"]}
         ]
 
-        remaining_slots = 20 - len(items)
-        if remaining_slots > 0:
-            random.shuffle(mock_vegetables)
-            for mock in mock_vegetables:
-                if len(items) >= 20:
-                    break
-                name = mock["name"]
-                norm_name = normalize_name(name)
-                veg_type = mock["veg_type"]
-                keywords = mock["keywords"]
-                has_overlap = any(keyword in seen_keywords for keyword in keywords)
-                if has_overlap:
-                    filtered_out.append({"name": name, "reason": "Overlapping keyword (mock)"})
-                    continue
-                if norm_name in seen_names:
-                    filtered_out.append({"name": name, "reason": "Duplicate name (mock)"})
-                    continue
-                seen_names.add(norm_name)
-                seen_types.add(veg_type)
-                seen_keywords.update(keywords)
-                image_url = get_vegetable_image(norm_name)
-                items.append({
-                    "name": name,
-                    "category": "vegetable",
-                    "tags": ["vegan", "gluten-free", "nut-free"],
-                    "price": 1.50,
-                    "image": image_url,
-                    "veg_type": veg_type
-                })
+        if not selector.full:
+            mocks = [{
+                **mock,
+                "norm_name": normalize_name(mock["name"]),
+                "category": "vegetable",
+                "tags": ["vegan", "gluten-free", "nut-free"]
+            } for mock in mock_vegetables]
+            rejected = []
+            selector.select(mocks, shuffle=True, rejected=rejected)
+            filtered_out.extend({"name": r["name"], "reason": f"{r['reason']} (mock)"} for r in rejected)
+
+        items = [{
+            "id": catalog_id(product["name"]),
+            "name": product["name"],
+            "category": product["category"],
+            "tags": product["tags"],
+            "price": 1.50,
+            "image": None,
+            "veg_type": product["veg_type"]
+        } for product in selector.selected]
 
         if not items:
             raise Exception("No valid vegetable items found")
 
+        image_names = [product["norm_name"] for product in selector.selected]
+        images = image_resolver.resolve(image_names)
+        for item, image_name in zip(items, image_names):
+            item["image"] = images[image_name.lower()]
+        catalog_index.add(items, persist=True)
+
         if db:
-            db.collection("api_logs").add({"endpoint": "grocery-items", "status": "success", "time": time.time() - start_time, "filtered_out": filtered_out[:20]})
+            api_log.add({"endpoint": "grocery-items", "status": "success", "time": time.time() - start_time, "filtered_out": filtered_out[:20]})
             db.collection("grocery_cache").document("latest").set({"items": items, "timestamp": firestore.SERVER_TIMESTAMP})
-        return jsonify({"items": items}), 200
+        return items
     except Exception as e:
         if db:
-            db.collection("api_logs").add({"endpoint": "grocery-items", "status": "error", "time": time.time() - start_time, "error": str(e)})
-            cached = db.collection("grocery_cache").document("latest").get().to_dict()
-            if cached and "items" in cached:
-                return jsonify(cached), 200
-        return jsonify({"error": str(e)}), 500
+            api_log.add({"endpoint": "grocery-items", "status": "error", "time": time.time() - start_time, "error": str(e)})
+        raise
 
 
-@app.route("/daily-offers", methods=["GET"])
-@limiter.limit("100/hour")
-def get_daily_offers():
-    """Retrieve a list of daily vegetable offers from OpenFoodFacts API.
+def build_daily_offers(day=None):
+    """Build a list of daily vegetable offers from OpenFoodFacts API.
+
+    Draws diverse products from the local product index when it has been ingested.
+    Otherwise streams vegetable products from OpenFoodFacts, keeping the first
+    English-named product of each vegetable type without overlapping keywords, and
+    stops reading once every type is filled. Supplements with mock data if needed.
+    Selection and prices are seeded by OFFERS_SEED, OFFERS_REGION and the day, so
+    the same candidates always give the same offers on a given day.
 
-    Fetches vegetable products from OpenFoodFacts, filters for diversity and English names,
-    applies random discounts, and supplements with mock data if needed. Results are cached in Firestore.
+    Args:
+        day (str, optional): Offer day, ``YYYY-MM-DD``. Defaults to today (UTC).
 
     Returns:
-        tuple: A JSON response and HTTP status code.
-            - On success: {"offers": [list of offers]}, 200
-            - On failure: {"error": "<error message>"}, 500
-            - If cached: Returns cached offers if API fails, 200
+        list: Offer dicts.
+
+    Raises:
+        Exception: If no valid offers could be assembled.
     """
+    day = day or offer_pricing.offer_day()
     start_time = time.time()
     try:
         mock_vegetables = [
@@ -412,242 +341,352 @@ def get_daily_offers():
             {"name": "Asparagus Spears", "veg_type": "stem", "keywords": ["asparagus"]}
         ]
 
-        vegetable_types = {
-            "tomato": "fruit_vegetable",
-            "carrot": "root",
-            "potato": "root",
-            "beet": "root",
-            "radish": "root",
-            "spinach": "leafy",
-            "lettuce": "leafy",
-            "kale": "leafy",
-            "cabbage": "leafy",
-            "cilantro": "leafy",
-            "broccoli": "cruciferous",
-            "cauliflower": "cruciferous",
-            "brussels sprout": "cruciferous",
-            "zucchini": "squash",
-            "cucumber": "squash",
-            "squash": "squash",
-            "eggplant": "fruit_vegetable",
-            "pepper": "fruit_vegetable",
-            "onion": "bulb",
-            "garlic": "bulb",
-            "leek": "bulb",
-            "asparagus": "stem",
-            "celery": "stem",
-            "artichoke": "other",
-            "mushroom": "other"
-        }
-
-        known_english_veggies = {
-            "tomato", "carrot", "potato", "beet", "radish", "spinach", "lettuce", "kale", "cabbage",
-            "cilantro", "broccoli", "cauliflower", "brussels sprout", "zucchini", "cucumber", "squash",
-            "eggplant", "pepper", "bell pepper", "green pepper", "onion", "garlic", "leek", "asparagus",
-            "celery", "artichoke", "mushroom"
-        }
-
-        def normalize_name(name):
-            if not name:
-                return ""
-            normalized = name.lower()
-            normalized = ''.join(c for c in normalized if c.isalnum() or c == ' ')
-            normalized = normalized.replace(
-                "cherry red green yellow purple organic fresh baby plum grape roma heirloom paste concentrate chopped puree passata", ""
-            ).strip()
-            normalized = normalized.replace("ies", "y").replace("s ", " ")
-            if "tomato" in normalized or "passata" in normalized or "pasta" in normalized:
-                return "tomato"
-            if "potato" in normalized:
-                return "potato"
-            if "brussels" in normalized:
-                return "brussels sprout"
-            if "cilantro" in normalized:
-                return "cilantro"
-            if "pepper" in normalized:
-                return "pepper"
-            return normalized
-
-        def is_english_name(name):
-            if not name:
-                return False
-            cleaned_name = name.replace("'", "").replace("  ", " ")
-            if not all(c.isalpha() or c.isspace() or c == '-' for c in cleaned_name):
-                return False
-            norm_name = normalize_name(name)
-            return any(veggie in norm_name for veggie in known_english_veggies)
-
-        def extract_keywords(name):
-            if not name:
-                return []
-            normalized = name.lower()
-            keywords = normalized.split()
-            keyword_mappings = {
-                "tomato": ["tomato", "tomaten", "passata", "paste", "puree", "tomatoe"],
-                "potato": ["potato", "potatoes"],
-                "brussels sprout": ["brussels", "brussel", "sprout", "sprouts"],
-                "carrot": ["carrot", "carrots", "carrote", "carottes"],
-                "beet": ["beet", "beets", "beetroot"],
-                "spinach": ["spinach", "spinache"],
-                "lettuce": ["lettuce"],
-                "kale": ["kale"],
-                "cabbage": ["cabbage"],
-                "cilantro": ["cilantro", "coriander"],
-                "broccoli": ["broccoli"],
-                "cauliflower": ["cauliflower"],
-                "zucchini": ["zucchini", "courgette", "courgettes"],
-                "cucumber": ["cucumber", "cucumbers"],
-                "squash": ["squash", "squashes"],
-                "eggplant": ["eggplant", "aubergine", "aubergines"],
-                "pepper": ["pepper", "peppers", "bell pepper", "green pepper"],
-                "onion": ["onion", "onions"],
-                "garlic": ["garlic"],
-                "leek": ["leek", "leeks"],
-                "asparagus": ["asparagus"],
-                "celery": ["celery"],
-                "artichoke": ["artichoke", "artichokes"],
-                "mushroom": ["mushroom", "mushrooms"]
-            }
-            matched_keywords = []
-            for main_key, variants in keyword_mappings.items():
-                if any(variant in keywords for variant in variants):
-                    matched_keywords.append(main_key)
-            return matched_keywords
-
-        def get_veg_type(norm_name):
-            for key, vtype in vegetable_types.items():
-                if key in norm_name:
-                    return vtype
-            return "other"
-
-        seen_names = set()
-        seen_types = set()
-        seen_keywords = set()
-        offers = []
+        # One offer per vegetable type; only the mock top-up may repeat a type
+        selector = DiversitySelector(OFFER_COUNT, per_type=1, seed=offer_pricing.day_seed(OFFERS_SEED, OFFERS_REGION, day))
         filtered_out = []
 
-        try:
-            url = "https://world.openfoodfacts.org/api/v2/search"
-            params = {
-                "categories_tags_en": "vegetables",
-                "fields": "product_name_en,product_name",
-                "lang": "en",
-                "page_size": 600,
-                "json": "true"
-            }
-            headers = {"User-Agent": "SmartCart - Python - Version 1.0"}
-            response = requests.get(url, params=params, headers=headers, timeout=15)
-            response.raise_for_status()
-            data = response.json()
-        except Exception as e:
-            data = {"products": []}
-            filtered_out.append({"name": "N/A", "reason": f"API fetch failed: {str(e)}"})
-
-        all_products = []
-        products = data.get("products", [])
-        random.shuffle(products)
-        for product in products:
-            name = product.get("product_name_en") or product.get("product_name")
-            if not name:
-                filtered_out.append({"name": "None", "reason": "No name"})
-                continue
-            if not is_english_name(name):
-                filtered_out.append({"name": name, "reason": "Non-English name"})
-                continue
-            norm_name = normalize_name(name)
-            veg_type = get_veg_type(norm_name)
-            keywords = extract_keywords(name)
-            all_products.append({
-                "name": name,
-                "norm_name": norm_name,
-                "veg_type": veg_type,
-                "keywords": keywords
-            })
+        # The local product index, once ingested, replaces the OpenFoodFacts query
+        stored = product_store.select(OFF, OFFER_COUNT, rng=selector.rng, selector=selector)
+        if not stored:
+            # Products are parsed and classified as they stream in; reading stops
+            # as soon as every vegetable type has its offer.
+            try:
+                url = "https://world.openfoodfacts.org/api/v2/search"
+                params = {
+                    "categories_tags_en": "vegetables",
+                    "fields": "product_name_en,product_name",
+                    "lang": "en",
+                    "page_size": 600,
+                    "json": "true"
+                }
+                with closing(upstream.get(url, params=params, stream=True)) as response:
+                    response.raise_for_status()
+                    for product in json_stream.iter_array(response.iter_content(OFFERS_CHUNK_SIZE), "products"):
+                        name = product.get("product_name_en") or product.get("product_name")
+                        if not name:
+                            filtered_out.append({"name": "None", "reason": "No name"})
+                            continue
+                        classification = classify(name)
+                        if not classification.is_english:
+                            filtered_out.append({"name": name, "reason": "Non-English name"})
+                            continue
+                        reason = selector.add({
+                            "name": name,
+                            "norm_name": classification.norm_name,
+                            "veg_type": classification.veg_type,
+                            "keywords": classification.keywords
+                        })
+                        if reason:
+                            filtered_out.append({"name": name, "reason": reason})
+                        if selector.full or selector.type_counts.keys() >= ALL_VEG_TYPES:
+                            break
+            except Exception as e:
+                filtered_out.append({"name": "N/A", "reason": f"API fetch failed: {str(e)}"})
 
-        type_to_product = {}
-        for product in all_products:
-            veg_type = product["veg_type"]
-            if veg_type not in type_to_product:
-                type_to_product[veg_type] = []
-            type_to_product[veg_type].append(product)
-
-        for veg_type, products in type_to_product.items():
-            for product in products:
-                name = product["name"]
-                norm_name = product["norm_name"]
-                keywords = product["keywords"]
-                has_overlap = any(keyword in seen_keywords for keyword in keywords)
-                if has_overlap:
-                    filtered_out.append({"name": name, "reason": "Overlapping keyword"})
-                    continue
-                if norm_name in seen_names:
-                    filtered_out.append({"name": name, "reason": "Duplicate name"})
-                    continue
-                seen_names.add(norm_name)
-                seen_types.add(veg_type)
-                seen_keywords.update(keywords)
-                offers.append({
-                    "name": name,
-                    "original": round(random.uniform(2, 5), 2),
-                    "sale": round(random.uniform(1, 3), 2),
-                    "tags": ["vegan", "gluten-free", "nut-free"]
-                })
-                break
-
-        remaining_slots = 10 - len(offers)
-        if remaining_slots > 0:
-            random.shuffle(mock_vegetables)
-            for mock in mock_vegetables:
-                if len(offers) >= 10:
-                    break
-                name = mock["name"]
-                norm_name = normalize_name(name)
-                veg_type = mock["veg_type"]
-                keywords = mock["keywords"]
-                has_overlap = any(keyword in seen_keywords for keyword in keywords)
-                if has_overlap:
-                    filtered_out.append({"name": name, "reason": "Overlapping keyword (mock)"})
-                    continue
-                if norm_name in seen_names:
-                    filtered_out.append({"name": name, "reason": "Duplicate name (mock)"})
-                    continue
-                seen_names.add(norm_name)
-                seen_types.add(veg_type)
-                seen_keywords.update(keywords)
-                offers.append({
-                    "name": name,
-                    "original": round(random.uniform(2, 5), 2),
-                    "sale": round(random.uniform(1, 3), 2),
-                    "tags": ["vegan", "gluten-free", "nut-free"]
-                })
+        if not selector.full:
+            mocks = [{**mock, "norm_name": normalize_name(mock["name"])} for mock in mock_vegetables]
+            rejected = []
+            selector.select(mocks, shuffle=True, check_quota=False, rejected=rejected)
+            filtered_out.extend({"name": r["name"], "reason": f"{r['reason']} (mock)"} for r in rejected)
 
-        random.shuffle(offers)
+        offers = []
+        for product in selector.selected:
+            original, sale = offer_pricing.price(OFFERS_SEED, OFFERS_REGION, day, product["norm_name"], product["veg_type"])
+            offers.append({
+                "name": product["name"],
+                "original": original,
+                "sale": sale,
+                "tags": ["vegan", "gluten-free", "nut-free"],
+                "veg_type": product["veg_type"]
+            })
+        selector.rng.shuffle(offers)
 
         if not offers:
             raise Exception("No valid vegetable offers found")
 
         if db:
-            db.collection("offers_cache").document("latest").set({"offers": offers, "timestamp": firestore.SERVER_TIMESTAMP})
-            db.collection("api_logs").add({
+            api_log.add({
                 "endpoint": "daily-offers",
                 "status": "success",
                 "time": time.time() - start_time,
                 "filtered_out": filtered_out[:20]
             })
-        return jsonify({"offers": offers}), 200
+        return offers
     except Exception as e:
         if db:
-            db.collection("api_logs").add({
+            api_log.add({
                 "endpoint": "daily-offers",
                 "status": "error",
                 "time": time.time() - start_time,
                 "error": str(e)
             })
-            cached = db.collection("offers_cache").document("latest").get().to_dict()
-            if cached and "offers" in cached:
-                return jsonify(cached), 200
+        raise
+
+
+def load_cached_catalog(collection, key, document="latest"):
+    """Return the last catalog persisted by a successful build, or None."""
+    if not db:
+        return None
+    try:
+        cached = db.collection(collection).document(document).get().to_dict()
+        return (cached or {}).get(key)
+    except Exception as e:
+        print(f"Error loading {collection}: {str(e)}")
+        return None
+
+
+def daily_offers_document(day):
+    return f"{OFFERS_REGION}-{day}"
+
+
+def load_daily_offers():
+    """Return today's offers, building and persisting them on first use.
+
+    Builds are deterministic for the day, but their inputs (OpenFoodFacts, the
+    local product index) may differ between workers. The first set persisted
+    to ``offers_cache/<region>-<day>`` wins and every worker serves that one,
+    with its fields in a fixed order, so all of them return byte-identical
+    offers and ETags for the whole day.
+    """
+    day = offer_pricing.offer_day()
+    offers = load_cached_catalog("offers_cache", "offers", daily_offers_document(day))
+    if not offers:
+        offers = build_daily_offers(day)
+        if db:
+            doc_ref = db.collection("offers_cache").document(daily_offers_document(day))
+            try:
+                doc_ref.create({
+                    "offers": offers,
+                    "day": day,
+                    "region": OFFERS_REGION,
+                    "timestamp": firestore.SERVER_TIMESTAMP
+                })
+            except AlreadyExists:
+                offers = load_cached_catalog("offers_cache", "offers", daily_offers_document(day)) or offers
+            except Exception as e:
+                print(f"Error saving daily offers: {str(e)}")
+    return [dict(sorted(offer.items())) for offer in offers]
+
+
+grocery_catalog = CatalogRefresher(
+    "grocery-items",
+    build_grocery_items,
+    interval=CATALOG_REFRESH_INTERVAL,
+    fallback=lambda: catalog_index.add(load_cached_catalog("grocery_cache", "items")),
+    # The products page shows these items with the tags it derives from their names
+    index=partial(CatalogFilter, derive_tags=True)
+)
+offers_catalog = CatalogRefresher(
+    "daily-offers",
+    load_daily_offers,
+    interval=CATALOG_REFRESH_INTERVAL,
+    index=CatalogFilter
+)
+
+
+def build_search_index():
+    """Index the grocery catalog and every product of the local product index for search."""
+    return SearchIndex(catalog_snapshot(grocery_catalog) + product_store.products())
+
+
+search_catalog = CatalogRefresher(
+    "product-search",
+    build_search_index,
+    interval=CATALOG_REFRESH_INTERVAL,
+    # A cold start searches the grocery catalog alone while the full index builds
+    fallback=lambda: SearchIndex(catalog_snapshot(grocery_catalog))
+)
+
+
+def catalog_response(snapshot, key, derive_tags=False):
+    """Serve ``snapshot`` as ``{key: [...]}``, filtered and paginated by the query string.
+
+    Without ``diet``, ``veg_type``, ``offset`` or ``limit`` the whole catalog is
+    returned under the snapshot's ETag. Otherwise the page comes from the
+    snapshot's ``CatalogFilter`` and its ETag combines the snapshot's with the
+    normalized filters, so each filtered page is revalidated and its encoded
+    body cached like the full catalog. An unknown filter or a malformed
+    ``offset``/``limit`` gets a 400. ``derive_tags`` is passed to a filter
+    built here, for snapshots that have none.
+    """
+    tags = parse_list(request.args.get("diet"))
+    veg_types = parse_list(request.args.get("veg_type"))
+    offset = request.args.get("offset")
+    limit = request.args.get("limit")
+    if not (tags or veg_types or offset or limit):
+        return conditional_json(snapshot.etag, lambda: {key: snapshot.data}, CATALOG_CACHE_CONTROL, compressor)
+    try:
+        check_filters(tags, veg_types)
+        offset = int(offset or 0)
+        limit = int(limit) if limit else None
+        if offset < 0 or (limit is not None and limit < 0):
+            raise ValueError("offset and limit must not be negative")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def build():
+        index = snapshot.index or CatalogFilter(snapshot.data, derive_tags)
+        page, total = index.select(tags, veg_types, offset, limit)
+        return {key: page, "total": total, "offset": offset, "limit": limit}
+
+    etag = content_etag([snapshot.etag, tags, veg_types, offset, limit])
+    return conditional_json(etag, build, CATALOG_CACHE_CONTROL, compressor)
+
+
+@app.route("/grocery-items", methods=["GET"])
+@limiter.limit("100/hour")
+def get_grocery_items():
+    """Retrieve the current list of grocery items (vegetables).
+
+    Served from the in-memory catalog snapshot, which is rebuilt from the USDA API
+    in the background every CATALOG_REFRESH_INTERVAL seconds (or as soon as a
+    request sees it stale). A cold start serves the last Firestore copy if any.
+    The ETag is the snapshot's content hash, so ``If-None-Match`` gets a 304.
+
+    Query Parameters:
+        diet (str, optional): Comma-separated dietary tags (vegan, gluten-free,
+            nut-free, organic, non-gmo, low-carb, high-fiber, low-sodium); items
+            must have all of them.
+        veg_type (str, optional): Comma-separated veg types (root, leafy,
+            fruit_vegetable, cruciferous, bulb, squash, stem, other); items may
+            be of any of them.
+        offset (int, optional): Matching items to skip. Defaults to 0.
+        limit (int, optional): Page size. Defaults to all matching items.
+
+    Returns:
+        tuple: A JSON response and HTTP status code.
+            - On success: {"items": [list of items]}, 200, plus "total",
+              "offset" and "limit" when filtered or paginated
+            - If unchanged: empty body, 304
+            - On an invalid filter: {"error": "<error message>"}, 400
+            - On failure: {"error": "<error message>"}, 500
+    """
+    try:
+        return catalog_response(grocery_catalog.get(), "items", derive_tags=True)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/daily-offers", methods=["GET"])
+@limiter.limit("100/hour")
+def get_daily_offers():
+    """Retrieve the current list of daily vegetable offers.
+
+    Served from the in-memory snapshot of the day's offers, like /grocery-items, with
+    the same ETag, Cache-Control, filter and pagination handling. The offers and
+    their prices are fixed for the day and the same on every worker (see
+    load_daily_offers), so the response only changes when the day does.
+
+    Returns:
+        tuple: A JSON response and HTTP status code.
+            - On success: {"offers": [list of offers]}, 200, plus "total",
+              "offset" and "limit" when filtered or paginated
+            - If unchanged: empty body, 304
+            - On an invalid filter: {"error": "<error message>"}, 400
+            - On failure: {"error": "<error message>"}, 500
+    """
+    try:
+        return catalog_response(offers_catalog.get(), "offers")
+    except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+
+@app.route("/products/search", methods=["GET"])
+@limiter.limit("600/hour")
+def search_products():
+    """Search grocery products by name.
+
+    Answered from an in-memory inverted index over the grocery catalog and the
+    local product index, rebuilt in the background like the catalogs. Every
+    word of ``q`` must match; the last one also matches as a prefix, vegetable
+    variants match their keyword ("courgette" finds zucchini) and a word with
+    no match is retried with one or two typos. Shorter names rank first.
+
+    Query Parameters:
+        q (str): Search text.
+        limit (int, optional): Maximum results, up to 100. Defaults to 20.
+
+    Returns:
+        tuple: A JSON response and HTTP status code.
+            - On success: {"query": "<q>", "items": [list of items]}, 200
+            - If limit is not a number: {"error": "<error message>"}, 400
+            - On failure: {"error": "<error message>"}, 500
+    """
+    query = request.args.get("q", "").strip()
+    try:
+        limit = min(int(request.args.get("limit", SEARCH_LIMIT)), SEARCH_MAX_LIMIT)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    try:
+        items = search_catalog.get().data.search(query, limit) if query else []
+        # Results can be added to the cart, which hydrates them by catalog id;
+        # they are written to catalog_items only once that happens
+        catalog_index.add(items)
+        return jsonify({"query": query, "items": items}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def fetch_meals(cache_key, params, dietary_prefs):
+    """Fetch recipes from Spoonacular and tag them with dietary information.
+
+    The result is stored in ``meal_cache`` under ``cache_key``.
+
+    Args:
+        cache_key (tuple): Canonical (ingredients, diet, maxCarbs) signature.
+        params (dict): findByIngredients query parameters.
+        dietary_prefs (dict): User dietary preferences used for tagging.
+
+    Returns:
+        list: Meal dicts with "meal", "ingredients" and "tags".
+    """
+    recipes = spoonacular.find_by_ingredients(params)
+
+    if not recipes:
+        meal_cache.set(cache_key, [])
+        return []
+
+    # Fetch dietary information for all recipes concurrently
+    recipe_infos = spoonacular.get_recipe_information_many(
+        [recipe["id"] for recipe in recipes], SPOONACULAR_API_KEY, cache=recipe_info_cache
+    )
+    meals = []
+    for recipe in recipes:
+        recipe_info = recipe_infos[recipe["id"]]
+
+        # Extract dietary tags
+        tags = []
+        if recipe_info.get("vegan"):
+            tags.append("vegan")
+        if recipe_info.get("glutenFree"):
+            tags.append("gluten-free")
+        if recipe_info.get("dairyFree"):
+            tags.append("dairy-free")
+        # Spoonacular uses "veryHealthy" as a proxy for some dietary preferences
+        if recipe_info.get("veryHealthy"):
+            if dietary_prefs.get("lowCarb") and recipe_info.get("lowCarb", False):
+                tags.append("low-carb")
+            if dietary_prefs.get("keto") and recipe_info.get("ketogenic", False):
+                tags.append("keto")
+            if dietary_prefs.get("paleo") and recipe_info.get("paleo", False):
+                tags.append("paleo")
+        # Note: Spoonacular API does not directly provide nut-free or peanut-free flags
+        # We'll assume recipes without peanuts in ingredients are nut-free for simplicity
+        ingredients = [ing["name"].lower() for ing in recipe.get("usedIngredients", []) + recipe.get("missedIngredients", [])]
+        has_nuts = any("peanut" in ing or "nut" in ing for ing in ingredients)
+        if not has_nuts:
+            tags.append("nut-free")
+
+        meals.append({
+            "meal": recipe["title"],
+            "ingredients": [ing["name"] for ing in recipe.get("usedIngredients", [])],
+            "tags": tags
+        })
+
+    meal_cache.set(cache_key, meals)
+    return meals
+
+
 @app.route("/meal-recommendations", methods=["POST"])
 @firebase_auth
 @limiter.limit("10 per minute")
@@ -672,11 +711,12 @@ def meal_recommendations():
     cart_items = data.get("cart_items", [])
     dietary_prefs = data.get("dietary_prefs", {})
     try:
-        if not cart_items:
+        ingredients = canonical_ingredients(cart_items)
+        if not ingredients:
             return jsonify({"meals": []}), 200
 
         # Step 1: Fetch initial meal suggestions
-        query = ",".join(cart_items)
+        query = ",".join(ingredients)
         diet = []
         if dietary_prefs.get("vegan"):
             diet.append("vegan")
@@ -701,57 +741,14 @@ def meal_recommendations():
         if dietary_prefs.get("lowCarb"):
             params["maxCarbs"] = 20
 
-        response = requests.get(
-            "https://api.spoonacular.com/recipes/findByIngredients",
-            params=params
-        )
-        response.raise_for_status()
-        recipes = response.json()
-
-        if not recipes:
-            return jsonify({"meals": []}), 200
-
-        # Step 2: Fetch dietary information for each recipe
-        meals = []
-        for recipe in recipes:
-            recipe_id = recipe["id"]
-            # Fetch detailed recipe information
-            recipe_info_response = requests.get(
-                f"https://api.spoonacular.com/recipes/{recipe_id}/information",
-                params={"apiKey": SPOONACULAR_API_KEY}
-            )
-            recipe_info_response.raise_for_status()
-            recipe_info = recipe_info_response.json()
-
-            # Extract dietary tags
-            tags = []
-            if recipe_info.get("vegan"):
-                tags.append("vegan")
-            if recipe_info.get("glutenFree"):
-                tags.append("gluten-free")
-            if recipe_info.get("dairyFree"):
-                tags.append("dairy-free")
-            # Spoonacular uses "veryHealthy" as a proxy for some dietary preferences
-            if recipe_info.get("veryHealthy"):
-                if dietary_prefs.get("lowCarb") and recipe_info.get("lowCarb", False):
-                    tags.append("low-carb")
-                if dietary_prefs.get("keto") and recipe_info.get("ketogenic", False):
-                    tags.append("keto")
-                if dietary_prefs.get("paleo") and recipe_info.get("paleo", False):
-                    tags.append("paleo")
-            # Note: Spoonacular API does not directly provide nut-free or peanut-free flags
-            # We'll assume recipes without peanuts in ingredients are nut-free for simplicity
-            ingredients = [ing["name"].lower() for ing in recipe.get("usedIngredients", []) + recipe.get("missedIngredients", [])]
-            has_nuts = any("peanut" in ing or "nut" in ing for ing in ingredients)
-            if not has_nuts:
-                tags.append("nut-free")
-
-            meals.append({
-                "meal": recipe["title"],
-                "ingredients": [ing["name"] for ing in recipe.get("usedIngredients", [])],
-                "tags": tags
-            })
+        # Equivalent carts with the same diet params share one cached result
+        cache_key = (query, diet_str, params.get("maxCarbs"))
+        cached_meals = meal_cache.get(cache_key)
+        if cached_meals is not None:
+            return jsonify({"meals": cached_meals}), 200
 
+        # Concurrent misses for the same key share one Spoonacular round trip
+        meals = meal_flight.do(cache_key, fetch_meals, cache_key, params, dietary_prefs)
         return jsonify({"meals": meals}), 200
     except Exception as e:
         return jsonify({"error": f"Meal recommendations failed: {str(e)}"}), 500
@@ -775,6 +772,38 @@ def get_api_logs():
     return jsonify([log.to_dict() for log in logs]), 200
 
 
+@app.route("/metrics", methods=["GET"])
+@limiter.limit("100/hour")
+def get_metrics():
+    """Report in-process performance counters.
+
+    Includes upstream connection reuse per host, cache hit rates, catalog
+    refresher state, api_logs queue counters, profile cache reads and
+    response compression.
+
+    Returns:
+        tuple: A JSON response and HTTP status code.
+            - {"upstream": {...}, "recipeInfoCache": {...}, ...}, 200
+    """
+    return jsonify({
+        "upstream": upstream.default_client.stats(),
+        "recipeInfoCache": recipe_info_cache.stats(),
+        "mealCache": {**meal_cache.stats(), "singleFlight": meal_flight.stats()},
+        "imageCache": image_resolver.stats(),
+        "catalogIndex": catalog_index.stats(),
+        "catalogs": {
+            "groceryItems": grocery_catalog.stats(),
+            "dailyOffers": offers_catalog.stats()
+        },
+        "productSearch": search_catalog.stats(),
+        "apiLogs": api_log.stats(),
+        "authTokenCache": token_cache.stats(),
+        "profileCache": profiles.stats(),
+        "compression": compressor.stats(),
+        "productStore": product_store.stats()
+    }), 200
+
+
 @app.route("/auth/signup", methods=["POST"])
 @firebase_auth
 def signup():
@@ -784,7 +813,7 @@ def signup():
     user_id = g.user["uid"]
     avatar_url = f"https://api.dicebear.com/9.x/pixel-art/svg?seed={user_id}"
     try:
-        db.collection("profiles").document(user_id).set({
+        profiles.ref(user_id).set({
             "email": email,
             "name": name,
             "avatarUrl": avatar_url,
@@ -801,10 +830,12 @@ def signup():
                 "keto": False,
                 "paleo": False
             },
-            "cart": []
+            cart_store.CART_FIELD: {},
+            cart_store.TOTALS_FIELD: dict(cart_store.EMPTY_TOTALS)
         })
+        profiles.invalidate(user_id)
         if db:
-            db.collection("api_logs").add({
+            api_log.add({
                 "endpoint": "auth/signup",
                 "status": "success",
                 "user_id": user_id,
@@ -813,7 +844,7 @@ def signup():
         return jsonify({"message": "User created", "userId": user_id}), 201
     except Exception as e:
         if db:
-            db.collection("api_logs").add({
+            api_log.add({
                 "endpoint": "auth/signup",
                 "status": "error",
                 "error": str(e),
@@ -831,21 +862,26 @@ def login():
         token = data.get("token")
         if not token:
             return jsonify({"error": "Token required"}), 401
-        decoded = auth.verify_id_token(token)
-        user = auth.get_user_by_email(email)
-        if decoded["uid"] != user.uid:
-            return jsonify({"error": "Invalid token"}), 401
+        decoded = token_cache.verify(token)
+        # The verified email claim already ties the token to this account; only
+        # fall back to the Admin API lookup when the token carries no email.
+        if email and (decoded.get("email") or "").lower() == email.lower():
+            uid = decoded["uid"]
+        else:
+            uid = auth.get_user_by_email(email).uid
+            if decoded["uid"] != uid:
+                return jsonify({"error": "Invalid token"}), 401
         if db:
-            db.collection("api_logs").add({
+            api_log.add({
                 "endpoint": "auth/login",
                 "status": "success",
-                "user_id": user.uid,
+                "user_id": uid,
                 "timestamp": firestore.SERVER_TIMESTAMP
             })
-        return jsonify({"uid": user.uid, "token": token}), 200
+        return jsonify({"uid": uid, "token": token}), 200
     except Exception as e:
         if db:
-            db.collection("api_logs").add({
+            api_log.add({
                 "endpoint": "auth/login",
                 "status": "error",
                 "error": str(e),
@@ -876,22 +912,27 @@ def update_profile():
         "paleo": False
     })
     try:
-        db.collection("profiles").document(user_id).update({
+        profile = {
             "name": name,
             "avatarUrl": avatar_url,
             "dietaryPrefs": dietary_prefs
-        })
+        }
+        # With return_state the profile is read in the write's transaction, so
+        # fields the request left out are returned too
+        updated = profiles.update(user_id, profile, return_state=bool(data.get("return_state")))
         if db:
-            db.collection("api_logs").add({
+            api_log.add({
                 "endpoint": "profile/update",
                 "status": "success",
                 "user_id": user_id,
                 "timestamp": firestore.SERVER_TIMESTAMP
             })
+        if updated is not None:
+            return jsonify({"message": "Profile updated", "profile": updated}), 200
         return jsonify({"message": "Profile updated"}), 200
     except Exception as e:
         if db:
-            db.collection("api_logs").add({
+            api_log.add({
                 "endpoint": "profile/update",
                 "status": "error",
                 "user_id": user_id,
@@ -903,37 +944,42 @@ def update_profile():
 
 
 
+def default_profile(user_id, email):
+    """Profile served to a signed-in user who has no profile document yet."""
+    return {
+        "email": email,
+        "name": email.split("@")[0],
+        "avatarUrl": f"https://api.dicebear.com/9.x/pixel-art/svg?seed={user_id}",
+        "dietaryPrefs": {
+            "vegan": False,
+            "glutenFree": False,
+            "nutFree": False,
+            "organic": False,
+            "nonGMO": False,
+            "lowCarb": False,
+            "highFiber": False,
+            "lowSodium": False,
+            "dairyFree": False,
+            "keto": False,
+            "paleo": False
+        },
+        "cart": []
+    }
+
+
 @app.route("/profile/<userId>", methods=["GET"])
 @firebase_auth
 def get_profile(userId):
     if g.user["uid"] != userId:
         return jsonify({"error": "Unauthorized"}), 403
     try:
-        doc = db.collection("profiles").document(userId).get()
-        if doc.exists:
-            return jsonify(doc.to_dict()), 200
-        return jsonify({
-            "email": g.user.get("email", ""),
-            "name": g.user.get("email", "").split("@")[0],
-            "avatarUrl": f"https://api.dicebear.com/9.x/pixel-art/svg?seed={userId}",
-            "dietaryPrefs": {
-                "vegan": False,
-                "glutenFree": False,
-                "nutFree": False,
-                "organic": False,
-                "nonGMO": False,
-                "lowCarb": False,
-                "highFiber": False,
-                "lowSodium": False,
-                "dairyFree": False,
-                "keto": False,
-                "paleo": False
-            },
-            "cart": []
-        }), 200
+        profile = profiles.get(userId)
+        if profile is None:
+            profile = default_profile(userId, g.user.get("email") or "")
+        return conditional_json(content_etag(profile), lambda: profile, PRIVATE_CACHE_CONTROL)
     except Exception as e:
         if db:
-            db.collection("api_logs").add({
+            api_log.add({
                 "endpoint": "profile/<userId>",
                 "status": "error",
                 "user_id": userId,
@@ -948,13 +994,13 @@ def get_profile(userId):
 def profile_logs():
     user_id = g.user["uid"]
     try:
-        doc = db.collection("profiles").document(user_id).get()
-        if doc.exists:
-            return jsonify({"logs": doc.to_dict()}), 200
+        profile = profiles.get(user_id)
+        if profile is not None:
+            return jsonify({"logs": profile}), 200
         return jsonify({"logs": {}}), 200
     except Exception as e:
         if db:
-            db.collection("api_logs").add({
+            api_log.add({
                 "endpoint": "profile-logs",
                 "status": "error",
                 "user_id": user_id,
@@ -963,42 +1009,71 @@ def profile_logs():
             })
         return jsonify({"error": f"Profile logs failed: {str(e)}"}), 500
 
+def compact_cart_item(item):
+    """Turn an item posted by the client into a compact cart entry.
+
+    The item is identified by its catalog id (``id``), or by its name for
+    clients that predate catalog ids, and priced from the catalog when known.
+
+    Raises:
+        ValueError: If the item has neither, or its quantity is not a
+            positive integer.
+    """
+    quantity = cart_store.check_quantity(item.get("quantity", 1))
+    item_id = str(item.get("catalog_id") or item.get("id") or "")
+    details = catalog_index.lookup([item_id]).get(item_id) if item_id else None
+    if details is None and item.get("name"):
+        item_id = catalog_id(item["name"])
+        details = catalog_index.lookup([item_id]).get(item_id)
+    if not item_id:
+        raise ValueError("Item needs an id or a name")
+    # Search results are only in this worker's memory until they reach a cart
+    catalog_index.persist([item_id])
+    price = details["price"] if details and details.get("price") is not None else item.get("price", 0)
+    return {
+        "catalog_id": item_id,
+        "price_at_add": cart_store.price_cents(price),
+        "quantity": quantity
+    }
+
+
 @app.route("/cart/add", methods=["POST"])
 @firebase_auth
 @limiter.limit("10 per minute")
 def add_to_cart():
     user_id = g.user["uid"]
-    item = request.get_json().get("item")
+    data = request.get_json()
+    item = data.get("item")
     if not item:
         return jsonify({"error": "Missing item in request"}), 400
     try:
-        doc_ref = db.collection("profiles").document(user_id)
-        doc = doc_ref.get()
-        if doc.exists:
-            cart = doc.to_dict().get("cart", [])
-            item["price"] = float(item.get("price", 0))
-            if "id" not in item:
-                item["id"] = str(len(cart) + 1)
-            item["quantity"] = item.get("quantity", 1)
-            existing_item = next((i for i in cart if i["id"] == item["id"]), None)
-            if existing_item:
-                existing_item["quantity"] = existing_item.get("quantity", 1) + item["quantity"]
-            else:
-                cart.append(item)
-            doc_ref.update({"cart": cart})
-            if db:
-                db.collection("api_logs").add({
-                    "endpoint": "cart/add",
-                    "status": "success",
-                    "user_id": user_id,
-                    "item_id": item["id"],
-                    "timestamp": firestore.SERVER_TIMESTAMP
-                })
-            return jsonify({"message": "Item added", "itemId": item["id"]}), 200
+        entry = compact_cart_item(item)
+        doc_ref = profiles.ref(user_id)
+        state = {}
+        if data.get("return_state"):
+            # One transaction reads the cart it writes, saving the client a /cart/get
+            cart = cart_store.apply_operations(db, doc_ref, [{"op": "add", "item": entry}])
+            state = cart_store.summarize(catalog_index.hydrate(cart))
+        else:
+            # Atomic per-item update: no read, and concurrent adds cannot lose each other
+            cart_store.add_item(doc_ref, entry)
+        profiles.invalidate(user_id)
+        if db:
+            api_log.add({
+                "endpoint": "cart/add",
+                "status": "success",
+                "user_id": user_id,
+                "item_id": entry["catalog_id"],
+                "timestamp": firestore.SERVER_TIMESTAMP
+            })
+        return jsonify({"message": "Item added", "itemId": entry["catalog_id"], **state}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except NotFound:
         return jsonify({"error": "Profile not found"}), 404
     except Exception as e:
         if db:
-            db.collection("api_logs").add({
+            api_log.add({
                 "endpoint": "cart/add",
                 "status": "error",
                 "user_id": user_id,
@@ -1012,21 +1087,27 @@ def add_to_cart():
 def get_cart():
     user_id = g.user["uid"]
     try:
-        doc = db.collection("profiles").document(user_id).get()
-        if doc.exists:
-            cart = doc.to_dict().get("cart", [])
+        data = profiles.get(user_id, cart_store.CART_FIELDS)
+        if data is not None:
+            if cart_store.is_outdated(data):
+                doc_ref = profiles.ref(user_id)
+                cart_store.migrate_cart(doc_ref, doc_ref.get(field_paths=cart_store.CART_FIELDS))
+                profiles.invalidate(user_id)
             if db:
-                db.collection("api_logs").add({
+                api_log.add({
                     "endpoint": "cart/get",
                     "status": "success",
                     "user_id": user_id,
                     "timestamp": firestore.SERVER_TIMESTAMP
                 })
-            return jsonify({"items": cart}), 200
+            # The ETag covers the hydrated items, so a change to an item's
+            # catalog details (name, image, tags) is not answered with a 304
+            items = catalog_index.hydrate(cart_store.cart_items(data))
+            return conditional_json(content_etag(items), lambda: {"items": items}, PRIVATE_CACHE_CONTROL)
         return jsonify({"items": []}), 200
     except Exception as e:
         if db:
-            db.collection("api_logs").add({
+            api_log.add({
                 "endpoint": "cart/get",
                 "status": "error",
                 "user_id": user_id,
@@ -1040,29 +1121,41 @@ def get_cart():
 @app.route("/cart/summary", methods=["GET"])
 @firebase_auth
 def cart_summary():
+    """Return the cart totals, and the items unless ``?items=false``.
+
+    Totals come from the stored ``cartTotals`` aggregate. Only the cart fields
+    are read, and a totals-only request reads just the aggregate.
+
+    Returns:
+        tuple: A JSON response and HTTP status code.
+            - On success: {"totalItems": n, "totalPrice": x, "items": [cart items]}, 200
+            - On failure: {"error": "<error message>"}, 500
+    """
     user_id = g.user["uid"]
+    include_items = request.args.get("items", "true").lower() != "false"
     try:
-        doc = db.collection("profiles").document(user_id).get()
-        if doc.exists:
-            cart = doc.to_dict().get("cart", [])
-            total_items = sum(item.get("quantity", 1) for item in cart)
-            total_price = sum(float(item.get("price", 0)) * item.get("quantity", 1) for item in cart)
+        if include_items:
+            data = profiles.get(user_id, cart_store.CART_FIELDS)
+        else:
+            data = profiles.get(user_id, [cart_store.TOTALS_FIELD, cart_store.LEGACY_CART_FIELD])
+            if data is not None and (cart_store.TOTALS_FIELD not in data or data.get(cart_store.LEGACY_CART_FIELD)):
+                # Profile without the aggregate yet: fall back to the items
+                data = profiles.get(user_id, cart_store.CART_FIELDS)
+        if data is not None:
+            totals = cart_store.stored_totals(data)
             if db:
-                db.collection("api_logs").add({
+                api_log.add({
                     "endpoint": "cart/summary",
                     "status": "success",
                     "user_id": user_id,
                     "timestamp": firestore.SERVER_TIMESTAMP
                 })
-            return jsonify({
-                "totalItems": total_items,
-                "totalPrice": round(total_price, 2),
-                "items": cart
-            }), 200
-        return jsonify({"totalItems": 0, "totalPrice": 0, "items": []}), 200
+            cart = catalog_index.hydrate(cart_store.cart_items(data)) if include_items else None
+            return jsonify(cart_store.summarize(cart, totals)), 200
+        return jsonify(cart_store.summarize([] if include_items else None)), 200
     except Exception as e:
         if db:
-            db.collection("api_logs").add({
+            api_log.add({
                 "endpoint": "cart/summary",
                 "status": "error",
                 "user_id": user_id,
@@ -1071,33 +1164,90 @@ def cart_summary():
             })
         return jsonify({"error": f"Cart summary failed: {str(e)}"}), 500
 
+@app.route("/cart/batch", methods=["POST"])
+@firebase_auth
+@limiter.limit("30 per minute")
+def cart_batch():
+    """Apply several cart changes in one request and one Firestore transaction.
+
+    Either all operations are applied or none are. Requires authentication.
+
+    Args:
+        JSON body:
+            - operations (list): Up to 100 of {"op": "add", "item": {...}},
+              {"op": "remove", "item_id": id} or
+              {"op": "set_quantity", "item_id": id, "quantity": n}.
+
+    Returns:
+        tuple: A JSON response and HTTP status code.
+            - On success: {"totalItems": n, "totalPrice": x, "items": [cart items]}, 200
+            - On invalid operations: {"error": "<error message>"}, 400
+            - If the profile does not exist: {"error": "Profile not found"}, 404
+    """
+    user_id = g.user["uid"]
+    operations = (request.get_json() or {}).get("operations")
+    try:
+        doc_ref = profiles.ref(user_id)
+        if isinstance(operations, list):
+            operations = [
+                dict(operation, item=compact_cart_item(operation["item"]))
+                if isinstance(operation, dict) and operation.get("op") == "add" and isinstance(operation.get("item"), dict)
+                else operation
+                for operation in operations
+            ]
+        cart = catalog_index.hydrate(cart_store.apply_operations(db, doc_ref, operations))
+        profiles.invalidate(user_id)
+        if db:
+            api_log.add({
+                "endpoint": "cart/batch",
+                "status": "success",
+                "user_id": user_id,
+                "operations": len(operations),
+                "timestamp": firestore.SERVER_TIMESTAMP
+            })
+        return jsonify(cart_store.summarize(cart)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except NotFound:
+        return jsonify({"error": "Profile not found"}), 404
+    except Exception as e:
+        if db:
+            api_log.add({
+                "endpoint": "cart/batch",
+                "status": "error",
+                "user_id": user_id,
+                "error": str(e),
+                "timestamp": firestore.SERVER_TIMESTAMP
+            })
+        return jsonify({"error": f"Cart batch failed: {str(e)}"}), 500
+
 @app.route("/cart/remove", methods=["POST"])
 @firebase_auth
 def remove_from_cart():
     user_id = g.user["uid"]
-    item_id = request.get_json().get("item_id")
+    data = request.get_json()
+    item_id = data.get("item_id")
     if not item_id:
         return jsonify({"error": "Missing item_id in request"}), 400
     try:
-        doc_ref = db.collection("profiles").document(user_id)
-        doc = doc_ref.get()
-        if doc.exists:
-            cart = doc.to_dict().get("cart", [])
-            cart = [item for item in cart if item["id"] != item_id]
-            doc_ref.update({"cart": cart})
-            if db:
-                db.collection("api_logs").add({
-                    "endpoint": "cart/remove",
-                    "status": "success",
-                    "user_id": user_id,
-                    "item_id": item_id,
-                    "timestamp": firestore.SERVER_TIMESTAMP
-                })
-            return jsonify({"message": "Item removed"}), 200
+        doc_ref = profiles.ref(user_id)
+        cart = cart_store.remove_item(db, doc_ref, item_id)
+        profiles.invalidate(user_id)
+        state = cart_store.summarize(catalog_index.hydrate(cart)) if data.get("return_state") else {}
+        if db:
+            api_log.add({
+                "endpoint": "cart/remove",
+                "status": "success",
+                "user_id": user_id,
+                "item_id": item_id,
+                "timestamp": firestore.SERVER_TIMESTAMP
+            })
+        return jsonify({"message": "Item removed", **state}), 200
+    except NotFound:
         return jsonify({"error": "Profile not found"}), 404
     except Exception as e:
         if db:
-            db.collection("api_logs").add({
+            api_log.add({
                 "endpoint": "cart/remove",
                 "status": "error",
                 "user_id": user_id,
@@ -1106,5 +1256,70 @@ def remove_from_cart():
             })
         return jsonify({"error": f"Remove from cart failed: {str(e)}"}), 500
 
+
+def catalog_snapshot(catalog):
+    """Return the current data of ``catalog``, or an empty list if it has none."""
+    try:
+        return catalog.get().data
+    except Exception as e:
+        print(f"Error loading {catalog.name}: {str(e)}")
+        return []
+
+
+@app.route("/session/bootstrap", methods=["GET"])
+@firebase_auth
+def session_bootstrap():
+    """Return everything the frontend needs after sign-in, in one round trip.
+
+    Replaces the /profile, /cart/get, /grocery-items and /daily-offers calls
+    made on login: the token is verified once and the profile document is read
+    once (or served from the profile cache). The catalogs come from their
+    in-memory snapshots; a catalog that cannot be loaded is returned empty
+    rather than failing the session.
+
+    Returns:
+        tuple: A JSON response and HTTP status code.
+            - On success: {"profile": {...}, "cart": {"items": [...], "totalItems": int,
+              "totalPrice": float}, "groceryItems": [...], "dailyOffers": [...]}, 200
+            - On failure: {"error": "<error message>"}, 500
+    """
+    user_id = g.user["uid"]
+    try:
+        data = profiles.get(user_id)
+        if data is None:
+            data = default_profile(user_id, g.user.get("email") or "")
+        elif cart_store.is_outdated(data):
+            doc_ref = profiles.ref(user_id)
+            cart_store.migrate_cart(doc_ref, doc_ref.get(field_paths=cart_store.CART_FIELDS))
+            profiles.invalidate(user_id)
+        profile = {key: value for key, value in data.items() if key not in cart_store.CART_FIELDS}
+        cart = cart_store.summarize(
+            catalog_index.hydrate(cart_store.cart_items(data)),
+            cart_store.stored_totals(data)
+        )
+        if db:
+            api_log.add({
+                "endpoint": "session/bootstrap",
+                "status": "success",
+                "user_id": user_id,
+                "timestamp": firestore.SERVER_TIMESTAMP
+            })
+        return jsonify({
+            "profile": profile,
+            "cart": cart,
+            "groceryItems": catalog_snapshot(grocery_catalog),
+            "dailyOffers": catalog_snapshot(offers_catalog)
+        }), 200
+    except Exception as e:
+        if db:
+            api_log.add({
+                "endpoint": "session/bootstrap",
+                "status": "error",
+                "user_id": user_id,
+                "error": str(e),
+                "timestamp": firestore.SERVER_TIMESTAMP
+            })
+        return jsonify({"error": f"Session bootstrap failed: {str(e)}"}), 500
+
 if __name__ == "__main__":
     app.run(debug=True, port=5000)
\ No newline at end of file
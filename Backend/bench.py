@@ -0,0 +1,392 @@
+"""Micro-benchmarks for the backend hot paths.
+
+Run from the Backend directory, e.g. ``python bench.py classifier``.
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+import veg_classifier
+
+
+# Copy of the per-request helpers that used to live inside get_grocery_items /
+# get_daily_offers, kept here as the "before" baseline.
+def legacy_classify(name):
+    vegetable_types = dict(veg_classifier.VEGETABLE_TYPES)
+    known_english_veggies = set(veg_classifier.KNOWN_ENGLISH_VEGGIES)
+
+    def normalize_name(name):
+        if not name:
+            return ""
+        normalized = name.lower()
+        normalized = ''.join(c for c in normalized if c.isalnum() or c == ' ')
+        normalized = normalized.replace(veg_classifier.NOISE_PHRASE, "").strip()
+        normalized = normalized.replace("ies", "y").replace("s ", " ")
+        if "tomato" in normalized or "passata" in normalized or "pasta" in normalized:
+            return "tomato"
+        if "potato" in normalized:
+            return "potato"
+        if "brussels" in normalized:
+            return "brussels sprout"
+        if "cilantro" in normalized:
+            return "cilantro"
+        if "pepper" in normalized:
+            return "pepper"
+        return normalized
+
+    def is_english_name(name):
+        if not name:
+            return False
+        cleaned_name = name.replace("'", "").replace("  ", " ")
+        if not all(c.isalpha() or c.isspace() or c == '-' for c in cleaned_name):
+            return False
+        norm_name = normalize_name(name)
+        return any(veggie in norm_name for veggie in known_english_veggies)
+
+    def extract_keywords(name):
+        if not name:
+            return []
+        keywords = name.lower().split()
+        keyword_mappings = {key: list(variants) for key, variants in veg_classifier.KEYWORD_MAPPINGS.items()}
+        return [main_key for main_key, variants in keyword_mappings.items()
+                if any(variant in keywords for variant in variants)]
+
+    def get_veg_type(norm_name):
+        for key, vtype in vegetable_types.items():
+            if key in norm_name:
+                return vtype
+        return "other"
+
+    if not is_english_name(name):
+        return None
+    norm_name = normalize_name(name)
+    return norm_name, get_veg_type(norm_name), extract_keywords(name)
+
+
+def sample_product_names(count, seed=42):
+    """Build OpenFoodFacts-like product names (some non-English, many repeated)."""
+    rng = random.Random(seed)
+    bases = list(veg_classifier.KNOWN_ENGLISH_VEGGIES) + ["courgettes", "aubergine", "coriander", "carottes", "tomaten"]
+    adjectives = ["Organic", "Fresh", "Baby", "Red", "Green", "Frozen", "Chopped", "Sliced", "Roasted", "Mini"]
+    suffixes = ["", "s", " Puree", " Mix", " 500g", " & Herbs", " Soup", "es"]
+    foreign = ["Épinards hachés", "Haricots verts extra-fins", "Gemüse Mischung", "Pimientos del piquillo"]
+    names = []
+    for _ in range(count):
+        if rng.random() < 0.1:
+            names.append(rng.choice(foreign))
+        else:
+            names.append(f"{rng.choice(adjectives)} {rng.choice(bases).title()}{rng.choice(suffixes)}")
+    return names
+
+
+def _rate(label, func, names, rounds, unit="products"):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for name in names:
+            func(name)
+    elapsed = time.perf_counter() - start
+    rate = len(names) * rounds / elapsed
+    print(f"{label:<30} {rate:>12,.0f} {unit}/s")
+    return rate
+
+
+def bench_classifier(args):
+    names = sample_product_names(args.products)
+    for name in names:
+        legacy = legacy_classify(name)
+        current = veg_classifier.classify(name)
+        if legacy is None:
+            assert not current.is_english, name
+        else:
+            assert current.is_english and legacy == (current.norm_name, current.veg_type, list(current.keywords)), name
+
+    def cold(name):
+        veg_classifier.classify.__wrapped__(name)
+
+    print(f"{args.products} products x {args.rounds} rounds")
+    before = _rate("before (per-request helpers)", legacy_classify, names, args.rounds)
+    after_cold = _rate("after (matcher, no memo)", cold, names, args.rounds)
+    after_warm = _rate("after (matcher + memo)", veg_classifier.classify, names, args.rounds)
+    print(f"speedup: {after_cold / before:.1f}x cold, {after_warm / before:.1f}x warm")
+
+
+def _firebase_like_verifier():
+    """Build an RS256 token and a verifier doing the same signature/claims checks
+    as ``auth.verify_id_token`` with Google's public certs already cached."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from google.auth import crypt, jwt
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    public_pem = key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    now = int(time.time())
+    claims = {
+        "iss": "https://securetoken.google.com/smartcart",
+        "aud": "smartcart",
+        "sub": "user-1",
+        "uid": "user-1",
+        "iat": now,
+        "exp": now + 3600,
+    }
+    token = jwt.encode(crypt.RSASigner.from_string(private_pem, key_id="k1"), claims).decode()
+
+    def verify(token, check_revoked=False):
+        return jwt.decode(token, certs={"k1": public_pem}, audience="smartcart")
+
+    return token, verify
+
+
+def bench_auth(args):
+    from token_cache import TokenCache
+
+    token, verify = _firebase_like_verifier()
+    cache = TokenCache(verify)
+    tokens = [token] * 100
+    print(f"{len(tokens) * args.rounds} authenticated requests with the same token")
+    before = _rate("before (verify every request)", verify, tokens, args.rounds, unit="requests")
+    after = _rate("after (TokenCache)", cache.verify, tokens, args.rounds, unit="requests")
+    print(f"auth overhead per request: {1e6 / before:.1f} us -> {1e6 / after:.1f} us ({after / before:.0f}x)")
+
+
+def _profile_documents(cart_size):
+    """Return the same profile with a full-item ``cart`` array and with compact cart entries."""
+    import cart
+    from catalog_index import catalog_id
+
+    profile = {
+        "email": "shopper@example.com",
+        "name": "shopper",
+        "avatarUrl": "https://api.dicebear.com/9.x/pixel-art/svg?seed=Xq3v9LmN2pR8sT1uV4wY6zA0bC",
+        "dietaryPrefs": {pref: False for pref in (
+            "vegan", "glutenFree", "nutFree", "organic", "nonGMO", "lowCarb",
+            "highFiber", "lowSodium", "dairyFree", "keto", "paleo"
+        )},
+    }
+    # What products.js posts to /cart/add for each item
+    names = sorted(set(sample_product_names(cart_size * 20)), key=catalog_id)
+    full_items = []
+    for index, name in enumerate(dict((catalog_id(n), n) for n in names).values()):
+        if len(full_items) == cart_size:
+            break
+        full_items.append({
+            "id": index + 1,
+            "name": name,
+            "price": 1.5,
+            "tags": ["vegan", "gluten-free", "nut-free", "organic", "low-carb"],
+            "image": f"https://images.unsplash.com/photo-1600585154340-be6161a56a0c?ixid=M3w{index:04d}&w=400",
+            "vegType": veg_classifier.classify(name).veg_type,
+            "quantity": 1 + index % 3,
+        })
+    before = {**profile, "cart": full_items}
+    entries = cart._entries(before)[0]
+    after = {**profile, cart.CART_FIELD: entries, cart.TOTALS_FIELD: cart.cart_totals(list(entries.values()))}
+    return before, after
+
+
+def bench_cart_doc(args):
+    from google.cloud.firestore_v1 import _helpers
+    from google.cloud.firestore_v1.types import Document
+
+    before, after = _profile_documents(args.cart_items)
+    print(f"profile with {args.cart_items} cart items, {args.rounds * 100} reads")
+    results = {}
+    for label, data in (("before (full item dicts)", before), ("after (compact entries)", after)):
+        payload = Document.serialize(Document(fields=_helpers.encode_dict(data)))
+        reads = args.rounds * 100
+        start = time.perf_counter()
+        for _ in range(reads):
+            _helpers.decode_dict(Document.deserialize(payload).fields, None)
+        per_read = (time.perf_counter() - start) / reads * 1e6
+        results[label] = (len(payload), per_read)
+        print(f"{label:<30} {len(payload):>8,} bytes {per_read:>10.1f} us/read (client decode)")
+    (size_before, read_before), (size_after, read_after) = results.values()
+    print(f"document size {size_before / size_after:.1f}x smaller, decode {read_before / read_after:.1f}x faster")
+
+
+def _offer_types(products, all_types):
+    """Pick the first product of each veg type, stopping once all are filled.
+
+    Returns the number of products looked at and the time the first offer was picked.
+    """
+    seen_types = set()
+    first_offer = None
+    looked_at = 0
+    for product in products:
+        looked_at += 1
+        classification = veg_classifier.classify(product["product_name_en"])
+        if classification.is_english and classification.veg_type not in seen_types:
+            seen_types.add(classification.veg_type)
+            first_offer = first_offer or time.perf_counter()
+            if seen_types >= all_types:
+                break
+    return looked_at, first_offer
+
+
+def bench_offers(args):
+    import json_stream
+
+    names = sample_product_names(args.products)
+    body = json.dumps({
+        "count": len(names), "page": 1, "page_size": len(names),
+        "products": [{"product_name_en": name, "product_name": name} for name in names],
+        "skip": 0,
+    }).encode()
+    chunk_size = 16 * 1024
+    all_types = frozenset(veg_classifier.VEGETABLE_TYPES.values()) | {"other"}
+
+    def response_stream(read):
+        for start in range(0, len(body), chunk_size):
+            time.sleep(args.chunk_ms / 1000)
+            read.append(start)
+            yield body[start:start + chunk_size]
+
+    def before(read):
+        # Old path: whole body, response.json(), shuffle, classify everything
+        products = json.loads(b"".join(response_stream(read)))["products"]
+        random.shuffle(products)
+        classified = [(product, veg_classifier.classify(product["product_name_en"])) for product in products]
+        return len(classified), _offer_types((product for product, _ in classified), all_types)[1]
+
+    def after(read):
+        return _offer_types(json_stream.iter_array(response_stream(read), "products"), all_types)
+
+    print(f"{len(names)} products, {len(body):,} byte body in {chunk_size // 1024} KB chunks, {args.chunk_ms} ms per chunk")
+    for label, build in (("before (full parse)", before), ("after (streaming)", after)):
+        veg_classifier.classify.cache_clear()
+        read = []
+        tracemalloc.start()
+        start = time.perf_counter()
+        looked_at, first_offer = build(read)
+        total = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{label:<22} first offer {(first_offer - start) * 1000:7.1f} ms, done {total * 1000:7.1f} ms, "
+              f"peak {peak / 1024:8.1f} KB, {len(read)} chunks read, {looked_at} products classified")
+
+
+def bench_search(args):
+    import itertools
+    import string
+
+    from catalog_index import catalog_id
+    from product_search import SearchIndex
+
+    # Distinct names: OFF-like names with a 4-letter variety suffix
+    varieties = ("".join(letters) for letters in itertools.product(string.ascii_lowercase, repeat=4))
+    names = [f"{name} {variety}" for name, variety in zip(sample_product_names(args.products), varieties)]
+    # Catalog ids as the app assigns them, so SearchIndex dedupes as it does in production
+    products = [{"id": catalog_id(name), "name": name} for name in names]
+    start = time.perf_counter()
+    index = SearchIndex(products)
+    print(f"{len(index)} products, {index.stats()['terms']} terms, index built in {time.perf_counter() - start:.2f} s")
+    queries = ["carrot", "courgettes", "brocoli", "spin", "organic tomato", "fresh kale pu", "red onion soup", "xyzzy"]
+
+    def scan(query):
+        # Baseline: lowercase substring match of every word over all names
+        words = query.lower().split()
+        matches = []
+        for product in products:
+            name = product["name"].lower()
+            if all(word in name for word in words):
+                matches.append(product)
+                if len(matches) == 20:
+                    break
+        return matches
+
+    for query in queries:
+        timings = {}
+        for label, search in (("scan", scan), ("index", index.search)):
+            start = time.perf_counter()
+            for _ in range(args.rounds):
+                results = search(query)
+            timings[label] = (time.perf_counter() - start) / args.rounds * 1e6, len(results)
+        print(f"{query!r:<18} scan {timings['scan'][0]:9.0f} us ({timings['scan'][1]:>2} hits)   "
+              f"index {timings['index'][0]:7.0f} us ({timings['index'][1]:>2} hits)")
+
+
+def _legacy_diverse(products, size, per_type, filtered_out):
+    """The set-based pass the catalog builders used before DiversitySelector."""
+    seen_names = set()
+    seen_keywords = set()
+    type_counts = {}
+    selected = []
+    for product in products:
+        if len(selected) >= size:
+            break
+        name = product["name"]
+        if per_type is not None and type_counts.get(product["veg_type"], 0) >= per_type:
+            filtered_out.append({"name": name, "reason": "Type already offered"})
+            continue
+        if any(keyword in seen_keywords for keyword in product["keywords"]):
+            filtered_out.append({"name": name, "reason": "Overlapping keyword"})
+            continue
+        if product["norm_name"] in seen_names:
+            filtered_out.append({"name": name, "reason": "Duplicate name"})
+            continue
+        seen_names.add(product["norm_name"])
+        seen_keywords.update(product["keywords"])
+        type_counts[product["veg_type"]] = type_counts.get(product["veg_type"], 0) + 1
+        selected.append(product)
+    return selected
+
+
+def bench_diversity(args):
+    from diversity import DiversitySelector
+
+    products = []
+    for name in sample_product_names(args.products):
+        classification = veg_classifier.classify(name)
+        products.append({"name": name, "norm_name": classification.norm_name,
+                         "veg_type": classification.veg_type, "keywords": list(classification.keywords)})
+    print(f"{len(products)} candidates")
+    # Every product name unique, so no candidate is skipped on the cheap name check
+    unique = [{**product, "norm_name": f"{product['norm_name']} {i}"} for i, product in enumerate(products)]
+    for label, candidates, size, per_type in (
+        ("catalog (20, no quota)", products, 20, None),
+        ("offers (10, 1 per type)", products, 10, 1),
+        ("full pass, unique names", unique, len(unique), None),
+    ):
+        results = {}
+        for name, run in (
+            ("legacy", lambda: _legacy_diverse(candidates, size, per_type, [])),
+            ("bitset", lambda: DiversitySelector(size, per_type=per_type).select(candidates, rejected=[])),
+        ):
+            start = time.perf_counter()
+            for _ in range(args.rounds):
+                selected = run()
+            results[name] = ((time.perf_counter() - start) / args.rounds * 1000, selected)
+        assert results["legacy"][1] == results["bitset"][1]
+        print(f"{label:<26} legacy {results['legacy'][0]:8.3f} ms   bitset {results['bitset'][0]:8.3f} ms   "
+              f"{len(results['bitset'][1])} selected")
+
+
+BENCHMARKS = {
+    "classifier": bench_classifier,
+    "auth": bench_auth,
+    "cart-doc": bench_cart_doc,
+    "diversity": bench_diversity,
+    "offers": bench_offers,
+    "search": bench_search,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--products", type=int, default=600)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--cart-items", type=int, default=20)
+    parser.add_argument("--chunk-ms", type=float, default=2.0, help="simulated transfer time per 16 KB chunk")
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == "__main__":
+    main()
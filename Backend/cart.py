@@ -0,0 +1,407 @@
+"""Firestore storage for shopping carts.
+
+Cart items live in the ``cartItems`` map field of ``profiles/{uid}``, keyed by
+catalog id. Each entry is compact: ``catalog_id``, ``quantity``,
+``price_at_add`` (integer cents) and ``addedAt``; names, images and tags are
+hydrated from the catalog index on read. An item keeps the price it was
+first added at. Every mutation is a single ``update`` of the affected item's
+field paths, with ``firestore.Increment`` for quantities, so concurrent adds
+never overwrite each other and the cost of an operation does not depend on
+the size of the cart. An add reads the item's stored price first and writes
+only if the profile has not changed since, retrying otherwise. ``addedAt`` is
+kept with ``firestore.Minimum`` so items are listed in the order they were
+first added.
+
+The ``cartTotals`` field holds ``items`` (total quantity) and ``priceCents``
+(integer cents) for the whole cart. Every mutation updates it in the same
+write as the items, so totals never need re-summing on read.
+``check_totals`` recomputes and repairs it across all profiles.
+
+Older profiles still carry a ``cart`` array or full item dicts in the map.
+They are read as compact entries and rewritten the first time the cart is
+read or changed; ``migrate_carts`` does the same in bulk.
+
+``apply_operations`` applies a list of add/remove/set-quantity operations to
+one cart in a single Firestore transaction for ``/cart/batch``.
+"""
+import random
+import time
+from decimal import ROUND_HALF_UP, Decimal
+
+from firebase_admin import firestore
+from google.api_core.exceptions import Aborted, FailedPrecondition, NotFound
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from catalog_index import catalog_id
+
+CART_FIELD = "cartItems"
+LEGACY_CART_FIELD = "cart"
+ORDER_FIELD = "addedAt"
+TOTALS_FIELD = "cartTotals"
+EMPTY_TOTALS = {"items": 0, "priceCents": 0}
+ENTRY_FIELDS = ("catalog_id", "quantity", "price_at_add")
+# Profile fields holding cart state, for field-mask reads
+CART_FIELDS = [CART_FIELD, LEGACY_CART_FIELD, TOTALS_FIELD]
+OPERATIONS = ("add", "remove", "set_quantity")
+MAX_OPERATIONS = 100
+MAX_ADD_ATTEMPTS = 10
+ADD_BACKOFF = 0.01
+ADD_BACKOFF_MAX = 1.0
+
+
+def price_cents(price):
+    """Convert a price in currency units (float or string) to integer cents."""
+    return int(Decimal(str(price or 0)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP) * 100)
+
+
+def check_quantity(quantity):
+    """Return ``quantity`` if it is a positive integer.
+
+    Raises:
+        ValueError: For anything else, including numeric strings, floats and bools.
+    """
+    if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity <= 0:
+        raise ValueError("quantity must be a positive integer")
+    return quantity
+
+
+def _path(*parts):
+    return FieldPath(CART_FIELD, *parts).to_api_repr()
+
+
+def _totals_path(field):
+    return FieldPath(TOTALS_FIELD, field).to_api_repr()
+
+
+def add_item(doc_ref, entry, clock=time.time, sleep=time.sleep):
+    """Add a compact ``entry`` to the cart, or add to its quantity.
+
+    An item keeps the price it was first added at: re-adding it at another
+    price increments the totals with the stored ``price_at_add``, so they
+    stay equal to ``cart_totals``. Only that one field is read; item and
+    totals are then updated with server-side increments in one write, on
+    condition that the profile has not changed since the read. A concurrent
+    change makes the write fail, and the add is retried from the read.
+
+    Args:
+        doc_ref: The user's ``profiles`` document.
+        entry (dict): ``catalog_id``, ``price_at_add`` in cents and an
+            optional ``quantity`` (default 1).
+
+    Raises:
+        google.api_core.exceptions.NotFound: If the profile does not exist.
+        google.api_core.exceptions.Aborted: If every attempt met a concurrent change.
+    """
+    key = entry["catalog_id"]
+    quantity = entry.get("quantity", 1)
+    for attempt in range(MAX_ADD_ATTEMPTS):
+        snapshot = doc_ref.get(field_paths=[_path(key, "price_at_add")])
+        if not snapshot.exists:
+            raise NotFound(f"Profile {doc_ref.id} not found")
+        stored = ((snapshot.to_dict() or {}).get(CART_FIELD) or {}).get(key) or {}
+        price = stored.get("price_at_add", entry["price_at_add"])
+        try:
+            doc_ref.update({
+                _path(key, "catalog_id"): key,
+                _path(key, "price_at_add"): price,
+                _path(key, "quantity"): firestore.Increment(quantity),
+                _path(key, ORDER_FIELD): firestore.Minimum(clock()),
+                _totals_path("items"): firestore.Increment(quantity),
+                _totals_path("priceCents"): firestore.Increment(quantity * price),
+            }, option=firestore.LastUpdateOption(snapshot.update_time))
+            return
+        except FailedPrecondition:
+            if attempt + 1 < MAX_ADD_ATTEMPTS:
+                # Jittered backoff, so concurrent adds to one cart stop colliding
+                sleep(random.uniform(0, min(ADD_BACKOFF_MAX, ADD_BACKOFF * 2 ** attempt)))
+    raise Aborted(f"Cart of {doc_ref.id} kept changing while adding {key}")
+
+
+def remove_item(db, doc_ref, item_id):
+    """Remove an item from the cart; removing a missing item is a no-op.
+
+    The removed quantity has to be known to adjust the totals, so this reads
+    the cart inside a transaction.
+
+    Returns:
+        list: The resulting cart entries.
+
+    Raises:
+        google.api_core.exceptions.NotFound: If the profile does not exist.
+    """
+    return apply_operations(db, doc_ref, [{"op": "remove", "item_id": item_id}])
+
+
+def _compact(item, order):
+    """Compact entry for a full item dict from before catalog ids existed."""
+    return {
+        "catalog_id": catalog_id(item.get("name") or str(item.get("id", ""))),
+        "quantity": item.get("quantity", 1),
+        "price_at_add": price_cents(item.get("price")),
+        ORDER_FIELD: item.get(ORDER_FIELD, order),
+    }
+
+
+def _entries(data):
+    """Return ``(entries, outdated)`` for a profile document.
+
+    ``entries`` maps catalog id to compact entry; ``outdated`` is True when
+    the stored cart is not yet in that form and should be rewritten.
+    """
+    entries = {}
+    outdated = False
+    # Legacy array items predate anything in the map, so they keep sorting first
+    legacy = [_compact(item, position) for position, item in enumerate(data.get(LEGACY_CART_FIELD) or [])]
+    if legacy:
+        outdated = True
+    stored = []
+    for key, entry in (data.get(CART_FIELD) or {}).items():
+        if set(entry) - {ORDER_FIELD} == set(ENTRY_FIELDS) and entry["catalog_id"] == key:
+            stored.append(entry)
+        else:
+            stored.append(_compact(entry, 0))
+            outdated = True
+    for entry in legacy + stored:
+        key = entry["catalog_id"]
+        if key in entries:
+            merged = entries[key]
+            entries[key] = {
+                **merged,
+                "quantity": merged["quantity"] + entry["quantity"],
+                ORDER_FIELD: min(merged.get(ORDER_FIELD, 0), entry.get(ORDER_FIELD, 0)),
+            }
+            outdated = True
+        else:
+            entries[key] = dict(entry)
+    return entries, outdated
+
+
+def _sorted_items(entries):
+    ordered = sorted(entries.values(), key=lambda entry: entry.get(ORDER_FIELD, 0))
+    return [{field: entry[field] for field in ENTRY_FIELDS} for entry in ordered]
+
+
+def cart_items(data):
+    """Return the compact cart entries of a profile document, oldest first."""
+    return _sorted_items(_entries(data)[0])
+
+
+def is_outdated(data):
+    """True if the cart of a profile document still needs ``migrate_cart``."""
+    return _entries(data)[1]
+
+
+def cart_totals(entries):
+    """Compute the ``cartTotals`` aggregate from a list of cart entries."""
+    return {
+        "items": sum(entry["quantity"] for entry in entries),
+        "priceCents": sum(entry["price_at_add"] * entry["quantity"] for entry in entries),
+    }
+
+
+def stored_totals(data):
+    """Return the totals of a profile document, recomputing only when not stored."""
+    totals = data.get(TOTALS_FIELD)
+    if totals is None or data.get(LEGACY_CART_FIELD):
+        return cart_totals(cart_items(data))
+    return totals
+
+
+def summarize(items=None, totals=None):
+    """Return the cart state sent to the frontend: items plus their totals.
+
+    ``items`` are hydrated items and are left out when None, for totals-only
+    responses; ``totals`` defaults to the sum over ``items``.
+    """
+    if totals is None:
+        totals = {
+            "items": sum(item["quantity"] for item in items or []),
+            "priceCents": sum(price_cents(item["price"]) * item["quantity"] for item in items or []),
+        }
+    state = {"totalItems": totals["items"], "totalPrice": totals["priceCents"] / 100}
+    if items is not None:
+        state["items"] = items
+    return state
+
+
+def _rewrite(entries):
+    """Updates replacing the whole stored cart with ``entries``."""
+    return {
+        CART_FIELD: entries,
+        LEGACY_CART_FIELD: firestore.DELETE_FIELD,
+        TOTALS_FIELD: cart_totals(list(entries.values())),
+    }
+
+
+def plan_operations(data, operations, clock=time.time):
+    """Work out the update for applying ``operations`` to a profile document.
+
+    Args:
+        data (dict): The current profile document.
+        operations (list): Dicts with ``op`` set to ``add`` (with ``item``, a
+            compact entry as taken by ``add_item``, whose quantity must be a
+            positive integer), ``remove`` (with
+            ``item_id``) or ``set_quantity`` (with ``item_id`` and
+            ``quantity``; 0 or less removes the item).
+
+    Returns:
+        tuple: The ``update`` field paths, including the recomputed totals,
+        and the resulting list of cart entries.
+
+    Raises:
+        ValueError: If an operation is malformed; nothing is applied then.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise ValueError("operations must be a non-empty list")
+    if len(operations) > MAX_OPERATIONS:
+        raise ValueError(f"At most {MAX_OPERATIONS} operations per batch")
+    entries, outdated = _entries(data)
+    updates = {}
+    now = clock()
+    for operation in operations:
+        op = operation.get("op") if isinstance(operation, dict) else None
+        if op not in OPERATIONS:
+            raise ValueError(f"Unknown cart operation: {op}")
+        if op == "add":
+            item = operation.get("item")
+            if not isinstance(item, dict) or not item.get("catalog_id") or "price_at_add" not in item:
+                raise ValueError("add requires an item with catalog_id and price_at_add")
+            key = item["catalog_id"]
+            entry = dict(entries.get(key) or {
+                "catalog_id": key, "quantity": 0, "price_at_add": item["price_at_add"], ORDER_FIELD: now
+            })
+            entry["quantity"] += check_quantity(item.get("quantity", 1))
+        else:
+            if operation.get("item_id") is None:
+                raise ValueError(f"{op} requires item_id")
+            key = str(operation["item_id"])
+            entry = None
+            if op == "set_quantity":
+                quantity = operation.get("quantity")
+                if isinstance(quantity, bool) or not isinstance(quantity, int):
+                    raise ValueError("set_quantity requires an integer quantity")
+                if quantity > 0 and key in entries:
+                    entry = dict(entries[key], quantity=quantity)
+        if entry is None:
+            entries.pop(key, None)
+            updates[_path(key)] = firestore.DELETE_FIELD
+        else:
+            entries[key] = entry
+            updates[_path(key)] = entry
+    if outdated:
+        updates = _rewrite(entries)
+    items = _sorted_items(entries)
+    updates[TOTALS_FIELD] = cart_totals(items)
+    return updates, items
+
+
+def apply_operations(db, doc_ref, operations, clock=time.time):
+    """Apply ``operations`` to a cart atomically and return the resulting entries.
+
+    Raises:
+        google.api_core.exceptions.NotFound: If the profile does not exist.
+        ValueError: If an operation is malformed.
+    """
+
+    @firestore.transactional
+    def run(transaction):
+        snapshot = doc_ref.get(transaction=transaction)
+        if not snapshot.exists:
+            raise NotFound(f"Profile {doc_ref.id} not found")
+        updates, items = plan_operations(snapshot.to_dict() or {}, operations, clock)
+        transaction.update(doc_ref, updates)
+        return items
+
+    return run(db.transaction())
+
+
+def migrate_cart(doc_ref, snapshot):
+    """Rewrite an outdated cart (``cart`` array or full item dicts) in compact form.
+
+    The write is conditional on the document not having changed since
+    ``snapshot`` was read, so a concurrent mutation makes it fail instead of
+    being overwritten; the next read simply tries again.
+
+    Returns:
+        bool: True if the cart was outdated and has been rewritten.
+    """
+    entries, outdated = _entries(snapshot.to_dict() or {})
+    if not outdated:
+        return False
+    try:
+        doc_ref.update(_rewrite(entries), option=firestore.LastUpdateOption(snapshot.update_time))
+    except Exception as e:
+        print(f"Cart migration skipped for {doc_ref.id}: {str(e)}")
+        return False
+    return True
+
+
+def _bulk_writer(db, report):
+    writer = db.bulk_writer()
+
+    def on_error(failure, _writer):
+        report["failed"] += 1
+        return False
+
+    def on_result(_reference, _result, _writer):
+        report["repaired"] += 1
+
+    writer.on_write_error(on_error)
+    writer.on_write_result(on_result)
+    return writer
+
+
+def check_totals(db, repair=False):
+    """Recompute ``cartTotals`` for every profile and report mismatches.
+
+    With ``repair`` the stored totals of mismatched profiles are overwritten
+    through a BulkWriter. Each write is conditional on the profile not having
+    changed since it was read, so a concurrent cart mutation is never
+    clobbered; such profiles count as failed and are fixed by the next run.
+
+    Returns:
+        dict: Counts of checked, mismatched, repaired and failed profiles.
+    """
+    report = {"checked": 0, "mismatched": 0, "repaired": 0, "failed": 0}
+    writer = _bulk_writer(db, report) if repair else None
+    for snapshot in db.collection("profiles").stream():
+        report["checked"] += 1
+        data = snapshot.to_dict() or {}
+        expected = cart_totals(cart_items(data))
+        if data.get(TOTALS_FIELD) == expected:
+            continue
+        report["mismatched"] += 1
+        if writer:
+            writer.update(
+                snapshot.reference,
+                {TOTALS_FIELD: expected},
+                option=firestore.LastUpdateOption(snapshot.update_time)
+            )
+    if writer:
+        writer.close()
+    return report
+
+
+def migrate_carts(db, dry_run=False):
+    """Rewrite every outdated cart in compact form, like ``migrate_cart``.
+
+    Returns:
+        dict: Counts of checked, outdated, repaired (rewritten) and failed profiles.
+    """
+    report = {"checked": 0, "outdated": 0, "repaired": 0, "failed": 0}
+    writer = None if dry_run else _bulk_writer(db, report)
+    for snapshot in db.collection("profiles").stream():
+        report["checked"] += 1
+        entries, outdated = _entries(snapshot.to_dict() or {})
+        if not outdated:
+            continue
+        report["outdated"] += 1
+        if writer:
+            writer.update(
+                snapshot.reference,
+                _rewrite(entries),
+                option=firestore.LastUpdateOption(snapshot.update_time)
+            )
+    if writer:
+        writer.close()
+    return report
@@ -0,0 +1,146 @@
+"""Stale-while-revalidate snapshots for the catalog endpoints.
+
+A ``CatalogRefresher`` rebuilds its catalog on a background thread every
+``interval`` seconds and keeps the latest result in memory. Requests are always
+answered from that snapshot; a snapshot older than ``max_age`` triggers an
+immediate background rebuild, but the caller still gets the stale copy, so
+request latency never waits on USDA or OpenFoodFacts once a snapshot exists.
+
+Each snapshot carries the content hash of its data as ``etag``, so the
+endpoints can answer conditional requests without serializing anything, and
+optionally an ``index`` of the data built alongside it, such as the filter
+bitmasks of the catalog endpoints.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from http_cache import content_etag
+from singleflight import SingleFlight
+
+Snapshot = namedtuple("Snapshot", ["data", "built_at", "version", "etag", "index"], defaults=[None, None])
+
+
+class CatalogRefresher:
+    """Keep the latest snapshot of one catalog in memory.
+
+    Args:
+        name (str): Catalog name used in logs and stats.
+        build (callable): Builds fresh catalog data; raises on failure.
+        interval (float): Seconds between scheduled background rebuilds.
+        max_age (float, optional): Age after which a request triggers a rebuild.
+            Defaults to ``interval``.
+        fallback (callable, optional): Returns last persisted data (or None),
+            used to serve a cold start while the first build runs.
+        index (callable, optional): Builds the snapshot's ``index`` from its
+            data, once per snapshot.
+    """
+
+    def __init__(self, name, build, interval=900, max_age=None, fallback=None, index=None):
+        self.name = name
+        self.build = build
+        self.interval = interval
+        self.max_age = interval if max_age is None else max_age
+        self.fallback = fallback
+        self.index = index
+        self._snapshot = None
+        self._version = 0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._flight = SingleFlight()
+        self.refreshes = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_duration = None
+
+    def start(self):
+        """Start the background refresh loop (idempotent)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-refresher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.refresh()
+
+    def refresh(self):
+        """Rebuild the catalog now. Returns False if a rebuild was already running."""
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            start = time.time()
+            try:
+                data = self.build()
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                print(f"{self.name} refresh failed: {str(e)}")
+                return True
+            self._set(data, time.time())
+            self.refreshes += 1
+            self.last_error = None
+            self.last_duration = time.time() - start
+            return True
+        finally:
+            self._refresh_lock.release()
+
+    def trigger_refresh(self):
+        """Rebuild in the background unless a rebuild is already running."""
+        if not self._refresh_lock.locked():
+            threading.Thread(target=self.refresh, name=f"{self.name}-refresh", daemon=True).start()
+
+    def _set(self, data, built_at):
+        etag = content_etag(data)
+        index = self.index(data) if self.index else None
+        with self._lock:
+            self._version += 1
+            self._snapshot = Snapshot(data, built_at, self._version, etag, index)
+
+    def get(self):
+        """Return the current snapshot, building or loading one on a cold start.
+
+        Raises:
+            Exception: If there is no snapshot, the fallback has nothing and the
+                synchronous build fails.
+        """
+        self.start()
+        snapshot = self._snapshot
+        if snapshot is None:
+            # Concurrent cold-start requests share one fallback load / build
+            return self._flight.do("cold-start", self._cold_start)
+        if time.time() - snapshot.built_at > self.max_age:
+            self.trigger_refresh()
+        return snapshot
+
+    def _cold_start(self):
+        if self._snapshot is not None:
+            return self._snapshot
+        data = self.fallback() if self.fallback else None
+        if data:
+            # Serve the persisted copy as already stale and rebuild behind it
+            self._set(data, 0)
+            self.trigger_refresh()
+        else:
+            with self._refresh_lock:
+                if self._snapshot is None:
+                    self._set(self.build(), time.time())
+                    self.refreshes += 1
+        return self._snapshot
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version if snapshot else None,
+            "ageSeconds": round(time.time() - snapshot.built_at, 1) if snapshot else None,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "lastError": self.last_error,
+            "lastDurationSeconds": round(self.last_duration, 3) if self.last_duration is not None else None,
+        }
@@ -0,0 +1,102 @@
+"""Dietary and veg-type filtering of catalog snapshots.
+
+``CatalogFilter`` is built once per catalog snapshot. Each product's dietary
+tags are packed into a bitmask (one bit per entry of ``DIETARY_TAGS``) and
+products are grouped into per-veg-type posting lists, so a filtered request
+is a few integer ANDs over the selected types' products instead of string
+matching over every tag of every product.
+
+The semantics are those of the products page: a product must carry all of
+the selected dietary tags, and be of any of the selected veg types (all
+types when none is selected). The products page also shows tags it derives
+from the product name; only the grocery catalog, which that page lists,
+filters on them (``derive_tags``).
+"""
+import heapq
+
+DIETARY_TAGS = (
+    "vegan", "gluten-free", "nut-free", "organic", "non-gmo", "low-carb", "high-fiber", "low-sodium"
+)
+VEG_TYPES = ("root", "leafy", "fruit_vegetable", "cruciferous", "bulb", "squash", "stem", "other")
+TAG_BITS = {tag: 1 << bit for bit, tag in enumerate(DIETARY_TAGS)}
+
+# Tags the products page adds from the product name, on top of the stored tags
+LOW_CARB = ("broccoli", "spinach", "cauliflower", "green peppers", "zucchini")
+HIGH_FIBER = ("broccoli", "cauliflower", "spinach", "carrots")
+
+
+def derived_tags(name):
+    """Return the tags the products page derives from a product ``name``."""
+    name = (name or "").lower()
+    tags = ["organic"]
+    if "zucchini" not in name:
+        tags.append("non-gmo")
+    if any(word in name for word in LOW_CARB):
+        tags.append("low-carb")
+    if any(word in name for word in HIGH_FIBER):
+        tags.append("high-fiber")
+    return tags
+
+
+def tag_mask(tags):
+    """Bitmask of the dietary ``tags``; unknown tags are ignored."""
+    mask = 0
+    for tag in tags:
+        mask |= TAG_BITS.get(tag, 0)
+    return mask
+
+
+def check_filters(tags, veg_types):
+    """Raise ValueError naming any tag or veg type that cannot be filtered on."""
+    unknown = [tag for tag in tags if tag not in TAG_BITS] + [t for t in veg_types if t not in VEG_TYPES]
+    if unknown:
+        raise ValueError(f"Unknown filter: {', '.join(unknown)}")
+
+
+def parse_list(value):
+    """Split a comma-separated query parameter into a sorted, de-duplicated tuple."""
+    return tuple(sorted({part.strip() for part in (value or "").split(",") if part.strip()}))
+
+
+class CatalogFilter:
+    """Tag bitmasks and veg-type posting lists of one catalog's ``items``.
+
+    Args:
+        items (list): Catalog items with ``name``, ``tags`` and (optionally)
+            ``veg_type``; products without a veg type count as ``other``.
+        derive_tags (bool): Also match the tags the products page derives
+            from each name (``derived_tags``), on top of the stored ones.
+    """
+
+    def __init__(self, items, derive_tags=False):
+        self.items = items
+        self._masks = [
+            tag_mask((item.get("tags") or []) + (derived_tags(item.get("name")) if derive_tags else []))
+            for item in items
+        ]
+        self._by_type = {}
+        for position, item in enumerate(items):
+            self._by_type.setdefault(item.get("veg_type") or "other", []).append(position)
+
+    def select(self, tags=(), veg_types=(), offset=0, limit=None):
+        """Return ``(page, total)`` of the items matching the filters, in catalog order.
+
+        Args:
+            tags (iterable): Dietary tags that must all be present.
+            veg_types (iterable): Veg types of which any may match; all when empty.
+            offset (int): Matching items to skip.
+            limit (int, optional): Page size; the rest of the matches when None.
+
+        Raises:
+            ValueError: For a tag or veg type that is not filterable.
+        """
+        check_filters(tags, veg_types)
+        required = tag_mask(tags)
+        if veg_types:
+            positions = heapq.merge(*(self._by_type.get(veg_type, ()) for veg_type in set(veg_types)))
+        else:
+            positions = range(len(self.items))
+        masks = self._masks
+        matches = [position for position in positions if masks[position] & required == required]
+        end = None if limit is None else offset + limit
+        return [self.items[position] for position in matches[offset:end]], len(matches)
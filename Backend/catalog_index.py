@@ -0,0 +1,174 @@
+"""Catalog items by stable id, used to hydrate compact cart entries.
+
+Carts store only ``{catalog_id, quantity, price_at_add}`` per item; name,
+category, tags, image and veg type are looked up here on read. Every grocery
+catalog build feeds the in-memory index and persists it to the
+``catalog_items`` collection, so items that have since left the live catalog,
+or a freshly started process, are still resolved with one ``get_all``. Search
+results are indexed in memory only, and persisted once added to a cart.
+"""
+import threading
+from collections import OrderedDict
+
+from firebase_admin import firestore
+
+DETAIL_FIELDS = ("name", "category", "tags", "image", "veg_type", "price")
+
+
+def catalog_id(name):
+    """Stable id of a catalog item: its display name, lowercased and slugified.
+
+    Distinct products get distinct ids ("Cherry Tomatoes" and "Tomato Paste"
+    are ``cherry-tomatoes`` and ``tomato-paste``), and an item keeps its id
+    across rebuilds.
+    """
+    return "-".join("".join(c if c.isalnum() else " " for c in (name or "").lower()).split()) or "item"
+
+
+class CatalogIndex:
+    """In-memory map of catalog id to item details, backed by Firestore.
+
+    The map holds at most ``maxsize`` items and drops the least recently used
+    beyond that; dropped items are read back from Firestore when needed.
+    Items added without ``persist`` (search results) are only written when
+    ``persist`` is later called for them, i.e. when they reach a cart.
+
+    Args:
+        db: Firestore client, or None when Firestore is unavailable.
+        maxsize (int): Maximum number of items kept in memory.
+    """
+
+    collection = "catalog_items"
+
+    def __init__(self, db=None, maxsize=10000):
+        self.db = db
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        # Ids whose in-memory details have not been written to Firestore
+        self._unsaved = set()
+        self._lock = threading.Lock()
+        self.firestore_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _remember(self, details):
+        """Store ``details`` (id to fields) as most recently used; call with the lock held."""
+        for item_id, fields in details.items():
+            self._items[item_id] = fields
+            self._items.move_to_end(item_id)
+        while len(self._items) > self.maxsize:
+            item_id, _ = self._items.popitem(last=False)
+            self._unsaved.discard(item_id)
+            self.evictions += 1
+
+    def _write(self, details):
+        if not self.db or not details:
+            return
+        try:
+            batch = self.db.batch()
+            for item_id, fields in details.items():
+                batch.set(self.db.collection(self.collection).document(item_id), {
+                    **fields,
+                    "timestamp": firestore.SERVER_TIMESTAMP
+                })
+            batch.commit()
+        except Exception as e:
+            print(f"Error writing {self.collection}: {str(e)}")
+
+    def add(self, items, persist=False):
+        """Index catalog ``items``, filling in missing ``id`` fields in place.
+
+        Args:
+            items (list): Catalog item dicts; None is ignored.
+            persist (bool): Also upsert the items into ``catalog_items``;
+                only items that are new to the index or whose details
+                changed are written. Without it, new or changed items are
+                written by a later ``persist`` call.
+
+        Returns:
+            list: ``items``, so this can wrap a catalog loader.
+        """
+        if not items:
+            return items
+        details = {}
+        for item in items:
+            item["id"] = item.get("id") or catalog_id(item.get("name", ""))
+            details[item["id"]] = {field: item.get(field) for field in DETAIL_FIELDS}
+        with self._lock:
+            changed = {item_id: fields for item_id, fields in details.items() if self._items.get(item_id) != fields}
+            self._remember(details)
+            if persist:
+                self._unsaved.difference_update(changed)
+            else:
+                self._unsaved.update(changed)
+        if persist:
+            self._write(changed)
+        return items
+
+    def persist(self, ids):
+        """Write the in-memory details of ``ids`` that ``catalog_items`` does not have yet."""
+        with self._lock:
+            details = {item_id: self._items[item_id] for item_id in ids if item_id in self._unsaved}
+            self._unsaved.difference_update(details)
+        self._write(details)
+
+    def lookup(self, ids):
+        """Return a dict mapping each known id in ``ids`` to its details."""
+        found = {}
+        missing = []
+        with self._lock:
+            for item_id in dict.fromkeys(ids):
+                details = self._items.get(item_id)
+                if details is None:
+                    missing.append(item_id)
+                else:
+                    self._items.move_to_end(item_id)
+                    found[item_id] = details
+        if self.db and missing:
+            try:
+                refs = [self.db.collection(self.collection).document(item_id) for item_id in missing]
+                for snapshot in self.db.get_all(refs):
+                    if snapshot.exists:
+                        data = snapshot.to_dict()
+                        found[snapshot.id] = {field: data.get(field) for field in DETAIL_FIELDS}
+                        self.firestore_hits += 1
+            except Exception as e:
+                print(f"Error reading {self.collection}: {str(e)}")
+            with self._lock:
+                self._remember({item_id: found[item_id] for item_id in missing if item_id in found})
+        self.misses += sum(1 for item_id in missing if item_id not in found)
+        return found
+
+    def hydrate(self, entries):
+        """Expand compact cart entries into the item dicts the frontend shows.
+
+        The price is always the entry's ``price_at_add``; ids missing from the
+        catalog get a name derived from the id.
+        """
+        details = self.lookup([entry["catalog_id"] for entry in entries])
+        items = []
+        for entry in entries:
+            item_id = entry["catalog_id"]
+            item = details.get(item_id) or {
+                "name": item_id.replace("-", " ").title(),
+                "category": "vegetable",
+                "tags": [],
+                "image": None,
+                "veg_type": "other",
+            }
+            items.append({
+                **{field: value for field, value in item.items() if field != "price"},
+                "id": item_id,
+                "price": entry["price_at_add"] / 100,
+                "quantity": entry["quantity"],
+            })
+        return items
+
+    def __len__(self):
+        return len(self._items)
+
+    def stats(self):
+        return {
+            "size": len(self), "firestoreHits": self.firestore_hits, "misses": self.misses,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,117 @@
+"""Response compression negotiated from ``Accept-Encoding``.
+
+``Compressor.init_app`` compresses every response body of at least
+``min_size`` bytes with brotli (when the ``brotli`` package is installed) or
+gzip, whichever the client ranks higher. Snapshot-backed endpoints go one
+step further: ``Compressor.body`` keeps the serialized and compressed bytes
+per ETag, so a warm request does no JSON encoding or compression at all.
+
+A compressed response keeps its ETag but as a weak validator, since the
+bytes on the wire differ per encoding.
+"""
+import gzip
+
+from flask import current_app, request
+
+from ttl_cache import TTLCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ("application/json", "text/html", "text/plain")
+
+
+class Compressor:
+    """Compress responses, and cache encoded bodies of snapshot responses.
+
+    Args:
+        min_size (int): Smallest body, in bytes, worth compressing.
+        gzip_level (int): gzip compression level.
+        brotli_quality (int): brotli quality, when brotli is installed.
+        cache_size (int): Encoded bodies kept by ``body``.
+        cache_ttl (float): Seconds an encoded body is kept.
+    """
+
+    def __init__(self, min_size=1024, gzip_level=6, brotli_quality=5, cache_size=16, cache_ttl=3600):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.encodings = ("br", "gzip") if brotli else ("gzip",)
+        self._bodies = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self.compressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def init_app(self, app):
+        app.after_request(self.after_request)
+
+    def negotiate(self):
+        """Return the encoding to use for the current request, or None."""
+        return request.accept_encodings.best_match(self.encodings)
+
+    def encode(self, data, encoding):
+        if encoding == "br":
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+
+    def _compress(self, data, encoding):
+        """Return ``(body, encoding)``, leaving small bodies or unwilling clients uncompressed."""
+        if encoding is None or len(data) < self.min_size:
+            return data, None
+        encoded = self.encode(data, encoding)
+        self.compressed += 1
+        self.bytes_in += len(data)
+        self.bytes_out += len(encoded)
+        return encoded, encoding
+
+    def body(self, etag, build):
+        """Return ``(body, encoding)`` for the JSON document identified by ``etag``.
+
+        ``build`` returns the document and is only called the first time an
+        ETag is seen; each encoding of it is compressed once.
+        """
+        encoding = self.negotiate()
+        cached = self._bodies.get((etag, encoding))
+        if cached is not None:
+            return cached
+        data = self._bodies.get((etag, None))
+        if data is None:
+            data = current_app.json.response(build()).get_data()
+            self._bodies.set((etag, None), (data, None))
+        else:
+            data = data[0]
+        result = self._compress(data, encoding)
+        self._bodies.set((etag, encoding), result)
+        return result
+
+    def after_request(self, response):
+        response.vary.add("Accept-Encoding")
+        if "Content-Encoding" in response.headers:
+            self._weaken_etag(response)
+            return response
+        if (response.direct_passthrough or response.status_code < 200
+                or response.status_code in (204, 304) or response.mimetype not in COMPRESSIBLE):
+            return response
+        data, encoding = self._compress(response.get_data(), self.negotiate())
+        if encoding:
+            response.set_data(data)
+            response.headers["Content-Encoding"] = encoding
+            self._weaken_etag(response)
+        return response
+
+    @staticmethod
+    def _weaken_etag(response):
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+
+    def stats(self):
+        return {
+            "encodings": list(self.encodings),
+            "compressed": self.compressed,
+            "bytesIn": self.bytes_in,
+            "bytesOut": self.bytes_out,
+            "cachedBodies": len(self._bodies),
+        }
@@ -0,0 +1,128 @@
+"""Diverse product selection for the catalog builders.
+
+The grocery catalog and the daily offers both want products that differ: no
+two with the same normalized name, no two sharing a vegetable keyword, and a
+bounded number per veg type. ``DiversitySelector`` holds that state for one
+build, across the local index, the API fallback and the mock top-up.
+
+Keywords are bits of an integer mask over the classifier's fixed keyword
+vocabulary (``KEYWORD_MAPPINGS``), so checking a candidate for a shared
+keyword is one AND against the union of every keyword taken so far.
+"""
+import random
+
+from veg_classifier import KEYWORD_MAPPINGS
+
+KEYWORD_BITS = {keyword: 1 << bit for bit, keyword in enumerate(KEYWORD_MAPPINGS)}
+
+
+class DiversitySelector:
+    """Greedily select up to ``size`` mutually diverse products.
+
+    Products are dicts with ``name``, ``norm_name``, ``veg_type`` and
+    ``keywords``; they are selected as given.
+
+    Args:
+        size (int): Products to select at most.
+        per_type (int, optional): Products of one veg type at most; no limit
+            when None.
+        quotas (dict, optional): Per-veg-type limits overriding ``per_type``.
+        seed (int, optional): Seed of ``rng``, which orders shuffled
+            candidates; the same seed and candidates give the same selection.
+    """
+
+    def __init__(self, size, per_type=None, quotas=None, seed=None):
+        self.size = size
+        self.per_type = per_type
+        self.quotas = quotas or {}
+        self.rng = random.Random(seed)
+        self.selected = []
+        self.type_counts = {}
+        self._names = set()
+        self._keywords = 0
+        self._bits = dict(KEYWORD_BITS)
+
+    def keyword_mask(self, keywords):
+        """Bitmask of ``keywords``; keywords outside the vocabulary get bits of their own."""
+        mask = 0
+        for keyword in keywords:
+            bit = self._bits.get(keyword)
+            if bit is None:
+                bit = self._bits[keyword] = 1 << len(self._bits)
+            mask |= bit
+        return mask
+
+    @property
+    def full(self):
+        return len(self.selected) >= self.size
+
+    def type_full(self, veg_type):
+        """Whether ``veg_type`` has reached its quota."""
+        quota = self.quotas.get(veg_type, self.per_type)
+        return quota is not None and self.type_counts.get(veg_type, 0) >= quota
+
+    def add(self, product, check_quota=True):
+        """Select ``product`` unless it would repeat a name or keyword, or exceed its type's quota.
+
+        Returns:
+            str: Why the product was rejected, or None if it was selected.
+        """
+        if self.full:
+            return "Selection full"
+        rejected = []
+        self.select((product,), check_quota=check_quota, rejected=rejected)
+        return rejected[0]["reason"] if rejected else None
+
+    def select(self, products, shuffle=False, check_quota=True, rejected=None):
+        """Offer ``products`` in order, or shuffled with ``rng``, until the selection is full.
+
+        Args:
+            products (iterable): Candidate products.
+            shuffle (bool): Shuffle the candidates with ``rng`` first.
+            check_quota (bool): Apply the per-type quotas.
+            rejected (list, optional): Receives a ``{"name", "reason"}`` dict
+                for each rejected product.
+
+        Returns:
+            list: The newly selected products.
+        """
+        if shuffle:
+            products = list(products)
+            self.rng.shuffle(products)
+        selected = []
+        room = self.size - len(self.selected)
+        per_type = self.per_type if check_quota else None
+        quotas = self.quotas if check_quota else {}
+        type_counts = self.type_counts
+        names = self._names
+        bits = self._bits
+        taken = self._keywords
+        for product in products:
+            if room <= 0:
+                break
+            veg_type = product["veg_type"]
+            count = type_counts.get(veg_type, 0)
+            quota = quotas.get(veg_type, per_type)
+            if quota is not None and count >= quota:
+                reason = "Type quota reached"
+            else:
+                mask = 0
+                for keyword in product["keywords"]:
+                    bit = bits.get(keyword)
+                    mask |= self.keyword_mask((keyword,)) if bit is None else bit
+                if mask & taken:
+                    reason = "Overlapping keyword"
+                elif product["norm_name"] in names:
+                    reason = "Duplicate name"
+                else:
+                    taken |= mask
+                    names.add(product["norm_name"])
+                    type_counts[veg_type] = count + 1
+                    selected.append(product)
+                    room -= 1
+                    continue
+            if rejected is not None:
+                rejected.append({"name": product["name"], "reason": reason})
+        self._keywords = taken
+        self.selected.extend(selected)
+        return selected
@@ -0,0 +1,49 @@
+"""orjson-backed JSON provider for the Flask app.
+
+``OrjsonProvider`` produces the same documents as Flask's default provider
+(sorted keys, HTTP dates for datetimes, the same ``default`` hook for
+decimals, UUIDs and dataclasses) several times faster. Values orjson
+refuses, such as integers wider than 64 bits, fall back to the stdlib
+encoder. When orjson is not installed ``orjson`` is None and the app keeps
+the default provider.
+"""
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Drop-in replacement for ``DefaultJSONProvider``; set ``app.json = OrjsonProvider(app)``."""
+
+    def _options(self, indent=False):
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps_bytes(self, obj, indent=False):
+        """Serialize ``obj`` to UTF-8 JSON bytes."""
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._options(indent))
+        except orjson.JSONEncodeError:
+            return super().dumps(obj, indent=2 if indent else None).encode("utf-8")
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self.dumps_bytes(obj, indent=indent) + b"\n", mimetype=self.mimetype)
@@ -0,0 +1,42 @@
+"""ETags and conditional GET for the JSON read endpoints.
+
+An endpoint computes the ETag of what it is about to return from a cheap
+source (a catalog snapshot's content hash, or the stored profile fields)
+and hands the expensive part of the response to ``conditional_json`` as a
+callable. A request whose ``If-None-Match`` already holds that ETag gets an
+empty 304 without the callable ever running.
+"""
+import hashlib
+import json
+
+from flask import current_app, jsonify, request
+
+
+def content_etag(data):
+    """Strong ETag of JSON-serializable ``data``, the same in every process."""
+    body = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(body.encode("utf-8")).hexdigest()
+
+
+def conditional_json(etag, build, cache_control, compressor=None):
+    """Return a 304 if the client already has ``etag``, else ``jsonify(build())``.
+
+    Args:
+        etag (str): ETag of the response body.
+        build (callable): Returns the JSON body; only called on a miss.
+        cache_control (str): ``Cache-Control`` header for either response.
+        compressor (Compressor, optional): Serve the body from its cache of
+            encoded bodies; for documents shared by every client.
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    elif compressor is not None:
+        body, encoding = compressor.body(etag, build)
+        response = current_app.response_class(body, mimetype=current_app.json.mimetype)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    return response
@@ -0,0 +1,104 @@
+"""Batched vegetable image lookup for /grocery-items.
+
+All names of a response are resolved in one step: an in-process LRU first,
+then a single Firestore ``get_all`` over the ``image_cache`` documents, then
+concurrent Unsplash searches for the remaining misses, written back to
+Firestore in one batch.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from firebase_admin import firestore
+
+import upstream
+from ttl_cache import TTLCache
+
+DEFAULT_IMAGE_URL = "https://images.unsplash.com/photo-1600585154340-be6161a56a0c?w=300"
+UNSPLASH_BASE_URL = os.getenv("UNSPLASH_BASE_URL", "https://api.unsplash.com")
+# Failed lookups fall back to the default image and are retried after this many seconds
+FAILURE_TTL = 300
+
+executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("IMAGE_FETCH_CONCURRENCY", "5")),
+    thread_name_prefix="unsplash"
+)
+
+
+class ImageResolver:
+    """Resolve vegetable names to image URLs with as few round trips as possible."""
+
+    collection = "image_cache"
+
+    def __init__(self, db=None, access_key=None, maxsize=1000, ttl=24 * 3600, base_url=None, pool=None):
+        self.db = db
+        self.access_key = access_key
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.base_url = base_url or UNSPLASH_BASE_URL
+        self.pool = pool or executor
+        self.firestore_hits = 0
+        self.unsplash_calls = 0
+
+    def _fetch(self, name):
+        response = upstream.get(
+            f"{self.base_url}/search/photos",
+            params={"query": name, "per_page": 1},
+            headers={"Authorization": f"Client-ID {self.access_key}"}
+        )
+        response.raise_for_status()
+        data = response.json()
+        return data["results"][0]["urls"]["small"] if data["results"] else DEFAULT_IMAGE_URL
+
+    def resolve(self, names):
+        """Return a dict mapping each name (lowercased) to an image URL."""
+        keys = list(dict.fromkeys(name.lower() for name in names))
+        images = {}
+        missing = []
+        for key in keys:
+            url = self.memory.get(key)
+            if url is None:
+                missing.append(key)
+            else:
+                images[key] = url
+
+        if self.db and missing:
+            try:
+                refs = [self.db.collection(self.collection).document(key) for key in missing]
+                for snapshot in self.db.get_all(refs):
+                    if snapshot.exists:
+                        url = snapshot.to_dict().get("image_url", DEFAULT_IMAGE_URL)
+                        images[snapshot.id] = url
+                        self.memory.set(snapshot.id, url)
+                        self.firestore_hits += 1
+            except Exception as e:
+                print(f"Error reading image cache: {str(e)}")
+            missing = [key for key in missing if key not in images]
+
+        if missing:
+            futures = {key: self.pool.submit(self._fetch, key) for key in missing}
+            fetched = {}
+            for key, future in futures.items():
+                try:
+                    fetched[key] = future.result()
+                except Exception as e:
+                    print(f"Error fetching image for {key}: {str(e)}")
+                    images[key] = DEFAULT_IMAGE_URL
+                    self.memory.set(key, DEFAULT_IMAGE_URL, ttl=FAILURE_TTL)
+            self.unsplash_calls += len(futures)
+            for key, url in fetched.items():
+                images[key] = url
+                self.memory.set(key, url)
+            if self.db and fetched:
+                try:
+                    batch = self.db.batch()
+                    for key, url in fetched.items():
+                        batch.set(self.db.collection(self.collection).document(key), {
+                            "image_url": url,
+                            "timestamp": firestore.SERVER_TIMESTAMP
+                        })
+                    batch.commit()
+                except Exception as e:
+                    print(f"Error writing image cache: {str(e)}")
+        return images
+
+    def stats(self):
+        return {**self.memory.stats(), "firestoreHits": self.firestore_hits, "unsplashCalls": self.unsplash_calls}
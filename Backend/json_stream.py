@@ -0,0 +1,80 @@
+"""Incremental parsing of large JSON responses.
+
+``iter_array(chunks, key)`` yields the elements of an array member of a JSON
+object one at a time, as soon as their bytes have arrived. A consumer can
+stop iterating, and close the response, once it has what it needs; only the
+undecoded tail of the stream is ever held in memory.
+"""
+import codecs
+import json
+import re
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r"\s*")
+
+
+def _text(chunks):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in chunks:
+        yield decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+    yield decoder.decode(b"", final=True)
+
+
+def _skip(buffer, index):
+    return _whitespace.match(buffer, index).end()
+
+
+def iter_array(chunks, key):
+    """Yield the elements of the array stored under ``key``.
+
+    Args:
+        chunks (iterable): Bytes or text chunks of one JSON object, such as
+            ``response.iter_content(chunk_size)``.
+        key (str): Member name of the array; the first ``"key": [`` in the
+            stream is taken, so it should not also appear in an earlier string.
+
+    Raises:
+        ValueError: If there is no such array, or the stream is malformed or
+            ends before the array does.
+    """
+    text = _text(chunks)
+    opening = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    buffer = ""
+    for chunk in text:
+        buffer += chunk
+        match = opening.search(buffer)
+        if match:
+            buffer = buffer[match.end():]
+            break
+        # Keep enough of the tail to match a key split across chunks
+        buffer = buffer[-(len(key) + 64):]
+    else:
+        raise ValueError(f"No {key!r} array in JSON stream")
+
+    first = True
+    while True:
+        index = _skip(buffer, 0)
+        if index < len(buffer) and buffer[index] == "]":
+            return
+        if not first and index < len(buffer):
+            if buffer[index] != ",":
+                raise ValueError(f"Malformed {key!r} array in JSON stream")
+            index = _skip(buffer, index + 1)
+        # A number may be cut short at a chunk boundary ("12" of "12.5"), so a
+        # value only counts once the "," or "]" after it has arrived.
+        if index < len(buffer):
+            try:
+                item, end = _decoder.raw_decode(buffer, index)
+            except ValueError:
+                end = None
+            if end is not None:
+                after = _skip(buffer, end)
+                if after < len(buffer) and buffer[after] in ",]":
+                    yield item
+                    buffer = buffer[after:]
+                    first = False
+                    continue
+        more = next(text, None)
+        if more is None:
+            raise ValueError(f"JSON stream ended inside {key!r} array")
+        buffer += more
@@ -0,0 +1,110 @@
+"""Background, batched writer for the Firestore ``api_logs`` collection.
+
+Handlers call ``LogSink.add(record)``, which only appends to a bounded
+in-memory queue. A background thread writes queued records with Firestore
+batched writes whenever ``batch_size`` records are waiting or
+``flush_interval`` seconds have passed, and once more at interpreter exit.
+When the queue is full new records are dropped and counted rather than
+blocking the request. ``firestore.SERVER_TIMESTAMP`` fields therefore record
+write time, at most ``flush_interval`` after the event.
+"""
+import atexit
+import threading
+from collections import deque
+
+# Firestore rejects batches with more than 500 writes
+MAX_BATCH_WRITES = 500
+
+
+class LogSink:
+    """Queue log records in memory and flush them to Firestore in batches."""
+
+    def __init__(self, db, collection="api_logs", max_queue=10000, batch_size=100, flush_interval=2.0):
+        self.db = db
+        self.collection = collection
+        self.max_queue = max_queue
+        self.batch_size = min(batch_size, MAX_BATCH_WRITES)
+        self.flush_interval = flush_interval
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.failures = 0
+
+    def add(self, record):
+        """Queue ``record`` for writing; never blocks on Firestore."""
+        if not self.db or self._closed:
+            return
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self.dropped += 1
+                return
+            self._queue.append(record)
+            self.enqueued += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"{self.collection}-sink", daemon=True)
+                self._thread.start()
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if len(self._queue) < self.batch_size and not self._closed:
+                    self._cond.wait(self.flush_interval)
+                if self._closed:
+                    return
+            self.flush()
+
+    def _take(self):
+        with self._cond:
+            count = min(len(self._queue), self.batch_size)
+            return [self._queue.popleft() for _ in range(count)]
+
+    def flush(self):
+        """Write everything queued so far."""
+        with self._flush_lock:
+            records = self._take()
+            while records:
+                try:
+                    batch = self.db.batch()
+                    for record in records:
+                        batch.set(self.db.collection(self.collection).document(), record)
+                    batch.commit()
+                    self.written += len(records)
+                    self.flushes += 1
+                except Exception as e:
+                    self.failures += 1
+                    self.dropped += len(records)
+                    print(f"Error writing {self.collection}: {str(e)}")
+                records = self._take()
+
+    def close(self):
+        """Stop the background thread and flush what is left."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self.flush()
+
+    def stats(self):
+        return {
+            "queued": len(self._queue),
+            "maxQueue": self.max_queue,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "failures": self.failures,
+        }
+
+
+def create_sink(db, collection, **kwargs):
+    """Create a LogSink that is flushed when the process shuts down."""
+    sink = LogSink(db, collection, **kwargs)
+    atexit.register(sink.close)
+    return sink
@@ -0,0 +1,110 @@
+"""Maintenance commands for the Firestore data behind the backend.
+
+Run from the Backend directory, e.g. ``python manage.py check-cart-totals --repair``.
+Uses the same ``firebase_config.json`` service account as app.py.
+``ingest-catalog`` only writes the local product index and needs no Firebase.
+"""
+import argparse
+import json
+import os
+from contextlib import closing
+
+import firebase_admin
+from dotenv import load_dotenv
+from firebase_admin import credentials, firestore
+
+load_dotenv()
+
+import cart
+import upstream
+from product_store import OFF, USDA, ProductStore, file_chunks, off_records, usda_records
+
+USDA_SEARCH_URL = "https://api.nal.usda.gov/fdc/v1/foods/search"
+OFF_SEARCH_URL = "https://world.openfoodfacts.org/api/v2/search"
+
+
+def connect():
+    firebase_admin.initialize_app(credentials.Certificate("firebase_config.json"))
+    return firestore.client()
+
+
+def check_cart_totals(db, args):
+    report = cart.check_totals(db, repair=args.repair)
+    print(json.dumps(report))
+
+
+def migrate_carts(db, args):
+    report = cart.migrate_carts(db, dry_run=args.dry_run)
+    print(json.dumps(report))
+
+
+def _fetched(url, params, parse):
+    """Stream one search page from ``url`` through ``parse``."""
+    with closing(upstream.get(url, params=params, stream=True)) as response:
+        response.raise_for_status()
+        yield from parse(response.iter_content(64 * 1024))
+
+
+def ingest_catalog(db, args):
+    store = ProductStore(args.db)
+    sources = []
+    for path in args.usda:
+        sources.append((USDA, path, usda_records(file_chunks(path))))
+    for path in args.off:
+        jsonl = ".jsonl" in os.path.basename(path)
+        sources.append((OFF, path, off_records(file_chunks(path), jsonl=jsonl)))
+    for page in range(1, args.fetch_pages + 1):
+        sources.append((USDA, f"{USDA_SEARCH_URL} page {page}", _fetched(USDA_SEARCH_URL, {
+            "api_key": os.getenv("USDA_API_KEY"),
+            "query": "vegetables",
+            "pageSize": 200,
+            "pageNumber": page,
+            "dataType": "Foundation,SR Legacy,Branded"
+        }, usda_records)))
+        sources.append((OFF, f"{OFF_SEARCH_URL} page {page}", _fetched(OFF_SEARCH_URL, {
+            "categories_tags_en": "vegetables",
+            "fields": "product_name_en,product_name",
+            "lang": "en",
+            "page_size": 1000,
+            "page": page,
+            "json": "true"
+        }, off_records)))
+    report = {}
+    replaced = set()
+    for source, name, records in sources:
+        try:
+            report[name] = store.ingest(source, records, replace=args.replace and source not in replaced)
+            replaced.add(source)
+        except Exception as e:
+            report[name] = {"error": str(e)}
+    report["total"] = store.counts()
+    print(json.dumps(report))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.set_defaults(firebase=True)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    totals = commands.add_parser("check-cart-totals", help="recompute cartTotals for every profile")
+    totals.add_argument("--repair", action="store_true", help="overwrite mismatched totals")
+    totals.set_defaults(run=check_cart_totals)
+
+    migrate = commands.add_parser("migrate-carts", help="rewrite old carts as compact catalog entries")
+    migrate.add_argument("--dry-run", action="store_true", help="only count outdated carts")
+    migrate.set_defaults(run=migrate_carts)
+
+    ingest = commands.add_parser("ingest-catalog", help="load USDA/OpenFoodFacts products into the local product index")
+    ingest.add_argument("--usda", action="append", default=[], help="FoodData Central JSON file (.json or .json.gz)")
+    ingest.add_argument("--off", action="append", default=[], help="OpenFoodFacts search JSON or .jsonl(.gz) export")
+    ingest.add_argument("--fetch-pages", type=int, default=0, help="also pull this many pages from each search API")
+    ingest.add_argument("--db", default=os.getenv("PRODUCT_DB_PATH", "products.db"), help="SQLite file to write")
+    ingest.add_argument("--replace", action="store_true", help="drop existing products of each ingested source first")
+    ingest.set_defaults(run=ingest_catalog, firebase=False)
+
+    args = parser.parse_args()
+    args.run(connect() if args.firebase else None, args)
+
+
+if __name__ == "__main__":
+    main()
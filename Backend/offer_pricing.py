@@ -0,0 +1,51 @@
+"""Seeded, rule-based prices for the daily offers.
+
+An offer's prices are a pure function of the pricing seed, the region, the
+day and the product, so every worker prices the same offer identically and
+prices only change when the day does. The regular price is drawn from the
+range of the product's veg type and the sale price takes one of a fixed set
+of discounts off it, so a sale price is always below the original.
+"""
+import datetime
+import hashlib
+
+# Regular price range per veg type, in dollars
+PRICE_RANGES = {
+    "root": (1.49, 3.49),
+    "leafy": (1.99, 3.99),
+    "fruit_vegetable": (2.49, 4.99),
+    "cruciferous": (2.29, 4.49),
+    "bulb": (1.29, 2.99),
+    "squash": (1.99, 3.99),
+    "stem": (2.99, 4.99),
+    "other": (1.99, 4.99),
+}
+DISCOUNTS = (0.10, 0.15, 0.20, 0.25, 0.30, 0.40)
+
+
+def offer_day(now=None):
+    """The offer day (UTC date, ``YYYY-MM-DD``) of aware datetime ``now``, defaulting to the current time."""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    return now.astimezone(datetime.timezone.utc).date().isoformat()
+
+
+def _digest(*parts):
+    return hashlib.sha256(":".join(str(part) for part in parts).encode("utf-8")).digest()
+
+
+def _fraction(*parts):
+    """A number in [0, 1) determined by ``parts``."""
+    return int.from_bytes(_digest(*parts)[:8], "big") / 2 ** 64
+
+
+def day_seed(seed, region, day):
+    """Integer seed for the day's offer selection in ``region``."""
+    return int.from_bytes(_digest(seed, region, day)[:8], "big")
+
+
+def price(seed, region, day, norm_name, veg_type):
+    """Return ``(original, sale)`` prices of a product offered on ``day`` in ``region``."""
+    low, high = PRICE_RANGES.get(veg_type, PRICE_RANGES["other"])
+    original = round(low + (high - low) * _fraction(seed, region, day, norm_name, "original"), 2)
+    discount = DISCOUNTS[int(_fraction(seed, region, day, norm_name, "discount") * len(DISCOUNTS))]
+    return original, round(original * (1 - discount), 2)
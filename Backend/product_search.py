@@ -0,0 +1,204 @@
+"""In-memory product search: inverted index, prefix trie and typo tolerance.
+
+``SearchIndex`` is built once per catalog refresh. Product names are split
+into lowercase tokens with a light plural stem, and every token that is a
+vegetable variant in the classifier's keyword table is also indexed under
+its keyword, so "courgettes" finds zucchini and "coriander" finds cilantro.
+
+A query is the AND of its tokens. Each token resolves to a small set of
+index terms: the term itself and its keyword synonyms, plus the most common
+terms it is a prefix of when it is the last token (search-as-you-type), and
+only when none of those exist, terms within a bounded edit distance (1, or
+2 for tokens of 8+ characters) found through a deletion index.
+
+Postings are doc-id bitmaps held in Python ints: a token is the OR of its
+terms' bitmaps, a query the AND of its tokens, whatever their frequency.
+Products are stored in rank order (shortest name first), so the best
+matches are the lowest set bits of the result.
+"""
+import heapq
+import re
+from itertools import combinations
+
+from veg_classifier import extract_keywords
+
+PREFIX_TERMS = 8
+# Terms in at least this many products keep a prebuilt bitmap; rarer ones are built per query
+BITMAP_MIN_POSTINGS = 32
+_TOKEN = re.compile(r"[^\W_]+")
+
+
+def _stem(token):
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    return [_stem(token) for token in _TOKEN.findall((text or "").lower())]
+
+
+def _synonyms(token):
+    return extract_keywords(token) if token.isalpha() else []
+
+
+def max_distance(term):
+    if len(term) >= 8:
+        return 2
+    return 1 if len(term) >= 4 else 0
+
+
+def _deletes(term, distance):
+    """All strings obtained by deleting up to ``distance`` characters of ``term``."""
+    deletes = {term}
+    for count in range(1, distance + 1):
+        for positions in combinations(range(len(term)), count):
+            deletes.add("".join(c for i, c in enumerate(term) if i not in positions))
+    return deletes
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance of ``a`` and ``b``, or ``limit + 1`` once it exceeds ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class _TrieNode:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children = {}
+        self.top = ()
+
+
+class SearchIndex:
+    """Search over ``products``, dicts with at least a ``name``.
+
+    Args:
+        products (iterable): Products to index; kept as given and returned
+            by ``search``. Ids are catalog ids, unique per product name, so
+            only the same product listed twice (by the grocery catalog and
+            the product index) is dropped: later duplicates of an ``id``.
+    """
+
+    def __init__(self, products):
+        unique = {}
+        for product in products:
+            unique.setdefault(product.get("id") or product["name"], product)
+        self.products = sorted(unique.values(), key=lambda product: (len(product["name"]), product["name"]))
+        postings = {}
+        for doc, product in enumerate(self.products):
+            terms = set()
+            for token in tokenize(product["name"]):
+                terms.add(token)
+                terms.update(_synonyms(token))
+            for term in terms:
+                postings.setdefault(term, []).append(doc)
+        self._postings = postings
+        self._bitmaps = {
+            term: self._to_bitmap(docs) for term, docs in postings.items() if len(docs) >= BITMAP_MIN_POSTINGS
+        }
+        self._trie = self._build_trie()
+        self._deletions = {}
+        for term in postings:
+            for deleted in _deletes(term, max_distance(term)):
+                self._deletions.setdefault(deleted, []).append(term)
+
+    def _to_bitmap(self, docs):
+        bits = bytearray((len(self.products) + 7) // 8)
+        for doc in docs:
+            bits[doc >> 3] |= 1 << (doc & 7)
+        return int.from_bytes(bits, "little")
+
+    def _bitmap(self, term):
+        bitmap = self._bitmaps.get(term)
+        return self._to_bitmap(self._postings[term]) if bitmap is None else bitmap
+
+    def _build_trie(self):
+        root = _TrieNode()
+        for term in self._postings:
+            node = root
+            for char in term:
+                node = node.children.setdefault(char, _TrieNode())
+            node.top = (term,)
+        self._fill_top(root)
+        return root
+
+    def _fill_top(self, node):
+        """Keep at each node the ``PREFIX_TERMS`` most frequent terms below it."""
+        stack = [(node, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.children.values())
+                continue
+            candidates = list(node.top)
+            for child in node.children.values():
+                candidates.extend(child.top)
+            node.top = tuple(heapq.nsmallest(
+                PREFIX_TERMS, candidates, key=lambda term: (-len(self._postings[term]), term)
+            ))
+
+    def prefix_terms(self, prefix):
+        """Return up to ``PREFIX_TERMS`` of the most frequent terms starting with ``prefix``."""
+        node = self._trie
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return ()
+        return node.top
+
+    def fuzzy_terms(self, token):
+        """Return index terms within ``max_distance(token)`` edits of ``token``."""
+        limit = max_distance(token)
+        if not limit:
+            return set()
+        candidates = set()
+        for deleted in _deletes(token, limit):
+            candidates.update(self._deletions.get(deleted, ()))
+        return {term for term in candidates if edit_distance(token, term, limit) <= limit}
+
+    def _token_terms(self, token, prefix):
+        terms = {term for term in [token, *_synonyms(token)] if term in self._postings}
+        if prefix:
+            terms.update(self.prefix_terms(token))
+        return terms or self.fuzzy_terms(token)
+
+    def search(self, query, limit=20):
+        """Return up to ``limit`` products matching every token of ``query``, best first."""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or limit <= 0:
+            return []
+        term_sets = [self._token_terms(token, prefix=index == len(tokens) - 1) for index, token in enumerate(tokens)]
+        if not all(term_sets):
+            return []
+        matches = None
+        for terms in term_sets:
+            bitmap = 0
+            for term in terms:
+                bitmap |= self._bitmap(term)
+            matches = bitmap if matches is None else matches & bitmap
+            if not matches:
+                return []
+        results = []
+        while matches and len(results) < limit:
+            lowest = matches & -matches
+            results.append(self.products[lowest.bit_length() - 1])
+            matches ^= lowest
+        return results
+
+    def __len__(self):
+        return len(self.products)
+
+    def stats(self):
+        return {"products": len(self.products), "terms": len(self._postings)}
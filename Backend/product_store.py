@@ -0,0 +1,320 @@
+"""Local SQLite index of USDA and OpenFoodFacts vegetable products.
+
+``python manage.py ingest-catalog`` fills it from FoodData Central / OFF dump
+files (or pulls pages from the live search APIs), classifying every product
+once at ingest: normalized name, catalog id, veg type, keywords and tags are
+stored alongside the name. The catalog builders then draw their candidates
+from here with a few indexed queries instead of querying the APIs, and from
+a pool of every ingested product rather than one page of search results.
+
+Every product name of a source gets its own row, however many share a
+normalized name. Rows are indexed by ``(source, veg_type)``. ``select`` takes
+a window of each type at a random offset and picks round-robin across types,
+applying name and keyword diversity as it goes, so the result covers as many
+vegetable types as the pool has.
+"""
+import codecs
+import gzip
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+import json_stream
+from catalog_index import catalog_id
+from diversity import DiversitySelector
+from veg_classifier import classify
+
+USDA = "usda"
+OFF = "off"
+# Tags the catalog builders have always given products from each source
+SOURCE_TAGS = {
+    USDA: ["vegan", "gluten-free", "nut-free", "organic"],
+    OFF: ["vegan", "gluten-free", "nut-free"],
+}
+USDA_ARRAYS = ("foods", "FoundationFoods", "SRLegacyFoods", "BrandedFoods")
+CHUNK_SIZE = 64 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    name TEXT NOT NULL,
+    norm_name TEXT NOT NULL,
+    catalog_id TEXT NOT NULL,
+    veg_type TEXT NOT NULL,
+    keywords TEXT NOT NULL,
+    category TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    UNIQUE (source, name)
+);
+CREATE INDEX IF NOT EXISTS products_by_type ON products (source, veg_type, id);
+"""
+COLUMNS = "name, norm_name, catalog_id, veg_type, keywords, category, tags"
+# Version 2 made rows unique per product name instead of per normalized name
+SCHEMA_VERSION = 2
+# Rebuilds a version 1 table, whose UNIQUE constraint cannot be altered in place
+MIGRATION = f"""
+BEGIN;
+DROP INDEX IF EXISTS products_by_type;
+ALTER TABLE products RENAME TO products_v1;
+{SCHEMA}
+INSERT OR IGNORE INTO products (id, source, {COLUMNS}) SELECT id, source, {COLUMNS} FROM products_v1;
+DROP TABLE products_v1;
+PRAGMA user_version = {SCHEMA_VERSION};
+COMMIT;
+"""
+
+
+def file_chunks(path):
+    """Yield the bytes of ``path`` in chunks, decompressing ``.gz`` files."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def usda_records(chunks):
+    """Yield ``(name, category)`` for each food of a FoodData Central JSON document.
+
+    Accepts API search responses (``foods``) and the Foundation, SR Legacy
+    and Branded download files.
+    """
+    chunks = iter(chunks)
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        if any(f'"{key}"'.encode() in head for key in USDA_ARRAYS) or len(head) > CHUNK_SIZE:
+            break
+    key = next((key for key in USDA_ARRAYS if f'"{key}"'.encode() in head), USDA_ARRAYS[0])
+
+    def replay():
+        yield head
+        yield from chunks
+
+    for food in json_stream.iter_array(replay(), key):
+        category = food.get("foodCategory") or food.get("brandedFoodCategory") or ""
+        if isinstance(category, dict):
+            category = category.get("description") or ""
+        yield food.get("description") or "", category
+
+
+def off_records(chunks, jsonl=False):
+    """Yield ``(name, category)`` for each vegetable product of an OpenFoodFacts document.
+
+    ``chunks`` is either a search response (``products`` array) or, with
+    ``jsonl``, the one-product-per-line export. Products whose category tags
+    do not mention vegetables are skipped; search results, which were already
+    filtered by category, usually carry no tags.
+    """
+    if jsonl:
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        pending = ""
+
+        def lines():
+            nonlocal pending
+            for chunk in chunks:
+                pending += decoder.decode(chunk)
+                *complete, pending = pending.split("\n")
+                for line in complete:
+                    if line.strip():
+                        yield json.loads(line)
+            if pending.strip():
+                yield json.loads(pending)
+
+        products = lines()
+    else:
+        products = json_stream.iter_array(chunks, "products")
+    for product in products:
+        tags = product.get("categories_tags")
+        if tags and not any("vegetable" in tag for tag in tags):
+            continue
+        yield product.get("product_name_en") or product.get("product_name") or "", "vegetable"
+
+
+class ProductStore:
+    """Read and fill the SQLite product index at ``path``.
+
+    Reads open a short-lived read-only connection, so the store can be
+    shared by the catalog refresher threads; a missing database file just
+    means an empty store.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.selects = 0
+        self.last_select_ms = None
+        self._lock = threading.Lock()
+
+    def _connect(self, readonly=True):
+        if readonly:
+            return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        connection = sqlite3.connect(self.path)
+        if connection.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            exists = connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products'"
+            ).fetchone()
+            connection.executescript(MIGRATION if exists else f"{SCHEMA}PRAGMA user_version = {SCHEMA_VERSION};")
+        return connection
+
+    def ingest(self, source, records, replace=False):
+        """Classify and store ``(name, category)`` records under ``source``.
+
+        English vegetable names are kept, one row per product name; USDA
+        foods must also have a vegetable category. Products sharing a
+        normalized name are all kept, and told apart when selecting.
+
+        Returns:
+            dict: ``read``, ``stored`` (new rows) and ``skipped`` counts.
+        """
+        report = {"read": 0, "stored": 0, "skipped": 0}
+        rows = []
+        for name, category in records:
+            report["read"] += 1
+            classification = classify(name) if name else None
+            category = (category or "vegetable").lower()
+            if classification is None or not classification.is_english or "vegetable" not in category:
+                report["skipped"] += 1
+                continue
+            rows.append((
+                source, name, classification.norm_name, catalog_id(name), classification.veg_type,
+                json.dumps(list(classification.keywords)), category, json.dumps(SOURCE_TAGS[source])
+            ))
+        connection = self._connect(readonly=False)
+        try:
+            with connection:
+                if replace:
+                    connection.execute("DELETE FROM products WHERE source = ?", (source,))
+                before = connection.total_changes
+                connection.executemany(
+                    f"INSERT OR IGNORE INTO products (source, {COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+                report["stored"] = connection.total_changes - before
+        finally:
+            connection.close()
+        report["skipped"] += len(rows) - report["stored"]
+        return report
+
+    def select(self, source, count, rng=random, selector=None):
+        """Return up to ``count`` diverse products of ``source``.
+
+        Types are visited round-robin in random order; within a type,
+        candidates come from a window at a random offset. A product is taken
+        if ``selector`` accepts it: by default, if none of its keywords and not
+        its normalized name were taken yet.
+
+        Args:
+            source (str): ``USDA`` or ``OFF``.
+            count (int): Products to return at most.
+            rng (random.Random, optional): Orders types and picks offsets.
+            selector (DiversitySelector, optional): Selection of a catalog
+                build to add the products to, with its quotas.
+
+        Returns:
+            list: Dicts with ``name``, ``norm_name``, ``catalog_id``,
+            ``veg_type``, ``keywords``, ``category`` and ``tags``; empty if the
+            store has no products of ``source``.
+        """
+        start = time.perf_counter()
+        try:
+            connection = self._connect()
+        except sqlite3.Error:
+            return []
+        try:
+            type_counts = connection.execute(
+                "SELECT veg_type, COUNT(*) FROM products WHERE source = ? GROUP BY veg_type", (source,)
+            ).fetchall()
+            rng.shuffle(type_counts)
+            window = count * 4
+            candidates = []
+            for veg_type, size in type_counts:
+                offset = rng.randrange(size)
+                query = (f"SELECT {COLUMNS} FROM products WHERE source = ? AND veg_type = ? "
+                         "ORDER BY id LIMIT ? OFFSET ?")
+                rows = connection.execute(query, (source, veg_type, window, offset)).fetchall()
+                if len(rows) < window and offset:
+                    rows += connection.execute(query, (source, veg_type, min(window - len(rows), offset), 0)).fetchall()
+                candidates.append((veg_type, iter(rows)))
+        except sqlite3.Error as e:
+            print(f"Error reading {self.path}: {str(e)}")
+            return []
+        finally:
+            connection.close()
+
+        products = []
+        selector = selector or DiversitySelector(count)
+        while candidates and len(products) < count and not selector.full:
+            for group in list(candidates):
+                veg_type, rows = group
+                if selector.type_full(veg_type):
+                    candidates.remove(group)
+                    continue
+                for name, norm_name, item_id, veg_type, keywords, category, tags in rows:
+                    product = {
+                        "name": name, "norm_name": norm_name, "catalog_id": item_id, "veg_type": veg_type,
+                        "keywords": json.loads(keywords), "category": category, "tags": json.loads(tags)
+                    }
+                    if selector.add(product) is None:
+                        products.append(product)
+                        break
+                else:
+                    candidates.remove(group)
+                if len(products) >= count or selector.full:
+                    break
+        with self._lock:
+            self.selects += 1
+            self.last_select_ms = round((time.perf_counter() - start) * 1000, 2)
+        return products
+
+    def products(self):
+        """Return every stored product as a catalog item, USDA products first.
+
+        Items have the shape the grocery catalog gives them (``id``, ``name``,
+        ``category``, ``tags``, ``price``, ``image``, ``veg_type``), without an
+        image; empty if the store has not been ingested.
+        """
+        try:
+            connection = self._connect()
+        except sqlite3.Error:
+            return []
+        try:
+            rows = connection.execute(
+                "SELECT name, catalog_id, veg_type, category, tags FROM products ORDER BY source = ?, id", (OFF,)
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Error reading {self.path}: {str(e)}")
+            return []
+        finally:
+            connection.close()
+        return [
+            {"id": item_id, "name": name, "category": category, "tags": json.loads(tags),
+             "price": 1.50, "image": None, "veg_type": veg_type}
+            for name, item_id, veg_type, category, tags in rows
+        ]
+
+    def counts(self):
+        """Return the number of stored products per source."""
+        try:
+            connection = self._connect()
+        except sqlite3.Error:
+            return {}
+        try:
+            return dict(connection.execute("SELECT source, COUNT(*) FROM products GROUP BY source").fetchall())
+        except sqlite3.Error:
+            return {}
+        finally:
+            connection.close()
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "exists": os.path.exists(self.path),
+            "products": self.counts(),
+            "selects": self.selects,
+            "lastSelectMs": self.last_select_ms,
+        }
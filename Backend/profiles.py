@@ -0,0 +1,190 @@
+"""Read-through access to ``profiles/{uid}`` documents.
+
+``ProfileRepository.get`` answers from a per-user in-process cache when it
+can and otherwise reads from Firestore, optionally with a field mask, so the
+cart endpoints only transfer the cart fields. What a read returns is merged
+into the cached entry, and later reads of any subset of the known fields are
+cache hits: the ``/profile`` and ``/cart/get`` calls of one page load cost a
+single Firestore read. ``get_many`` batches misses into one ``get_all``.
+
+Every write path calls ``invalidate``; ``update`` writes and invalidates in
+one call, and can return the resulting profile from a transaction. A read that was already in flight when
+the profile was invalidated does not repopulate the cache, so a stale
+document is never cached after a write.
+
+Invalidation only reaches the cache of the process that made the write. With
+several workers (gunicorn ``-w``, several instances), another worker keeps
+serving its cached copy, such as the dietary preferences used for meal
+recommendations, for up to ``ttl`` seconds after a profile changes. Set
+``PROFILE_CACHE_TTL`` to bound that staleness, or to 0 to read every profile
+from Firestore.
+"""
+import itertools
+import os
+import threading
+
+from firebase_admin import firestore
+from google.api_core.exceptions import NotFound
+
+from ttl_cache import TTLCache
+
+
+class ProfileRepository:
+    """Cached reads of profile documents.
+
+    Args:
+        db: Firestore client, or None when Firestore is unavailable.
+        maxsize (int): Maximum number of cached profiles.
+        ttl (float): Seconds a cached profile is trusted, and so how long a
+            write made by another process can go unseen; 0 disables caching.
+    """
+
+    collection = "profiles"
+
+    def __init__(self, db, maxsize=10000, ttl=60):
+        self.db = db
+        self.ttl = ttl
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Generation at which each profile was last invalidated
+        self._invalidated = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generation = itertools.count(1)
+        self._current = 0
+        self._lock = threading.Lock()
+        self.reads = 0
+        self.projection_reads = 0
+
+    @classmethod
+    def from_env(cls, db):
+        return cls(
+            db,
+            maxsize=int(os.getenv("PROFILE_CACHE_SIZE", "10000")),
+            ttl=float(os.getenv("PROFILE_CACHE_TTL", "60"))
+        )
+
+    def ref(self, uid):
+        return self.db.collection(self.collection).document(uid)
+
+    def _lookup(self, uid, fields):
+        """Return ``(hit, data)`` from the cache for ``uid`` and ``fields``."""
+        entry = self._cache.get(uid)
+        if entry is None:
+            return False, None
+        known, data = entry
+        if data is None:
+            return True, None
+        if fields is None:
+            if known is None:
+                return True, dict(data)
+            return False, None
+        if known is None or set(fields) <= known:
+            return True, {field: data[field] for field in fields if field in data}
+        return False, None
+
+    def _store(self, uid, fields, snapshot, started):
+        """Merge what a read returned into the cache, unless invalidated since."""
+        if self._invalidated.get(uid, 0) > started:
+            return
+        if not snapshot.exists:
+            self._cache.set(uid, (None, None))
+            return
+        data = snapshot.to_dict() or {}
+        if fields is None:
+            self._cache.set(uid, (None, data))
+            return
+        entry = self._cache.get(uid)
+        known, cached = entry if entry and entry[1] is not None else (set(), {})
+        if known is None:
+            return
+        self._cache.set(uid, (known | set(fields), {**cached, **data}))
+
+    def _started(self):
+        with self._lock:
+            return self._current
+
+    def get(self, uid, fields=None):
+        """Return the profile of ``uid`` (only ``fields`` if given), or None.
+
+        Args:
+            uid (str): The user id.
+            fields (list, optional): Top-level fields to read; fields the
+                document lacks are absent from the result.
+        """
+        hit, data = self._lookup(uid, fields)
+        if hit:
+            return data
+        started = self._started()
+        snapshot = self.ref(uid).get(field_paths=fields) if fields else self.ref(uid).get()
+        self.reads += 1
+        if fields:
+            self.projection_reads += 1
+        self._store(uid, fields, snapshot, started)
+        if not snapshot.exists:
+            return None
+        return snapshot.to_dict() or {}
+
+    def get_many(self, uids, fields=None):
+        """Return a dict mapping each uid to its profile (or None), with one ``get_all``."""
+        profiles = {}
+        missing = []
+        for uid in dict.fromkeys(uids):
+            hit, data = self._lookup(uid, fields)
+            if hit:
+                profiles[uid] = data
+            else:
+                missing.append(uid)
+        if missing:
+            started = self._started()
+            snapshots = self.db.get_all([self.ref(uid) for uid in missing], field_paths=fields)
+            for snapshot in snapshots:
+                self.reads += 1
+                self._store(snapshot.id, fields, snapshot, started)
+                profiles[snapshot.id] = (snapshot.to_dict() or {}) if snapshot.exists else None
+        return profiles
+
+    def update(self, uid, fields, return_state=False):
+        """Write ``fields`` to the profile of ``uid`` and invalidate its cache entry.
+
+        Args:
+            uid (str): The user id.
+            fields (dict): Top-level fields to overwrite.
+            return_state (bool): Read the profile in the same transaction as
+                the write and return the resulting document.
+
+        Returns:
+            dict: The updated profile with ``return_state``, otherwise None.
+
+        Raises:
+            google.api_core.exceptions.NotFound: If the profile does not exist.
+        """
+        doc_ref = self.ref(uid)
+        if not return_state:
+            doc_ref.update(fields)
+            self.invalidate(uid)
+            return None
+
+        @firestore.transactional
+        def run(transaction):
+            snapshot = doc_ref.get(transaction=transaction)
+            if not snapshot.exists:
+                raise NotFound(f"Profile {uid} not found")
+            transaction.update(doc_ref, fields)
+            return {**(snapshot.to_dict() or {}), **fields}
+
+        try:
+            return run(self.db.transaction())
+        finally:
+            self.invalidate(uid)
+
+    def invalidate(self, uid):
+        """Forget the cached profile of ``uid``; call after every write to it."""
+        with self._lock:
+            self._current = next(self._generation)
+            self._invalidated.set(uid, self._current)
+        self._cache.pop(uid)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        stats = self._cache.stats()
+        return {**stats, "firestoreReads": self.reads, "projectionReads": self.projection_reads}
@@ -0,0 +1,146 @@
+"""Spoonacular lookups used by /meal-recommendations.
+
+Recipe detail requests are fanned out over a bounded worker pool so a
+recommendation costs roughly one search round trip plus one detail round trip,
+however many recipes are returned. The pool size is set with
+SPOONACULAR_MAX_CONCURRENCY (default 5).
+
+Recipe dietary flags almost never change, so they are kept in a
+``RecipeInfoCache`` (LRU + TTL in process, optionally persisted to the
+Firestore ``recipe_cache`` collection) and only missing ids are fetched.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import upstream
+from ttl_cache import TTLCache
+
+BASE_URL = os.getenv("SPOONACULAR_BASE_URL", "https://api.spoonacular.com")
+MAX_CONCURRENCY = int(os.getenv("SPOONACULAR_MAX_CONCURRENCY", "5"))
+
+executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY, thread_name_prefix="spoonacular")
+
+# The only recipe information fields /meal-recommendations reads.
+RECIPE_INFO_FIELDS = ("vegan", "glutenFree", "dairyFree", "veryHealthy", "lowCarb", "ketogenic", "paleo")
+
+
+def dietary_info(recipe_info):
+    return {field: recipe_info.get(field, False) for field in RECIPE_INFO_FIELDS}
+
+
+class RecipeInfoCache:
+    """Recipe id to dietary flags, cached in process and optionally in Firestore.
+
+    Configured from the environment by ``from_env``:
+
+        RECIPE_CACHE_SIZE     in-process entries (default 1000)
+        RECIPE_CACHE_TTL      seconds an entry stays valid (default 7 days)
+        RECIPE_CACHE_PERSIST  "1" to also read/write the Firestore recipe_cache collection
+    """
+
+    collection = "recipe_cache"
+
+    def __init__(self, maxsize=1000, ttl=7 * 24 * 3600, db=None):
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl, clock=time.time)
+        self.db = db
+        self.firestore_hits = 0
+
+    @classmethod
+    def from_env(cls, db=None):
+        persist = os.getenv("RECIPE_CACHE_PERSIST", "0") == "1"
+        return cls(
+            maxsize=int(os.getenv("RECIPE_CACHE_SIZE", "1000")),
+            ttl=int(os.getenv("RECIPE_CACHE_TTL", str(7 * 24 * 3600))),
+            db=db if persist else None,
+        )
+
+    def get_many(self, recipe_ids):
+        """Return cached dietary info for the ids that are present and fresh."""
+        found = {}
+        missing = []
+        for recipe_id in recipe_ids:
+            info = self.memory.get(recipe_id)
+            if info is None:
+                missing.append(recipe_id)
+            else:
+                found[recipe_id] = info
+        if self.db and missing:
+            try:
+                by_doc_id = {str(recipe_id): recipe_id for recipe_id in missing}
+                refs = [self.db.collection(self.collection).document(doc_id) for doc_id in by_doc_id]
+                now = time.time()
+                for snapshot in self.db.get_all(refs):
+                    if not snapshot.exists:
+                        continue
+                    data = snapshot.to_dict()
+                    remaining = self.memory.ttl - (now - data.get("cachedAt", 0))
+                    if remaining <= 0:
+                        continue
+                    recipe_id = by_doc_id[snapshot.id]
+                    found[recipe_id] = dietary_info(data)
+                    self.memory.set(recipe_id, found[recipe_id], ttl=remaining)
+                    self.firestore_hits += 1
+            except Exception as e:
+                print(f"Recipe cache read failed: {str(e)}")
+        return found
+
+    def set_many(self, infos):
+        for recipe_id, info in infos.items():
+            self.memory.set(recipe_id, info)
+        if self.db and infos:
+            try:
+                batch = self.db.batch()
+                now = time.time()
+                for recipe_id, info in infos.items():
+                    batch.set(self.db.collection(self.collection).document(str(recipe_id)), {**info, "cachedAt": now})
+                batch.commit()
+            except Exception as e:
+                print(f"Recipe cache write failed: {str(e)}")
+
+    def stats(self):
+        return {**self.memory.stats(), "firestoreHits": self.firestore_hits, "persistent": bool(self.db)}
+
+
+def find_by_ingredients(params, base_url=None):
+    """Return the ``findByIngredients`` search results for ``params``."""
+    response = upstream.get(f"{base_url or BASE_URL}/recipes/findByIngredients", params=params)
+    response.raise_for_status()
+    return response.json()
+
+
+def get_recipe_information(recipe_id, api_key, base_url=None):
+    """Return the ``/recipes/{id}/information`` payload for one recipe."""
+    response = upstream.get(
+        f"{base_url or BASE_URL}/recipes/{recipe_id}/information",
+        params={"apiKey": api_key}
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def get_recipe_information_many(recipe_ids, api_key, base_url=None, pool=None, cache=None):
+    """Fetch dietary information for several recipes concurrently.
+
+    Args:
+        recipe_ids (list): Spoonacular recipe ids.
+        api_key (str): Spoonacular API key.
+        base_url (str, optional): Override for the Spoonacular base URL.
+        pool (Executor, optional): Worker pool to use instead of the shared one.
+        cache (RecipeInfoCache, optional): Cache consulted before, and filled after, fetching.
+
+    Returns:
+        dict: Recipe id to the ``RECIPE_INFO_FIELDS`` flags. Re-raises the first failed lookup.
+    """
+    pool = pool or executor
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    infos = cache.get_many(recipe_ids) if cache else {}
+    futures = {
+        recipe_id: pool.submit(get_recipe_information, recipe_id, api_key, base_url)
+        for recipe_id in recipe_ids if recipe_id not in infos
+    }
+    fetched = {recipe_id: dietary_info(future.result()) for recipe_id, future in futures.items()}
+    if cache and fetched:
+        cache.set_many(fetched)
+    infos.update(fetched)
+    return infos
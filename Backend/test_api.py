@@ -1,12 +1,24 @@
 import unittest
+import gzip
 import json
+import os
+import shutil
+import tempfile
+import threading
+import time
 from unittest.mock import patch, MagicMock
+import app as app_module
 from app import app
+from catalog import Snapshot
+from catalog_filters import CatalogFilter
+from product_store import ProductStore
+from google.api_core.exceptions import AlreadyExists
 
 class APITestCase(unittest.TestCase):
     def setUp(self):
         self.app = app.test_client()
         self.app.testing = True
+        app_module.profiles.clear()
 
     def test_test_apis(self):
         response = self.app.get("/test-apis")
@@ -32,6 +44,158 @@ class APITestCase(unittest.TestCase):
         self.assertTrue(len(data["offers"]) <= 10)
         self.assertTrue(all("sale" in offer and "original" in offer for offer in data["offers"]))
 
+    def test_grocery_items_conditional_get(self):
+        snapshot = Snapshot([{"id": "kale", "name": "Kale", "price": 2.5}], 0, 1, "abc123")
+        with patch.object(app_module.grocery_catalog, "get", return_value=snapshot):
+            response = self.app.get("/grocery-items")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.headers["ETag"], '"abc123"')
+            self.assertIn("stale-while-revalidate", response.headers["Cache-Control"])
+            cached = self.app.get("/grocery-items", headers={"If-None-Match": '"abc123"'})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.data, b"")
+        self.assertEqual(cached.headers["ETag"], '"abc123"')
+
+    def test_grocery_items_are_compressed_when_accepted(self):
+        items = [{"id": f"veg-{i}", "name": f"Veg {i}", "price": 1.5, "image": "https://images.example/x.jpg"} for i in range(20)]
+        snapshot = Snapshot(items, 0, 1, "gz1")
+        with patch.object(app_module.grocery_catalog, "get", return_value=snapshot):
+            response = self.app.get("/grocery-items", headers={"Accept-Encoding": "gzip"})
+            cached = self.app.get("/grocery-items", headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(response.headers["ETag"], 'W/"gz1"')
+        self.assertEqual(json.loads(gzip.decompress(response.data)), {"items": items})
+        self.assertEqual(cached.status_code, 304)
+
+    def test_grocery_items_filtered_and_paginated(self):
+        items = [
+            {"id": "carrot", "name": "Carrots", "tags": ["vegan", "gluten-free"], "veg_type": "root"},
+            {"id": "kale", "name": "Kale", "tags": ["vegan"], "veg_type": "leafy"},
+            {"id": "beet", "name": "Beetroot", "tags": ["vegan", "gluten-free"], "veg_type": "root"},
+            {"id": "spinach", "name": "Spinach", "tags": ["vegan", "gluten-free"], "veg_type": "leafy"},
+        ]
+        snapshot = Snapshot(items, 0, 1, "f1", CatalogFilter(items))
+        with patch.object(app_module.grocery_catalog, "get", return_value=snapshot):
+            response = self.app.get("/grocery-items?diet=gluten-free,vegan&veg_type=root,leafy&limit=2")
+            reordered = self.app.get("/grocery-items?veg_type=leafy,root&diet=vegan,gluten-free&limit=2",
+                                     headers={"If-None-Match": response.headers["ETag"]})
+            second_page = self.app.get("/grocery-items?diet=gluten-free&limit=2&offset=2")
+            unknown = self.app.get("/grocery-items?diet=paleo")
+            malformed = self.app.get("/grocery-items?limit=ten")
+        data = json.loads(response.data)
+        self.assertEqual([item["id"] for item in data["items"]], ["carrot", "beet"])
+        self.assertEqual((data["total"], data["offset"], data["limit"]), (3, 0, 2))
+        self.assertNotEqual(response.headers["ETag"], '"f1"')
+        self.assertEqual(reordered.status_code, 304)
+        self.assertEqual([item["id"] for item in json.loads(second_page.data)["items"]], ["spinach"])
+        self.assertEqual(unknown.status_code, 400)
+        self.assertEqual(malformed.status_code, 400)
+
+    def test_daily_offers_do_not_match_derived_tags(self):
+        offers = [
+            {"id": "carrots", "name": "Carrots", "tags": ["vegan"], "veg_type": "root"},
+            {"id": "kale", "name": "Kale", "tags": ["vegan", "organic"], "veg_type": "leafy"},
+        ]
+        snapshot = Snapshot(offers, 0, 1, "o1", app_module.offers_catalog.index(offers))
+        with patch.object(app_module.offers_catalog, "get", return_value=snapshot):
+            response = self.app.get("/daily-offers?diet=organic")
+        self.assertEqual([offer["id"] for offer in json.loads(response.data)["offers"]], ["kale"])
+
+    @patch('app.upstream.get')
+    def test_daily_offers_stop_reading_once_every_type_is_offered(self, mock_get):
+        names = ["Carrots", "Tomatoes", "Spinach", "Broccoli", "Zucchini", "Red Onions", "Celery Sticks", "Mushrooms"]
+        body = json.dumps({"products": [{"product_name_en": name} for name in names + ["Potatoes"] * 2000]}).encode()
+        chunks = [body[i:i + 1024] for i in range(0, len(body), 1024)]
+        read = []
+
+        def iter_content(chunk_size):
+            for chunk in chunks:
+                read.append(chunk)
+                yield chunk
+
+        mock_get.return_value.iter_content.side_effect = iter_content
+        offers = app_module.build_daily_offers()
+        self.assertEqual(len(offers), 10)
+        self.assertTrue({"Carrots", "Celery Sticks", "Mushrooms"} <= {offer["name"] for offer in offers})
+        self.assertLess(len(read), 3)
+        self.assertTrue(mock_get.call_args.kwargs["stream"])
+        mock_get.return_value.close.assert_called_once()
+
+    @patch('app.upstream.get', side_effect=Exception("offline"))
+    def test_daily_offers_are_fixed_for_the_day(self, mock_get):
+        with patch.object(app_module, "product_store", ProductStore(os.path.join(tempfile.gettempdir(), "missing.db"))):
+            offers = app_module.build_daily_offers("2026-10-18")
+            self.assertEqual(app_module.build_daily_offers("2026-10-18"), offers)
+            self.assertNotEqual(app_module.build_daily_offers("2026-10-19"), offers)
+        self.assertEqual(len(offers), 10)
+        self.assertTrue(all(offer["sale"] < offer["original"] for offer in offers))
+
+    @patch('app.build_daily_offers')
+    def test_first_persisted_daily_offers_win(self, mock_build):
+        mock_build.return_value = [{"veg_type": "root", "name": "Carrots", "sale": 1.5, "original": 2.0, "tags": []}]
+        persisted = [{"tags": [], "sale": 1.0, "original": 3.0, "name": "Kale", "veg_type": "leafy"}]
+        db = MagicMock()
+        doc_ref = db.collection.return_value.document.return_value
+        doc_ref.get.return_value.to_dict.return_value = None
+        with patch.object(app_module, "db", db):
+            self.assertEqual(list(app_module.load_daily_offers()[0]), ["name", "original", "sale", "tags", "veg_type"])
+            doc_ref.create.assert_called_once()
+            self.assertEqual(doc_ref.create.call_args.args[0]["offers"], mock_build.return_value)
+
+            doc_ref.create.side_effect = AlreadyExists("offers exist")
+            doc_ref.get.return_value.to_dict.side_effect = [None, {"offers": persisted}]
+            self.assertEqual(app_module.load_daily_offers(), persisted)
+
+            doc_ref.get.return_value.to_dict.side_effect = None
+            doc_ref.get.return_value.to_dict.return_value = {"offers": persisted}
+            mock_build.reset_mock()
+            self.assertEqual(json.dumps(app_module.load_daily_offers()), json.dumps(persisted, sort_keys=True))
+            mock_build.assert_not_called()
+        document = db.collection.return_value.document.call_args.args[0]
+        self.assertEqual(document, f"default-{app_module.offer_pricing.offer_day()}")
+
+    @patch('app.image_resolver.resolve', side_effect=lambda names: {name.lower(): None for name in names})
+    @patch('app.upstream.get')
+    def test_catalogs_are_built_from_local_product_index(self, mock_get, mock_resolve):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        store = ProductStore(os.path.join(directory, "products.db"))
+        names = [f"{adjective} {vegetable}" for adjective in ("Fresh", "Organic", "Frozen")
+                 for vegetable in ("Carrots", "Kale", "Onions", "Zucchini", "Celery", "Broccoli", "Tomatoes", "Mushrooms")]
+        for source in ("usda", "off"):
+            store.ingest(source, ((name, "vegetable") for name in names))
+        with patch.object(app_module, "product_store", store):
+            items = app_module.build_grocery_items()
+            offers = app_module.build_daily_offers()
+        mock_get.assert_not_called()
+        self.assertTrue(all(item["name"] in names for item in items[:8]))
+        self.assertEqual(len({item["veg_type"] for item in items[:8]}), 8)
+        self.assertGreaterEqual(sum(offer["name"] in names for offer in offers), 8)
+
+    def test_products_search(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        store = ProductStore(os.path.join(directory, "products.db"))
+        store.ingest("usda", [("Organic Baby Carrots", "vegetable"), ("Fresh Kale", "vegetable")])
+        grocery = Snapshot([{"id": "carrot", "name": "Carrots", "price": 1.5},
+                            {"id": "green-courgette", "name": "Green Courgettes", "price": 1.5}], 0, 1)
+        with patch.object(app_module, "product_store", store), \
+                patch.object(app_module.grocery_catalog, "get", return_value=grocery):
+            index = app_module.build_search_index()
+        with patch.object(app_module.search_catalog, "get", return_value=Snapshot(index, 0, 1)), \
+                patch('app.db.collection') as mock_db_collection, patch('app.db.batch') as mock_batch:
+            response = self.app.get("/products/search?q=carots")
+            limited = self.app.get("/products/search?q=zucchini&limit=1")
+            invalid = self.app.get("/products/search?q=kale&limit=many")
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data["query"], "carots")
+        self.assertEqual([item["name"] for item in data["items"]], ["Carrots", "Organic Baby Carrots"])
+        self.assertEqual(json.loads(limited.data)["items"][0]["id"], "green-courgette")
+        self.assertIn("organic-baby-carrots", app_module.catalog_index.lookup(["organic-baby-carrots"]))
+        mock_batch.return_value.commit.assert_not_called()
+        self.assertEqual(invalid.status_code, 400)
+
     @patch('app.auth.verify_id_token')
     def test_meal_recommendations(self, mock_verify_id_token):
         mock_verify_id_token.return_value = {"uid": "test-user"}
@@ -45,6 +209,60 @@ class APITestCase(unittest.TestCase):
         self.assertIn("meals", data)
         self.assertTrue(len(data["meals"]) <= 5)
 
+    @patch('app.spoonacular.get_recipe_information_many')
+    @patch('app.spoonacular.find_by_ingredients')
+    @patch('app.auth.verify_id_token')
+    def test_meal_recommendations_equivalent_carts_share_cache(self, mock_verify_id_token, mock_find, mock_info):
+        mock_verify_id_token.return_value = {"uid": "test-user"}
+        mock_find.return_value = [{"id": 1, "title": "Carrot Soup", "usedIngredients": [{"name": "carrot"}]}]
+        mock_info.return_value = {1: {"vegan": True}}
+        app_module.meal_cache.clear()
+        for cart_items in (["Tomatoes", "Carrots"], ["carrot", "tomato"]):
+            response = self.app.post(
+                "/meal-recommendations",
+                json={"cart_items": cart_items, "dietary_prefs": {"vegan": True}},
+                headers={"Authorization": "Bearer mock-token"}
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.data)["meals"][0]["meal"], "Carrot Soup")
+        self.assertEqual(mock_find.call_count, 1)
+        self.assertEqual(mock_find.call_args[0][0]["ingredients"], "carrot,tomato")
+
+    @patch('app.spoonacular.get_recipe_information_many')
+    @patch('app.spoonacular.find_by_ingredients')
+    @patch('app.auth.verify_id_token')
+    def test_meal_recommendations_concurrent_misses_share_one_upstream_call(self, mock_verify_id_token, mock_find, mock_info):
+        mock_verify_id_token.return_value = {"uid": "test-user"}
+        started = threading.Barrier(8)
+
+        def slow_find(params):
+            time.sleep(0.3)
+            return [{"id": 1, "title": "Leek Soup", "usedIngredients": [{"name": "leek"}]}]
+
+        mock_find.side_effect = slow_find
+        mock_info.return_value = {1: {"vegan": True}}
+        app_module.meal_cache.clear()
+        statuses = []
+
+        def request_meals():
+            client = app.test_client()
+            started.wait()
+            response = client.post(
+                "/meal-recommendations",
+                json={"cart_items": ["leeks"], "dietary_prefs": {}},
+                headers={"Authorization": "Bearer mock-token"}
+            )
+            statuses.append(response.status_code)
+
+        with patch.object(app_module.limiter, "enabled", False):
+            threads = [threading.Thread(target=request_meals) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(statuses, [200] * 8)
+        self.assertEqual(mock_find.call_count, 1)
+
     def test_meal_recommendations_unauthenticated(self):
         response = self.app.post(
             "/meal-recommendations",
@@ -175,6 +393,37 @@ class APITestCase(unittest.TestCase):
         )
         self.assertEqual(response.status_code, 401)
 
+    @patch('app.auth.verify_id_token')
+    def test_add_to_cart_rejects_bad_quantity(self, mock_verify_id_token):
+        mock_verify_id_token.return_value = {"uid": "test-user"}
+        with patch('app.db.collection') as mock_db_collection:
+            for quantity in ("2", 0, -1, 1.5):
+                response = self.app.post(
+                    "/cart/add",
+                    json={"item": {"name": "Tomato", "price": 1.50, "quantity": quantity}},
+                    headers={"Authorization": "Bearer mock-token"}
+                )
+                self.assertEqual(response.status_code, 400)
+            mock_db_collection.return_value.document.return_value.update.assert_not_called()
+
+    @patch('app.auth.verify_id_token')
+    def test_add_search_result_to_cart_persists_it(self, mock_verify_id_token):
+        mock_verify_id_token.return_value = {"uid": "test-user"}
+        app_module.catalog_index.add([{"name": "Roasted Purple Carrots", "price": 2.0}])
+        with patch('app.db.collection') as mock_db_collection, patch('app.db.batch') as mock_batch:
+            mock_db_collection.return_value.document.return_value.get.return_value = MagicMock(
+                exists=True, **{"to_dict.return_value": {}}
+            )
+            response = self.app.post(
+                "/cart/add",
+                json={"item": {"id": "roasted-purple-carrots", "name": "Roasted Purple Carrots"}},
+                headers={"Authorization": "Bearer mock-token"}
+            )
+        self.assertEqual(response.status_code, 200)
+        mock_db_collection.return_value.document.assert_any_call("roasted-purple-carrots")
+        mock_batch.return_value.set.assert_called_once()
+        mock_batch.return_value.commit.assert_called_once()
+
     @patch('app.auth.verify_id_token')
     def test_get_cart(self, mock_verify_id_token):
         mock_verify_id_token.return_value = {"uid": "test-user"}
@@ -192,6 +441,29 @@ class APITestCase(unittest.TestCase):
         data = json.loads(response.data)
         self.assertIn("items", data)
 
+    @patch('app.auth.verify_id_token')
+    def test_get_cart_etag_follows_catalog_details(self, mock_verify_id_token):
+        mock_verify_id_token.return_value = {"uid": "test-user"}
+        with patch('app.db.collection') as mock_db_collection:
+            mock_doc = MagicMock()
+            mock_doc.exists = True
+            mock_doc.to_dict.return_value = {
+                "cartItems": {"tomato": {"catalog_id": "tomato", "price_at_add": 150, "quantity": 1, "addedAt": 1}}
+            }
+            mock_db_collection.return_value.document.return_value.get.return_value = mock_doc
+            headers = {"Authorization": "Bearer mock-token"}
+            app_module.catalog_index.add([{"id": "tomato", "name": "Tomato", "image": "old.png"}])
+            response = self.app.get("/cart/get", headers=headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.headers["Cache-Control"], "private, no-cache")
+            etag = response.headers["ETag"]
+            cached = self.app.get("/cart/get", headers={**headers, "If-None-Match": etag})
+            self.assertEqual(cached.status_code, 304)
+            app_module.catalog_index.add([{"id": "tomato", "name": "Tomato", "image": "new.png"}])
+            changed = self.app.get("/cart/get", headers={**headers, "If-None-Match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(json.loads(changed.data)["items"][0]["image"], "new.png")
+
     @patch('app.auth.verify_id_token')
     def test_cart_summary(self, mock_verify_id_token):
         mock_verify_id_token.return_value = {"uid": "test-user"}
@@ -211,6 +483,45 @@ class APITestCase(unittest.TestCase):
         self.assertIn("totalPrice", data)
         self.assertIn("items", data)
 
+    @patch('app.auth.verify_id_token')
+    def test_cart_summary_totals_only_reads_aggregate(self, mock_verify_id_token):
+        mock_verify_id_token.return_value = {"uid": "test-user"}
+        with patch('app.db.collection') as mock_db_collection:
+            mock_doc = MagicMock()
+            mock_doc.exists = True
+            mock_doc.to_dict.return_value = {"cartTotals": {"items": 3, "priceCents": 450}}
+            mock_get = mock_db_collection.return_value.document.return_value.get
+            mock_get.return_value = mock_doc
+            response = self.app.get(
+                "/cart/summary?items=false",
+                headers={"Authorization": "Bearer mock-token"}
+            )
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data, {"totalItems": 3, "totalPrice": 4.5})
+        mock_get.assert_called_once_with(field_paths=["cartTotals", "cart"])
+
+    @patch('app.auth.verify_id_token')
+    def test_profile_then_cart_reads_profile_once(self, mock_verify_id_token):
+        mock_verify_id_token.return_value = {"uid": "test-user", "email": "test@example.com"}
+        with patch('app.db.collection') as mock_db_collection:
+            mock_doc = MagicMock()
+            mock_doc.exists = True
+            mock_doc.to_dict.return_value = {
+                "email": "test@example.com",
+                "name": "Test",
+                "cartItems": {"tomato": {"catalog_id": "tomato", "price_at_add": 150, "quantity": 2, "addedAt": 1}},
+                "cartTotals": {"items": 2, "priceCents": 300}
+            }
+            mock_get = mock_db_collection.return_value.document.return_value.get
+            mock_get.return_value = mock_doc
+            profile = self.app.get("/profile/test-user", headers={"Authorization": "Bearer mock-token"})
+            cart = self.app.get("/cart/get", headers={"Authorization": "Bearer mock-token"})
+        self.assertEqual(profile.status_code, 200)
+        self.assertEqual(cart.status_code, 200)
+        self.assertEqual(json.loads(cart.data)["items"][0]["quantity"], 2)
+        mock_get.assert_called_once_with()
+
     def test_cart_summary_unauthenticated(self):
         response = self.app.get("/cart/summary")
         self.assertEqual(response.status_code, 401)
@@ -237,5 +548,140 @@ class APITestCase(unittest.TestCase):
         self.assertIn("message", data)
         self.assertEqual(data["message"], "Item removed")
 
+    @patch('app.cart_store.apply_operations')
+    @patch('app.auth.verify_id_token')
+    def test_add_to_cart_returns_state(self, mock_verify_id_token, mock_apply):
+        mock_verify_id_token.return_value = {"uid": "test-user"}
+        mock_apply.return_value = [{"catalog_id": "tomato", "quantity": 2, "price_at_add": 150}]
+        with patch('app.db.collection'):
+            response = self.app.post(
+                "/cart/add",
+                json={"item": {"id": 1, "name": "Tomato", "price": 1.50}, "return_state": True},
+                headers={"Authorization": "Bearer mock-token"}
+            )
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data["itemId"], "tomato")
+        self.assertEqual(data["totalItems"], 2)
+        self.assertEqual(data["totalPrice"], 3.0)
+        self.assertEqual(data["items"][0]["id"], "tomato")
+        self.assertEqual(mock_apply.call_args[0][2], [
+            {"op": "add", "item": {"catalog_id": "tomato", "price_at_add": 150, "quantity": 1}}
+        ])
+
+    @patch('app.cart_store.apply_operations')
+    @patch('app.auth.verify_id_token')
+    def test_remove_from_cart_returns_state(self, mock_verify_id_token, mock_apply):
+        mock_verify_id_token.return_value = {"uid": "test-user"}
+        mock_apply.return_value = []
+        with patch('app.db.collection'):
+            response = self.app.post(
+                "/cart/remove",
+                json={"item_id": "1", "return_state": True},
+                headers={"Authorization": "Bearer mock-token"}
+            )
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual((data["items"], data["totalItems"], data["totalPrice"]), ([], 0, 0))
+
+    @patch('app.auth.verify_id_token')
+    def test_update_profile_returns_state(self, mock_verify_id_token):
+        mock_verify_id_token.return_value = {"uid": "test-user"}
+        stored = {"email": "test@example.com", "name": "Old", "cartItems": {}}
+        with patch.object(app_module.profiles, "ref") as mock_ref, \
+                patch.object(app_module.firestore, "transactional", lambda run: lambda transaction: run(transaction)):
+            mock_ref.return_value.get.return_value = MagicMock(exists=True, **{"to_dict.return_value": stored})
+            response = self.app.post(
+                "/profile/update",
+                json={"name": "Test", "avatarUrl": "https://example.com/a.svg", "return_state": True},
+                headers={"Authorization": "Bearer mock-token"}
+            )
+            mock_ref.return_value.update.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        profile = json.loads(response.data)["profile"]
+        self.assertEqual(profile["name"], "Test")
+        self.assertEqual(profile["email"], "test@example.com")
+        self.assertIn("cartItems", profile)
+        self.assertIn("dietaryPrefs", profile)
+
+    @patch('app.cart_store.apply_operations')
+    @patch('app.auth.verify_id_token')
+    def test_cart_batch(self, mock_verify_id_token, mock_apply):
+        mock_verify_id_token.return_value = {"uid": "test-user"}
+        mock_apply.return_value = [{"catalog_id": "tomato", "quantity": 2, "price_at_add": 150}]
+        operations = [{"op": "add", "item": {"id": "tomato", "name": "Tomato", "price": 1.5, "quantity": 2}}]
+        response = self.app.post(
+            "/cart/batch",
+            json={"operations": operations},
+            headers={"Authorization": "Bearer mock-token"}
+        )
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data["totalItems"], 2)
+        self.assertEqual(data["totalPrice"], 3.0)
+        self.assertEqual(len(data["items"]), 1)
+        self.assertEqual(mock_apply.call_args[0][2], [
+            {"op": "add", "item": {"catalog_id": "tomato", "price_at_add": 150, "quantity": 2}}
+        ])
+
+    @patch('app.auth.verify_id_token')
+    def test_cart_batch_invalid_operations(self, mock_verify_id_token):
+        mock_verify_id_token.return_value = {"uid": "test-user"}
+        with patch('app.db.collection'), patch('app.db.transaction'):
+            response = self.app.post(
+                "/cart/batch",
+                json={"operations": [{"op": "drop"}]},
+                headers={"Authorization": "Bearer mock-token"}
+            )
+        self.assertEqual(response.status_code, 400)
+
+    @patch('app.auth.verify_id_token')
+    def test_session_bootstrap(self, mock_verify_id_token):
+        mock_verify_id_token.return_value = {"uid": "test-user", "email": "test@example.com"}
+        grocery = Snapshot([{"id": "tomato", "name": "Tomatoes", "price": 1.5}], 0, 1)
+        offers = Snapshot([{"name": "Kale", "original": 3.0, "sale": 2.0}], 0, 1)
+        with patch('app.db.collection') as mock_db_collection, \
+                patch.object(app_module.grocery_catalog, "get", return_value=grocery), \
+                patch.object(app_module.offers_catalog, "get", return_value=offers):
+            mock_doc = MagicMock()
+            mock_doc.exists = True
+            mock_doc.to_dict.return_value = {
+                "name": "Test",
+                "dietaryPrefs": {"vegan": True},
+                "cartItems": {"tomato": {"catalog_id": "tomato", "price_at_add": 150, "quantity": 2, "addedAt": 1}},
+                "cartTotals": {"items": 2, "priceCents": 300}
+            }
+            mock_get = mock_db_collection.return_value.document.return_value.get
+            mock_get.return_value = mock_doc
+            response = self.app.get("/session/bootstrap", headers={"Authorization": "Bearer mock-token"})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data["profile"], {"name": "Test", "dietaryPrefs": {"vegan": True}})
+        self.assertEqual(data["cart"]["totalItems"], 2)
+        self.assertEqual(data["cart"]["totalPrice"], 3.0)
+        self.assertEqual(data["cart"]["items"][0]["id"], "tomato")
+        self.assertEqual(data["groceryItems"], grocery.data)
+        self.assertEqual(data["dailyOffers"], offers.data)
+        mock_get.assert_called_once_with()
+        self.assertEqual(mock_verify_id_token.call_count, 1)
+
+    @patch('app.auth.verify_id_token')
+    def test_session_bootstrap_without_profile(self, mock_verify_id_token):
+        mock_verify_id_token.return_value = {"uid": "test-user", "email": "test@example.com"}
+        with patch('app.db.collection') as mock_db_collection, \
+                patch.object(app_module.grocery_catalog, "get", side_effect=RuntimeError("USDA down")), \
+                patch.object(app_module.offers_catalog, "get", side_effect=RuntimeError("OFF down")):
+            mock_doc = MagicMock()
+            mock_doc.exists = False
+            mock_db_collection.return_value.document.return_value.get.return_value = mock_doc
+            response = self.app.get("/session/bootstrap", headers={"Authorization": "Bearer mock-token"})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data["profile"]["name"], "test")
+        self.assertNotIn("cart", data["profile"])
+        self.assertEqual(data["cart"], {"items": [], "totalItems": 0, "totalPrice": 0.0})
+        self.assertEqual(data["groceryItems"], [])
+        self.assertEqual(data["dailyOffers"], [])
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
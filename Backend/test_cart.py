@@ -0,0 +1,296 @@
+import threading
+import time
+import unittest
+from firebase_admin import firestore
+from google.api_core.exceptions import Aborted, FailedPrecondition, NotFound
+from google.cloud.firestore_v1.field_path import FieldPath
+import cart
+
+class FakeDocument:
+    """Profile document that applies ``update`` field paths and transforms
+    atomically, the way Firestore does server-side."""
+
+    id = "test-user"
+
+    def __init__(self, data=None, latency=0.0):
+        self.data = data
+        self.latency = latency
+        self.update_time = 0
+        self.lock = threading.Lock()
+
+    def get(self, field_paths=None):
+        with self.lock:
+            return FakeSnapshot(self.data, self.update_time)
+
+    def update(self, updates, option=None):
+        time.sleep(self.latency)
+        with self.lock:
+            if self.data is None:
+                raise NotFound("No document to update")
+            if option is not None and option._last_update_time != self.update_time:
+                raise FailedPrecondition("Document changed")
+            for path, value in updates.items():
+                *parents, field = FieldPath.from_api_repr(path).parts
+                target = self.data
+                for part in parents:
+                    target = target.setdefault(part, {})
+                if value is firestore.DELETE_FIELD:
+                    target.pop(field, None)
+                elif isinstance(value, firestore.Increment):
+                    target[field] = target.get(field, 0) + value.value
+                elif isinstance(value, firestore.Minimum):
+                    target[field] = min(target.get(field, value.value), value.value)
+                else:
+                    target[field] = value
+            self.update_time += 1
+
+class FakeSnapshot:
+    def __init__(self, data, update_time):
+        self.exists = data is not None
+        self._data = data
+        self.update_time = update_time
+
+    def to_dict(self):
+        return self._data
+
+def entry(catalog_id, price_at_add=150, quantity=1):
+    return {"catalog_id": catalog_id, "price_at_add": price_at_add, "quantity": quantity}
+
+class CartTestCase(unittest.TestCase):
+    def test_add_increments_existing_item(self):
+        doc = FakeDocument({})
+        cart.add_item(doc, entry("tomato"))
+        cart.add_item(doc, entry("tomato", quantity=2))
+        self.assertEqual(cart.cart_items(doc.data), [entry("tomato", quantity=3)])
+
+    def test_readd_at_another_price_keeps_totals_consistent(self):
+        doc = FakeDocument({})
+        cart.add_item(doc, entry("kale", 150, quantity=2))
+        cart.add_item(doc, entry("kale", 250))
+        self.assertEqual(cart.cart_items(doc.data), [entry("kale", 150, quantity=3)])
+        self.assertEqual(doc.data["cartTotals"], cart.cart_totals(cart.cart_items(doc.data)))
+        updates, items = cart.plan_operations(doc.data, [{"op": "add", "item": entry("kale", 300)}])
+        self.assertEqual(items, [entry("kale", 150, quantity=4)])
+        self.assertEqual(updates["cartTotals"], {"items": 4, "priceCents": 600})
+
+    def test_items_are_listed_in_order_first_added(self):
+        doc = FakeDocument({})
+        clock = iter(range(10))
+        for item_id in ("leek", "carrot", "kale", "leek"):
+            cart.add_item(doc, entry(item_id), clock=lambda: next(clock))
+        self.assertEqual([item["catalog_id"] for item in cart.cart_items(doc.data)], ["leek", "carrot", "kale"])
+
+    def test_entries_store_only_compact_fields(self):
+        doc = FakeDocument({})
+        cart.add_item(doc, entry("tomato"), clock=lambda: 5)
+        self.assertEqual(doc.data["cartItems"], {"tomato": {**entry("tomato"), "addedAt": 5}})
+
+    def test_remove_touches_only_that_item(self):
+        doc = FakeDocument({})
+        cart.add_item(doc, entry("tomato", 150))
+        cart.add_item(doc, entry("leek", 200))
+        updates, items = cart.plan_operations(doc.data, [
+            {"op": "remove", "item_id": "tomato"},
+            {"op": "remove", "item_id": "missing"},
+        ])
+        self.assertEqual(set(updates), {"cartItems.tomato", "cartItems.missing", "cartTotals"})
+        doc.update(updates)
+        self.assertEqual(cart.cart_items(doc.data), [entry("leek", 200)])
+        self.assertEqual(doc.data["cartTotals"], {"items": 1, "priceCents": 200})
+
+    def test_missing_profile_raises_not_found(self):
+        with self.assertRaises(NotFound):
+            cart.add_item(FakeDocument(None), entry("tomato"))
+
+    def test_add_keeps_totals_in_integer_cents(self):
+        doc = FakeDocument({})
+        for _ in range(3):
+            cart.add_item(doc, entry("tomato", cart.price_cents(0.1)))
+        cart.add_item(doc, entry("leek", cart.price_cents("1.005"), quantity=2))
+        self.assertEqual(doc.data["cartTotals"], {"items": 5, "priceCents": 232})
+        self.assertEqual(doc.data["cartTotals"], cart.cart_totals(cart.cart_items(doc.data)))
+        self.assertEqual(cart.summarize(totals=doc.data["cartTotals"]), {"totalItems": 5, "totalPrice": 2.32})
+
+    def test_stored_totals_fall_back_to_items(self):
+        data = {"cartItems": {"kale": entry("kale", 250, 2)}}
+        self.assertEqual(cart.stored_totals(data), {"items": 2, "priceCents": 500})
+        data["cartTotals"] = {"items": 7, "priceCents": 1}
+        self.assertEqual(cart.stored_totals(data), {"items": 7, "priceCents": 1})
+        data["cart"] = [{"id": 2, "name": "Leeks", "price": 1}]
+        self.assertEqual(cart.stored_totals(data), {"items": 3, "priceCents": 600})
+
+    def test_concurrent_adds_do_not_lose_updates(self):
+        doc = FakeDocument({}, latency=0.001)
+        threads_count, adds = 20, 25
+        start = threading.Barrier(threads_count)
+
+        def shopper():
+            start.wait()
+            for _ in range(adds):
+                cart.add_item(doc, entry("carrot", 50))
+
+        threads = [threading.Thread(target=shopper) for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(cart.cart_items(doc.data)[0]["quantity"], threads_count * adds)
+        self.assertEqual(doc.data["cartTotals"], {"items": threads_count * adds, "priceCents": threads_count * adds * 50})
+
+    def test_concurrent_first_adds_at_different_prices_keep_totals(self):
+        doc = FakeDocument({}, latency=0.001)
+        prices = [100 + 10 * i for i in range(10)]
+        start = threading.Barrier(len(prices))
+
+        def shopper(price):
+            start.wait()
+            cart.add_item(doc, entry("kale", price))
+
+        threads = [threading.Thread(target=shopper, args=(price,)) for price in prices]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        items = cart.cart_items(doc.data)
+        self.assertEqual(items[0]["quantity"], len(prices))
+        self.assertEqual(doc.data["cartTotals"], cart.cart_totals(items))
+
+    def test_add_gives_up_after_repeated_conflicts(self):
+        doc = FakeDocument({})
+        delays = []
+        # Every read looks older than the document, as if another write always got in first
+        doc.get = lambda field_paths=None: FakeSnapshot(doc.data, doc.update_time - 1)
+        with self.assertRaises(Aborted):
+            cart.add_item(doc, entry("kale"), sleep=delays.append)
+        self.assertEqual(len(delays), cart.MAX_ADD_ATTEMPTS - 1)
+        self.assertNotIn("cartItems", doc.data)
+
+    def test_outdated_carts_are_read_as_compact_entries(self):
+        data = {
+            "cart": [{"id": 1, "name": "Tomatoes", "price": 1.5, "quantity": 2, "tags": ["vegan"], "image": "x"}],
+            "cartItems": {
+                "3": {"id": 3, "name": "Carrots", "price": 1.5, "quantity": 1, "addedAt": 10},
+                "tomatoes": {**entry("tomatoes"), "addedAt": 20},
+            },
+        }
+        self.assertEqual(cart.cart_items(data), [entry("tomatoes", quantity=3), entry("carrots")])
+
+    def test_outdated_cart_is_migrated_into_compact_map(self):
+        doc = FakeDocument({
+            "cart": [{"id": 1, "name": "Tomatoes", "price": 1.5, "quantity": 2}],
+            "cartItems": {"2": {"id": 2, "name": "Leeks", "price": 2.0, "quantity": 1, "addedAt": 101}},
+        })
+        self.assertTrue(cart.migrate_cart(doc, doc.get()))
+        self.assertNotIn("cart", doc.data)
+        self.assertEqual(set(doc.data["cartItems"]), {"tomatoes", "leeks"})
+        self.assertEqual(cart.cart_items(doc.data), [entry("tomatoes", quantity=2), entry("leeks", 200)])
+        self.assertEqual(doc.data["cartTotals"], {"items": 3, "priceCents": 500})
+        self.assertFalse(cart.migrate_cart(doc, doc.get()))
+
+    def test_migration_does_not_overwrite_concurrent_changes(self):
+        doc = FakeDocument({"cart": [{"id": 1, "name": "Tomato"}]})
+        snapshot = doc.get()
+        cart.add_item(doc, entry("leek"))
+        self.assertFalse(cart.migrate_cart(doc, snapshot))
+        self.assertIn("cart", doc.data)
+
+    def test_plan_operations_applies_in_order(self):
+        doc = FakeDocument({})
+        cart.add_item(doc, entry("tomato", 150), clock=lambda: 1)
+        cart.add_item(doc, entry("leek", 200), clock=lambda: 2)
+        updates, items = cart.plan_operations(doc.data, [
+            {"op": "add", "item": entry("carrot", 25, 4)},
+            {"op": "add", "item": entry("tomato", 150)},
+            {"op": "remove", "item_id": "leek"},
+            {"op": "set_quantity", "item_id": "carrot", "quantity": 2},
+        ], clock=lambda: 3)
+        doc.update(updates)
+        self.assertEqual(cart.cart_items(doc.data), items)
+        self.assertEqual(items, [entry("tomato", 150, 2), entry("carrot", 25, 2)])
+        self.assertEqual(updates["cartTotals"], {"items": 4, "priceCents": 350})
+        self.assertEqual(doc.data["cartTotals"], cart.cart_totals(items))
+
+    def test_plan_operations_set_quantity_zero_removes(self):
+        data = {"cartItems": {"kale": {**entry("kale", quantity=3), "addedAt": 1}}}
+        updates, items = cart.plan_operations(data, [{"op": "set_quantity", "item_id": "kale", "quantity": 0}])
+        self.assertEqual(items, [])
+        self.assertIs(updates["cartItems.kale"], firestore.DELETE_FIELD)
+
+    def test_plan_operations_rewrites_outdated_cart(self):
+        data = {"cart": [{"id": 1, "name": "Tomato", "price": 1.5, "quantity": 1}]}
+        updates, items = cart.plan_operations(data, [{"op": "add", "item": entry("tomato")}])
+        self.assertIs(updates["cart"], firestore.DELETE_FIELD)
+        self.assertEqual(set(updates["cartItems"]), {"tomato"})
+        self.assertEqual(items, [entry("tomato", quantity=2)])
+
+    def test_plan_operations_rejects_malformed_batches(self):
+        for operations in (None, [], [{"op": "drop"}], [{"op": "add"}], [{"op": "remove"}],
+                           [{"op": "add", "item": {"id": 1, "name": "Tomato"}}],
+                           [{"op": "set_quantity", "item_id": 1, "quantity": "2"}],
+                           [{"op": "set_quantity", "item_id": 1, "quantity": True}],
+                           *([{"op": "add", "item": {**entry("kale"), "quantity": quantity}}]
+                             for quantity in ("2", 0, -1, 1.5, True, None)),
+                           [{"op": "remove", "item_id": 1}] * (cart.MAX_OPERATIONS + 1)):
+            with self.assertRaises(ValueError):
+                cart.plan_operations({}, operations)
+
+    def test_check_totals_reports_and_repairs_mismatches(self):
+        good = FakeDocument({})
+        cart.add_item(good, entry("tomato"))
+        stale = FakeDocument({"cartItems": {"kale": entry("kale", 200, 3)}})
+        legacy = FakeDocument({"cart": [{"id": 1, "name": "Leeks", "price": 1}]})
+        db = FakeDatabase([good, stale, legacy])
+        self.assertEqual(cart.check_totals(db), {"checked": 3, "mismatched": 2, "repaired": 0, "failed": 0})
+        self.assertNotIn("cartTotals", stale.data)
+        self.assertEqual(cart.check_totals(db, repair=True), {"checked": 3, "mismatched": 2, "repaired": 2, "failed": 0})
+        self.assertEqual(stale.data["cartTotals"], {"items": 3, "priceCents": 600})
+        self.assertEqual(legacy.data["cartTotals"], {"items": 1, "priceCents": 100})
+        self.assertEqual(cart.check_totals(db)["mismatched"], 0)
+
+    def test_migrate_carts_rewrites_only_outdated_profiles(self):
+        compact = FakeDocument({})
+        cart.add_item(compact, entry("tomato"))
+        legacy = FakeDocument({"cart": [{"id": 1, "name": "Leeks", "price": 1}]})
+        db = FakeDatabase([compact, legacy])
+        self.assertEqual(cart.migrate_carts(db, dry_run=True), {"checked": 2, "outdated": 1, "repaired": 0, "failed": 0})
+        self.assertEqual(cart.migrate_carts(db), {"checked": 2, "outdated": 1, "repaired": 1, "failed": 0})
+        self.assertEqual(legacy.data["cartItems"]["leeks"]["price_at_add"], 100)
+        self.assertEqual(cart.migrate_carts(db)["outdated"], 0)
+
+class FakeDatabase:
+    """Just enough of a Firestore client for ``cart.check_totals``."""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def collection(self, name):
+        return self
+
+    def stream(self):
+        for document in self.documents:
+            snapshot = document.get()
+            snapshot.reference = document
+            yield snapshot
+
+    def bulk_writer(self):
+        return FakeBulkWriter()
+
+class FakeBulkWriter:
+    def on_write_error(self, callback):
+        self.on_error = callback
+
+    def on_write_result(self, callback):
+        self.on_result = callback
+
+    def update(self, reference, field_updates, option=None):
+        try:
+            reference.update(field_updates, option=option)
+            self.on_result(reference, None, self)
+        except Exception as e:
+            self.on_error(e, self)
+
+    def close(self):
+        pass
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import threading
+import time
+import unittest
+from catalog import CatalogRefresher
+
+class CountingBuild:
+    def __init__(self, delay=0.0, fail=False):
+        self.calls = 0
+        self.delay = delay
+        self.fail = fail
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(5)
+        time.sleep(self.delay)
+        if self.fail:
+            raise Exception("upstream down")
+        return [f"item-{self.calls}"]
+
+class CatalogRefresherTestCase(unittest.TestCase):
+    def test_cold_start_builds_synchronously_then_serves_snapshot(self):
+        build = CountingBuild()
+        refresher = CatalogRefresher("test", build, interval=60)
+        self.assertEqual(refresher.get().data, ["item-1"])
+        self.assertEqual(refresher.get().data, ["item-1"])
+        self.assertEqual(build.calls, 1)
+        refresher.stop()
+
+    def test_snapshot_etag_follows_content(self):
+        refresher = CatalogRefresher("test", lambda: ["kale", "leek"], interval=60)
+        first = refresher.get()
+        refresher.refresh()
+        second = refresher.get()
+        self.assertNotEqual(first.version, second.version)
+        self.assertEqual(first.etag, second.etag)
+        refresher.build = lambda: ["kale"]
+        refresher.refresh()
+        self.assertNotEqual(refresher.get().etag, first.etag)
+        refresher.stop()
+
+    def test_index_is_built_with_each_snapshot(self):
+        refresher = CatalogRefresher("test", lambda: ["kale", "leek"], interval=60, index=len)
+        self.assertEqual(refresher.get().index, 2)
+        refresher.build = lambda: ["kale"]
+        refresher.refresh()
+        self.assertEqual(refresher.get().index, 1)
+        refresher.stop()
+
+    def test_stale_snapshot_is_served_while_refreshing(self):
+        build = CountingBuild()
+        refresher = CatalogRefresher("test", build, interval=60, max_age=0)
+        first = refresher.get()
+        build.release.clear()
+        stale = refresher.get()
+        self.assertEqual(stale.version, first.version)
+        build.release.set()
+        deadline = time.time() + 2
+        fresh = refresher.get()
+        while fresh.version == first.version and time.time() < deadline:
+            time.sleep(0.01)
+            fresh = refresher.get()
+        # max_age=0 lets every get() start another rebuild, so check the first fresh snapshot
+        self.assertEqual(fresh.data, ["item-2"])
+        refresher.stop()
+
+    def test_cold_start_uses_fallback(self):
+        build = CountingBuild()
+        build.release.clear()
+        refresher = CatalogRefresher("test", build, interval=60, fallback=lambda: ["cached"])
+        self.assertEqual(refresher.get().data, ["cached"])
+        build.release.set()
+        refresher.stop()
+
+    def test_failed_refresh_keeps_previous_snapshot(self):
+        build = CountingBuild()
+        refresher = CatalogRefresher("test", build, interval=60)
+        refresher.get()
+        build.fail = True
+        refresher.refresh()
+        self.assertEqual(refresher.get().data, ["item-1"])
+        self.assertEqual(refresher.stats()["failures"], 1)
+        refresher.stop()
+
+    def test_cold_start_without_fallback_raises_build_error(self):
+        refresher = CatalogRefresher("test", CountingBuild(fail=True), interval=60)
+        with self.assertRaises(Exception):
+            refresher.get()
+        refresher.stop()
+
+    def test_background_loop_refreshes_on_interval(self):
+        build = CountingBuild()
+        refresher = CatalogRefresher("test", build, interval=0.05)
+        refresher.get()
+        time.sleep(0.3)
+        refresher.stop()
+        self.assertGreater(build.calls, 2)
+
+    def test_concurrent_cold_start_builds_once(self):
+        build = CountingBuild(delay=0.2)
+        refresher = CatalogRefresher("test", build, interval=60)
+        start = threading.Barrier(10)
+        results = []
+
+        def request():
+            start.wait()
+            results.append(refresher.get().data)
+
+        threads = [threading.Thread(target=request) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        refresher.stop()
+        self.assertEqual(build.calls, 1)
+        self.assertEqual(results, [["item-1"]] * 10)
+
+    def test_concurrent_cold_start_shares_failure(self):
+        build = CountingBuild(delay=0.2, fail=True)
+        refresher = CatalogRefresher("test", build, interval=60)
+        start = threading.Barrier(5)
+        errors = []
+
+        def request():
+            start.wait()
+            try:
+                refresher.get()
+            except Exception as e:
+                errors.append(str(e))
+
+        threads = [threading.Thread(target=request) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        refresher.stop()
+        self.assertEqual(build.calls, 1)
+        self.assertEqual(errors, ["upstream down"] * 5)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+from catalog_filters import CatalogFilter, derived_tags, parse_list, tag_mask
+
+ITEMS = [
+    {"name": "Broccoli Florets", "tags": ["vegan", "gluten-free"], "veg_type": "cruciferous"},
+    {"name": "Carrots", "tags": ["vegan", "gluten-free", "nut-free"], "veg_type": "root"},
+    {"name": "Zucchini", "tags": ["vegan"], "veg_type": "squash"},
+    {"name": "Spinach Leaves", "tags": ["vegan", "nut-free"], "veg_type": "leafy"},
+    {"name": "Beetroot", "tags": ["vegan", "gluten-free"], "veg_type": "root"},
+    {"name": "Kale", "tags": ["vegan"]},
+]
+
+def names(page):
+    return [item["name"] for item in page]
+
+class CatalogFilterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.filter = CatalogFilter(ITEMS, derive_tags=True)
+
+    def test_derived_tags_follow_the_products_page(self):
+        self.assertEqual(derived_tags("Zucchini"), ["organic", "low-carb"])
+        self.assertEqual(derived_tags("Broccoli Florets"), ["organic", "non-gmo", "low-carb", "high-fiber"])
+        self.assertEqual(tag_mask(["vegan", "unknown"]), tag_mask(["vegan"]))
+
+    def test_dietary_tags_must_all_match(self):
+        page, total = self.filter.select(tags=("gluten-free", "high-fiber"))
+        self.assertEqual(names(page), ["Broccoli Florets", "Carrots"])
+        self.assertEqual(total, 2)
+        self.assertEqual(self.filter.select(tags=("non-gmo",))[1], 5)
+        self.assertEqual(self.filter.select(tags=("low-sodium",)), ([], 0))
+
+    def test_derived_tags_are_opt_in(self):
+        plain = CatalogFilter(ITEMS)
+        self.assertEqual(plain.select(tags=("organic",)), ([], 0))
+        self.assertEqual(names(plain.select(tags=("nut-free",))[0]), ["Carrots", "Spinach Leaves"])
+
+    def test_any_veg_type_matches_in_catalog_order(self):
+        page, total = self.filter.select(veg_types=("root", "cruciferous", "other"))
+        self.assertEqual(names(page), ["Broccoli Florets", "Carrots", "Beetroot", "Kale"])
+        page, _ = self.filter.select(tags=("nut-free",), veg_types=("root", "leafy"))
+        self.assertEqual(names(page), ["Carrots", "Spinach Leaves"])
+
+    def test_pagination_reports_total(self):
+        page, total = self.filter.select(offset=2, limit=3)
+        self.assertEqual(names(page), ["Zucchini", "Spinach Leaves", "Beetroot"])
+        self.assertEqual(total, 6)
+        self.assertEqual(self.filter.select(offset=10, limit=3), ([], 6))
+
+    def test_unknown_filters_are_rejected(self):
+        with self.assertRaises(ValueError):
+            self.filter.select(tags=("paleo",))
+        with self.assertRaises(ValueError):
+            self.filter.select(veg_types=("fruit",))
+        self.assertEqual(parse_list(" root,leafy,,root "), ("leafy", "root"))
+
+if __name__ == "__main__":
+    unittest.main()
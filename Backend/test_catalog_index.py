@@ -0,0 +1,85 @@
+import unittest
+from unittest.mock import MagicMock
+from catalog_index import CatalogIndex, catalog_id
+
+def snapshot(doc_id, data=None):
+    snap = MagicMock(exists=data is not None, id=doc_id)
+    snap.to_dict.return_value = data
+    return snap
+
+class CatalogIndexTestCase(unittest.TestCase):
+    def test_catalog_id_is_a_slug_of_the_name(self):
+        self.assertEqual(catalog_id("Green Peppers"), "green-peppers")
+        self.assertEqual(catalog_id("Red Onions"), catalog_id(" red  onions!"))
+        self.assertEqual(catalog_id(""), "item")
+
+    def test_distinct_names_get_distinct_ids(self):
+        names = ["Tomatoes", "Cherry Tomatoes", "Tomato Paste", "Pasta Shells", "Passata", "Green Peppers",
+                 "Black Pepper", "Potatoes", "Sweet Potatoes", "Brussels Sprouts", "Cilantro", "Fresh Cilantro"]
+        self.assertEqual(len({catalog_id(name) for name in names}), len(names))
+
+    def test_add_fills_ids_and_persists_in_one_batch(self):
+        db = MagicMock()
+        index = CatalogIndex(db=db)
+        items = [{"name": "Carrots", "price": 1.5}, {"id": "kale", "name": "Kale", "price": 2.0}]
+        self.assertIs(index.add(items, persist=True), items)
+        self.assertEqual([item["id"] for item in items], ["carrots", "kale"])
+        self.assertEqual(db.batch.return_value.set.call_count, 2)
+        self.assertEqual(db.batch.return_value.commit.call_count, 1)
+        self.assertEqual(index.lookup(["kale"])["kale"]["price"], 2.0)
+        db.get_all.assert_not_called()
+        index.add([{"id": "kale", "name": "Kale", "price": 2.0}, {"id": "leeks", "name": "Leeks"}], persist=True)
+        self.assertEqual(db.batch.return_value.set.call_count, 3)
+        index.add([{"id": "kale", "name": "Kale", "price": 2.0}], persist=True)
+        self.assertEqual(db.batch.return_value.commit.call_count, 2)
+
+    def test_lookup_falls_back_to_firestore_once(self):
+        db = MagicMock()
+        db.get_all.return_value = [snapshot("leeks", {"name": "Leeks", "price": 1.0}), snapshot("gone")]
+        index = CatalogIndex(db=db)
+        found = index.lookup(["leeks", "gone"])
+        self.assertEqual(found["leeks"]["name"], "Leeks")
+        self.assertNotIn("gone", found)
+        index.lookup(["leeks"])
+        db.get_all.assert_called_once()
+        self.assertEqual(index.stats(), {"size": 1, "firestoreHits": 1, "misses": 1, "evictions": 0})
+
+    def test_unpersisted_items_are_written_once_persisted(self):
+        db = MagicMock()
+        index = CatalogIndex(db=db)
+        index.add([{"name": "Purple Kale"}, {"name": "Leeks"}])
+        db.batch.assert_not_called()
+        index.persist(["purple-kale", "unknown"])
+        index.persist(["purple-kale"])
+        db.collection.return_value.document.assert_called_once_with("purple-kale")
+        db.batch.return_value.commit.assert_called_once()
+
+    def test_least_recently_used_items_are_evicted(self):
+        db = MagicMock()
+        db.get_all.return_value = []
+        index = CatalogIndex(db=db, maxsize=2)
+        index.add([{"name": "Kale"}, {"name": "Leeks"}])
+        index.lookup(["kale"])
+        index.add([{"name": "Carrots"}])
+        self.assertEqual(len(index), 2)
+        self.assertEqual(set(index.lookup(["kale", "carrots"])), {"kale", "carrots"})
+        self.assertEqual(index.lookup(["leeks"]), {})
+        index.persist(["leeks"])
+        db.batch.assert_not_called()
+        self.assertEqual(index.stats()["evictions"], 1)
+
+    def test_hydrate_uses_price_at_add(self):
+        index = CatalogIndex()
+        index.add([{"name": "Carrots", "category": "vegetable", "tags": ["vegan"], "image": "img", "veg_type": "root", "price": 1.5}])
+        items = index.hydrate([
+            {"catalog_id": "carrots", "quantity": 2, "price_at_add": 125},
+            {"catalog_id": "purple-kale", "quantity": 1, "price_at_add": 300},
+        ])
+        self.assertEqual(items[0], {
+            "id": "carrots", "name": "Carrots", "category": "vegetable", "tags": ["vegan"],
+            "image": "img", "veg_type": "root", "price": 1.25, "quantity": 2,
+        })
+        self.assertEqual((items[1]["id"], items[1]["name"], items[1]["price"]), ("purple-kale", "Purple Kale", 3.0))
+
+if __name__ == "__main__":
+    unittest.main()
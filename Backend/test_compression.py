@@ -0,0 +1,61 @@
+import gzip
+import json
+import unittest
+from flask import Flask, jsonify
+from compression import Compressor
+from http_cache import conditional_json
+
+def make_app(compressor, calls):
+    app = Flask(__name__)
+    compressor.init_app(app)
+
+    @app.route("/big")
+    def big():
+        return jsonify({"items": ["carrot"] * 500})
+
+    @app.route("/small")
+    def small():
+        return jsonify({"ok": True})
+
+    @app.route("/snapshot")
+    def snapshot():
+        def build():
+            calls.append(1)
+            return {"items": ["kale"] * 500}
+        return conditional_json("v1", build, "public, max-age=60", compressor)
+
+    return app
+
+class CompressorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.compressor = Compressor(min_size=256)
+        self.calls = []
+        self.client = make_app(self.compressor, self.calls).test_client()
+
+    def test_large_json_is_gzipped_when_accepted(self):
+        response = self.client.get("/big", headers={"Accept-Encoding": "gzip, deflate"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        self.assertEqual(json.loads(gzip.decompress(response.data)), {"items": ["carrot"] * 500})
+        self.assertEqual(int(response.headers["Content-Length"]), len(response.data))
+
+    def test_small_or_unaccepted_responses_are_left_alone(self):
+        self.assertNotIn("Content-Encoding", self.client.get("/small", headers={"Accept-Encoding": "gzip"}).headers)
+        self.assertNotIn("Content-Encoding", self.client.get("/big").headers)
+        self.assertNotIn("Content-Encoding", self.client.get("/big", headers={"Accept-Encoding": "gzip;q=0"}).headers)
+
+    def test_snapshot_bodies_are_encoded_once_per_etag(self):
+        for _ in range(3):
+            response = self.client.get("/snapshot", headers={"Accept-Encoding": "gzip"})
+            self.assertEqual(response.headers["ETag"], 'W/"v1"')
+            self.assertEqual(json.loads(gzip.decompress(response.data)), {"items": ["kale"] * 500})
+        plain = self.client.get("/snapshot")
+        self.assertEqual(json.loads(plain.data), {"items": ["kale"] * 500})
+        self.assertEqual(plain.headers["ETag"], '"v1"')
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.compressor.compressed, 1)
+        cached = self.client.get("/snapshot", headers={"Accept-Encoding": "gzip", "If-None-Match": 'W/"v1"'})
+        self.assertEqual(cached.status_code, 304)
+
+if __name__ == "__main__":
+    unittest.main()
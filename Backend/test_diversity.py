@@ -0,0 +1,62 @@
+import unittest
+from diversity import KEYWORD_BITS, DiversitySelector
+
+def product(name, veg_type, *keywords):
+    return {"name": name, "norm_name": name.lower(), "veg_type": veg_type, "keywords": list(keywords)}
+
+PRODUCTS = [
+    product("Carrots", "root", "carrot"),
+    product("Baby Carrots", "root", "carrot"),
+    product("Beetroot", "root", "beet"),
+    product("Kale", "leafy", "kale"),
+    product("Carrots", "root"),
+    product("Spinach", "leafy", "spinach"),
+    product("Red Onions", "bulb", "onion"),
+]
+
+def names(products):
+    return [p["name"] for p in products]
+
+class DiversitySelectorTestCase(unittest.TestCase):
+    def test_names_and_keywords_are_not_repeated(self):
+        selector = DiversitySelector(10)
+        rejected = []
+        selected = selector.select(PRODUCTS, rejected=rejected)
+        self.assertEqual(names(selected), ["Carrots", "Beetroot", "Kale", "Spinach", "Red Onions"])
+        self.assertEqual(rejected, [
+            {"name": "Baby Carrots", "reason": "Overlapping keyword"},
+            {"name": "Carrots", "reason": "Duplicate name"},
+        ])
+        self.assertEqual(selector.type_counts, {"root": 2, "leafy": 2, "bulb": 1})
+
+    def test_size_and_type_quotas(self):
+        selector = DiversitySelector(3, per_type=1, quotas={"leafy": 2})
+        rejected = []
+        selected = selector.select(PRODUCTS, rejected=rejected)
+        self.assertEqual(names(selected), ["Carrots", "Kale", "Spinach"])
+        self.assertIn({"name": "Beetroot", "reason": "Type quota reached"}, rejected)
+        self.assertTrue(selector.full)
+        self.assertEqual(selector.add(PRODUCTS[-1]), "Selection full")
+        self.assertEqual(DiversitySelector(3).add(PRODUCTS[0]), None)
+
+    def test_quota_can_be_skipped_for_top_up(self):
+        selector = DiversitySelector(5, per_type=1)
+        selector.select(PRODUCTS)
+        selected = selector.select([product("Parsnips", "root", "parsnip")], check_quota=False)
+        self.assertEqual(names(selected), ["Parsnips"])
+        self.assertEqual(selector.type_counts["root"], 2)
+
+    def test_keywords_are_bits_of_the_vocabulary(self):
+        selector = DiversitySelector(5)
+        self.assertEqual(selector.keyword_mask(["carrot", "kale"]), KEYWORD_BITS["carrot"] | KEYWORD_BITS["kale"])
+        extra = selector.keyword_mask(["green pepper"])
+        self.assertFalse(extra & selector.keyword_mask(list(KEYWORD_BITS)))
+        self.assertEqual(selector.keyword_mask(["green pepper"]), extra)
+
+    def test_seed_makes_shuffled_selection_deterministic(self):
+        runs = [names(DiversitySelector(4, seed=3).select(PRODUCTS, shuffle=True)) for _ in range(2)]
+        self.assertEqual(runs[0], runs[1])
+        self.assertEqual(len(runs[0]), 4)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import datetime
+import decimal
+import json
+import unittest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from fast_json import OrjsonProvider
+
+class OrjsonProviderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.default = DefaultJSONProvider(self.app)
+        self.fast = OrjsonProvider(self.app)
+
+    def test_matches_default_provider(self):
+        document = {
+            "b": [1, 2.5, None, True, "café"],
+            "a": {"when": datetime.datetime(2024, 5, 1, 12, 30, tzinfo=datetime.timezone.utc)},
+            "price": decimal.Decimal("1.50"),
+        }
+        self.assertEqual(json.loads(self.fast.dumps(document)), json.loads(self.default.dumps(document)))
+        self.assertEqual(list(json.loads(self.fast.dumps(document))), ["a", "b", "price"])
+
+    def test_falls_back_for_values_orjson_rejects(self):
+        self.assertEqual(self.fast.dumps({"big": 2 ** 70}), '{"big": 1180591620717411303424}')
+
+    def test_response_is_compact_json(self):
+        with self.app.app_context():
+            response = self.fast.response({"items": [1, 2]})
+        self.assertEqual(response.get_data(), b'{"items":[1,2]}\n')
+        self.assertEqual(response.mimetype, "application/json")
+        self.assertEqual(self.fast.loads(b'{"a": [1]}'), {"a": [1]})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from unittest.mock import MagicMock
+from images import DEFAULT_IMAGE_URL, ImageResolver
+from stub_server import StubServer
+
+def unsplash_stub(path, query):
+    if query["query"] == "kale":
+        return {"results": []}
+    return {"results": [{"urls": {"small": f"https://img/{query['query']}.jpg"}}]}
+
+def snapshot(doc_id, url=None):
+    snap = MagicMock(exists=url is not None, id=doc_id)
+    snap.to_dict.return_value = {"image_url": url}
+    return snap
+
+class ImageResolverTestCase(unittest.TestCase):
+    def test_resolves_hits_and_misses_in_one_batch(self):
+        db = MagicMock()
+        db.get_all.return_value = [snapshot("carrot", "https://img/cached-carrot.jpg"), snapshot("onion"), snapshot("kale")]
+        with StubServer(unsplash_stub) as stub:
+            resolver = ImageResolver(db=db, access_key="key", base_url=stub.url)
+            images = resolver.resolve(["Carrot", "onion", "kale", "carrot"])
+            self.assertEqual(len(stub.requests), 2)
+        self.assertEqual(images, {
+            "carrot": "https://img/cached-carrot.jpg",
+            "onion": "https://img/onion.jpg",
+            "kale": DEFAULT_IMAGE_URL,
+        })
+        db.get_all.assert_called_once()
+        self.assertEqual(db.batch.return_value.set.call_count, 2)
+        db.batch.return_value.commit.assert_called_once()
+
+    def test_warm_requests_skip_firestore_and_unsplash(self):
+        db = MagicMock()
+        db.get_all.return_value = [snapshot("onion")]
+        with StubServer(unsplash_stub) as stub:
+            resolver = ImageResolver(db=db, access_key="key", base_url=stub.url)
+            resolver.resolve(["onion"])
+            self.assertEqual(resolver.resolve(["Onion"]), {"onion": "https://img/onion.jpg"})
+            self.assertEqual(len(stub.requests), 1)
+        self.assertEqual(db.get_all.call_count, 1)
+
+    def test_failed_fetch_falls_back_without_persisting(self):
+        with StubServer(lambda path, query: (500, {})) as stub:
+            resolver = ImageResolver(access_key="key", base_url=stub.url)
+            self.assertEqual(resolver.resolve(["leek"]), {"leek": DEFAULT_IMAGE_URL})
+
+if __name__ == "__main__":
+    unittest.main()
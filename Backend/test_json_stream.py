@@ -0,0 +1,47 @@
+import json
+import unittest
+import json_stream
+
+DOCUMENT = {
+    "count": 3,
+    "products": [{"product_name": "Carottes râpées"}, 12.5, [1, 2], "kale", {"product_name_en": "Leeks"}],
+    "skip": 0,
+}
+
+def chunked(text, size):
+    data = text.encode("utf-8")
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+class IterArrayTestCase(unittest.TestCase):
+    def test_yields_elements_for_any_chunking(self):
+        text = json.dumps(DOCUMENT, ensure_ascii=False, indent=1)
+        for size in (1, 2, 3, 7, 64, len(text) * 2):
+            self.assertEqual(list(json_stream.iter_array(chunked(text, size), "products")), DOCUMENT["products"])
+
+    def test_empty_array(self):
+        self.assertEqual(list(json_stream.iter_array(['{"products": [ ], "count": 0}'], "products")), [])
+
+    def test_stops_reading_when_consumer_stops(self):
+        text = json.dumps({"products": [{"n": i} for i in range(1000)]})
+        read = []
+
+        def chunks():
+            for chunk in chunked(text, 64):
+                read.append(chunk)
+                yield chunk
+
+        for product in json_stream.iter_array(chunks(), "products"):
+            if product["n"] == 2:
+                break
+        self.assertLess(len(read), 3)
+
+    def test_truncated_or_missing_array_raises(self):
+        with self.assertRaises(ValueError):
+            list(json_stream.iter_array(['{"products": [{"a": 1}, {"a"'], "products"))
+        with self.assertRaises(ValueError):
+            list(json_stream.iter_array(['{"items": []}'], "products"))
+        with self.assertRaises(ValueError):
+            list(json_stream.iter_array(['{"products": [1 2]}'], "products"))
+
+if __name__ == "__main__":
+    unittest.main()
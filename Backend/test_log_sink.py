@@ -0,0 +1,62 @@
+import time
+import unittest
+from unittest.mock import MagicMock
+from log_sink import LogSink
+
+class LogSinkTestCase(unittest.TestCase):
+    def test_add_does_not_write_until_flush(self):
+        db = MagicMock()
+        sink = LogSink(db, batch_size=100, flush_interval=60)
+        for i in range(3):
+            sink.add({"endpoint": "cart/get", "i": i})
+        db.batch.assert_not_called()
+        sink.close()
+        self.assertEqual(db.batch.return_value.set.call_count, 3)
+        self.assertEqual(db.batch.return_value.commit.call_count, 1)
+        self.assertEqual(sink.stats()["written"], 3)
+
+    def test_full_batch_is_flushed_in_background(self):
+        db = MagicMock()
+        sink = LogSink(db, batch_size=5, flush_interval=60)
+        for i in range(10):
+            sink.add({"i": i})
+        deadline = time.time() + 2
+        while sink.written < 10 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(sink.written, 10)
+        self.assertEqual(db.batch.return_value.commit.call_count, 2)
+        sink.close()
+
+    def test_interval_flushes_partial_batch(self):
+        db = MagicMock()
+        sink = LogSink(db, batch_size=100, flush_interval=0.05)
+        sink.add({"endpoint": "auth/login"})
+        deadline = time.time() + 2
+        while sink.written < 1 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(sink.written, 1)
+        sink.close()
+
+    def test_overflow_is_dropped_and_counted(self):
+        sink = LogSink(MagicMock(), max_queue=2, batch_size=100, flush_interval=60)
+        for i in range(5):
+            sink.add({"i": i})
+        self.assertEqual(sink.stats()["dropped"], 3)
+        self.assertEqual(sink.stats()["queued"], 2)
+        sink.close()
+
+    def test_failed_commit_counts_dropped_records(self):
+        db = MagicMock()
+        db.batch.return_value.commit.side_effect = Exception("unavailable")
+        sink = LogSink(db, batch_size=100, flush_interval=60)
+        sink.add({"i": 1})
+        sink.close()
+        self.assertEqual((sink.failures, sink.dropped, sink.written), (1, 1, 0))
+
+    def test_no_database_is_a_no_op(self):
+        sink = LogSink(None)
+        sink.add({"i": 1})
+        self.assertEqual(sink.stats()["enqueued"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+import datetime
+import unittest
+import offer_pricing
+from offer_pricing import DISCOUNTS, PRICE_RANGES, day_seed, offer_day, price
+
+NAMES = [f"{adjective} {vegetable}" for adjective in ("fresh", "organic", "baby", "red")
+         for vegetable in ("carrot", "kale", "onion", "zucchini", "celery", "pepper")]
+
+class OfferPricingTestCase(unittest.TestCase):
+    def test_prices_are_deterministic_per_day_and_region(self):
+        self.assertEqual(price("s", "eu", "2026-10-18", "kale", "leafy"), price("s", "eu", "2026-10-18", "kale", "leafy"))
+        prices = {name: price("s", "eu", "2026-10-18", name, "leafy") for name in NAMES}
+        self.assertNotEqual(prices, {name: price("s", "eu", "2026-10-19", name, "leafy") for name in NAMES})
+        self.assertNotEqual(prices, {name: price("s", "us", "2026-10-18", name, "leafy") for name in NAMES})
+        self.assertNotEqual(day_seed("s", "eu", "2026-10-18"), day_seed("s", "eu", "2026-10-19"))
+
+    def test_sale_is_a_discount_off_an_original_in_range(self):
+        for day in ("2026-10-18", "2026-10-19", "2026-10-20"):
+            for veg_type, (low, high) in PRICE_RANGES.items():
+                for name in NAMES:
+                    original, sale = price("s", "eu", day, name, veg_type)
+                    self.assertTrue(low <= original <= high)
+                    self.assertLess(sale, original)
+                    self.assertTrue(any(abs(sale - round(original * (1 - d), 2)) < 1e-9 for d in DISCOUNTS))
+        self.assertEqual(price("s", "eu", "2026-10-18", "x", "unknown"), price("s", "eu", "2026-10-18", "x", "other"))
+
+    def test_offer_day_is_the_utc_date(self):
+        now = datetime.datetime(2026, 10, 18, 23, 30, tzinfo=datetime.timezone(datetime.timedelta(hours=-5)))
+        self.assertEqual(offer_day(now), "2026-10-19")
+        self.assertEqual(len(offer_pricing.offer_day()), 10)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+from catalog_index import catalog_id
+from product_search import SearchIndex, edit_distance, tokenize
+
+PRODUCTS = [
+    {"id": "baby-carrot", "name": "Baby Carrots"},
+    {"id": "carrot", "name": "Carrots"},
+    {"id": "organic-tomato", "name": "Organic Cherry Tomatoes"},
+    {"id": "tomato", "name": "Tomatoes"},
+    {"id": "courgette", "name": "Green Courgettes"},
+    {"id": "coriander", "name": "Fresh Coriander"},
+    {"id": "broccoli", "name": "Broccoli Florets"},
+    {"id": "organic-kale", "name": "Organic Kale"},
+]
+
+def names(results):
+    return [product["name"] for product in results]
+
+class ProductSearchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.index = SearchIndex(PRODUCTS)
+
+    def test_tokenize_lowercases_and_stems_plurals(self):
+        self.assertEqual(tokenize("Baby CARROTS, glass"), ["baby", "carrot", "glass"])
+
+    def test_all_tokens_must_match_and_shorter_names_rank_first(self):
+        self.assertEqual(names(self.index.search("carrots")), ["Carrots", "Baby Carrots"])
+        self.assertEqual(names(self.index.search("organic tomato")), ["Organic Cherry Tomatoes"])
+        self.assertEqual(self.index.search("organic carrot"), [])
+        self.assertEqual(names(self.index.search("carrot", limit=1)), ["Carrots"])
+
+    def test_variants_are_found_by_their_keyword(self):
+        self.assertEqual(names(self.index.search("zucchini")), ["Green Courgettes"])
+        self.assertEqual(names(self.index.search("cilantro")), ["Fresh Coriander"])
+        self.assertEqual(names(self.index.search("courgette")), ["Green Courgettes"])
+
+    def test_last_token_matches_as_prefix(self):
+        self.assertEqual(names(self.index.search("brocc")), ["Broccoli Florets"])
+        self.assertEqual(names(self.index.search("organic k")), ["Organic Kale"])
+        self.assertEqual(self.index.search("brocc florets"), [])
+
+    def test_typos_within_edit_distance(self):
+        self.assertEqual(edit_distance("brocoli", "broccoli", 2), 1)
+        self.assertEqual(edit_distance("kale", "carrot", 1), 2)
+        self.assertEqual(names(self.index.search("brocoli")), ["Broccoli Florets"])
+        self.assertEqual(names(self.index.search("tomatos organik")), ["Organic Cherry Tomatoes"])
+        self.assertEqual(self.index.search("xyzzy"), [])
+
+    def test_products_sharing_a_normalized_name_are_all_indexed(self):
+        titles = ["Tomatoes", "Cherry Tomatoes", "Tomato Paste", "Pasta Shells", "Passata",
+                  "Green Peppers", "Black Pepper", "Potatoes", "Carrots"]
+        index = SearchIndex([{"id": catalog_id(name), "name": name} for name in titles]
+                            + [{"id": catalog_id("Carrots"), "name": "Carrots"}])
+        self.assertEqual(len(index), len(titles))
+        self.assertEqual(names(index.search("pasta")), ["Pasta Shells"])
+        self.assertEqual(names(index.search("tomato")), ["Passata", "Tomatoes", "Tomato Paste", "Cherry Tomatoes"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import gzip
+import json
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import unittest
+import product_store
+from product_store import OFF, USDA, ProductStore
+
+FOUNDATION = {"FoundationFoods": [
+    {"description": "Baby Carrots", "foodCategory": {"description": "Vegetables and Vegetable Products"}},
+    {"description": "Fresh Spinach", "foodCategory": {"description": "Vegetables and Vegetable Products"}},
+    {"description": "Apples", "foodCategory": {"description": "Fruits and Fruit Juices"}},
+]}
+SEARCH = {"totalHits": 2, "foods": [
+    {"description": "BROCCOLI FLORETS", "foodCategory": "Frozen Vegetables"},
+    {"description": "Baby Carrots", "foodCategory": "Vegetables and Vegetable Products"},
+]}
+OFF_LINES = [
+    {"product_name_en": "Red Onions", "categories_tags": ["en:plant-based-foods", "en:vegetables"]},
+    {"product_name": "Zucchini", "categories_tags": ["en:vegetables"]},
+    {"product_name": "Chocolate Spread", "categories_tags": ["en:spreads"]},
+    {"product_name": "Épinards hachés", "categories_tags": ["en:vegetables"]},
+]
+
+def chunks(document):
+    data = json.dumps(document).encode()
+    return [data[i:i + 50] for i in range(0, len(data), 50)]
+
+class ProductStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = ProductStore(os.path.join(self.directory, "products.db"))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_usda_dumps_and_search_responses_are_classified_once(self):
+        report = self.store.ingest(USDA, product_store.usda_records(chunks(FOUNDATION)))
+        self.assertEqual(report, {"read": 3, "stored": 2, "skipped": 1})
+        report = self.store.ingest(USDA, product_store.usda_records(chunks(SEARCH)))
+        self.assertEqual(report, {"read": 2, "stored": 1, "skipped": 1})
+        products = {p["name"]: p for p in self.store.select(USDA, 10)}
+        self.assertEqual(set(products), {"Baby Carrots", "Fresh Spinach", "BROCCOLI FLORETS"})
+        self.assertEqual(products["Fresh Spinach"]["veg_type"], "leafy")
+        self.assertEqual(products["Fresh Spinach"]["tags"], product_store.SOURCE_TAGS[USDA])
+        self.assertEqual(products["BROCCOLI FLORETS"]["category"], "frozen vegetables")
+
+    def test_off_export_keeps_english_vegetables(self):
+        path = os.path.join(self.directory, "off.jsonl.gz")
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write("\n".join(json.dumps(line) for line in OFF_LINES))
+        report = self.store.ingest(OFF, product_store.off_records(product_store.file_chunks(path), jsonl=True))
+        self.assertEqual(report["stored"], 2)
+        self.assertEqual({p["name"] for p in self.store.select(OFF, 10)}, {"Red Onions", "Zucchini"})
+        self.assertEqual(self.store.counts(), {OFF: 2})
+
+    def test_select_is_diverse_and_spans_types(self):
+        names = [f"{adjective} {vegetable}" for adjective in ("Fresh", "Organic", "Baby", "Frozen")
+                 for vegetable in ("Carrots", "Potatoes", "Kale", "Spinach", "Onions", "Leeks", "Zucchini", "Celery")]
+        self.store.ingest(OFF, ((name, "vegetable") for name in names))
+        selected = self.store.select(OFF, 8, rng=random.Random(1))
+        self.assertEqual(len(selected), 8)
+        keywords = [keyword for product in selected for keyword in product["keywords"]]
+        self.assertEqual(len(keywords), len(set(keywords)))
+        self.assertEqual({p["veg_type"] for p in selected}, {"root", "leafy", "bulb", "squash", "stem"})
+        self.assertEqual(self.store.select(OFF, 8, rng=random.Random(1)), selected)
+
+    def test_products_sharing_a_normalized_name_are_all_stored(self):
+        names = ["Cherry Tomatoes", "Tomato Paste", "Roma Tomatoes", "Passata", "Carrots"]
+        report = self.store.ingest(OFF, ((name, "vegetable") for name in names))
+        self.assertEqual(report, {"read": 5, "stored": 5, "skipped": 0})
+        self.assertEqual(self.store.counts(), {OFF: 5})
+        selected = self.store.select(OFF, 5, rng=random.Random(1))
+        self.assertEqual(len([p for p in selected if p["norm_name"] == "tomato"]), 1)
+        self.assertEqual(len({p["id"] for p in self.store.products()}), 5)
+
+    def test_version_1_database_is_migrated(self):
+        connection = sqlite3.connect(self.store.path)
+        connection.executescript(product_store.SCHEMA.replace("UNIQUE (source, name)", "UNIQUE (source, norm_name)"))
+        connection.execute(
+            f"INSERT INTO products (source, {product_store.COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (OFF, "Cherry Tomatoes", "tomato", "cherry-tomatoes", "fruit_vegetable", "[]", "vegetable", "[]")
+        )
+        connection.commit()
+        connection.close()
+        report = self.store.ingest(OFF, [("Tomato Paste", "vegetable")])
+        self.assertEqual(report["stored"], 1)
+        self.assertEqual(self.store.counts(), {OFF: 2})
+
+    def test_missing_database_is_an_empty_store(self):
+        self.assertEqual(self.store.select(USDA, 20), [])
+        self.assertEqual(self.store.counts(), {})
+
+if __name__ == "__main__":
+    unittest.main()
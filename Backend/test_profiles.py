@@ -0,0 +1,113 @@
+import unittest
+from profiles import ProfileRepository
+
+class FakeSnapshot:
+    def __init__(self, id, data, field_paths=None):
+        self.id = id
+        self.exists = data is not None
+        if data is not None and field_paths is not None:
+            data = {field: data[field] for field in field_paths if field in data}
+        self._data = data
+
+    def to_dict(self):
+        return self._data
+
+class FakeDatabase:
+    """Profile documents keyed by uid, counting the reads made."""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.reads = []
+        self.on_read = None
+
+    def collection(self, name):
+        return self
+
+    def document(self, uid):
+        return FakeReference(self, uid)
+
+    def read(self, uid, field_paths):
+        self.reads.append((uid, field_paths))
+        snapshot = FakeSnapshot(uid, self.documents.get(uid), field_paths)
+        if self.on_read:
+            self.on_read(uid)
+        return snapshot
+
+    def get_all(self, refs, field_paths=None):
+        return [self.read(ref.uid, field_paths) for ref in refs]
+
+class FakeReference:
+    def __init__(self, db, uid):
+        self.db = db
+        self.uid = uid
+
+    def get(self, field_paths=None):
+        return self.db.read(self.uid, field_paths)
+
+PROFILE = {"name": "Ann", "cartItems": {"kale": {"quantity": 1}}, "cartTotals": {"items": 1, "priceCents": 250}}
+
+class ProfileRepositoryTestCase(unittest.TestCase):
+    def test_full_read_serves_later_projections(self):
+        db = FakeDatabase({"u1": dict(PROFILE)})
+        profiles = ProfileRepository(db)
+        self.assertEqual(profiles.get("u1"), PROFILE)
+        self.assertEqual(profiles.get("u1", ["cartItems", "cart"]), {"cartItems": PROFILE["cartItems"]})
+        self.assertEqual(db.reads, [("u1", None)])
+
+    def test_projections_are_merged(self):
+        db = FakeDatabase({"u1": dict(PROFILE)})
+        profiles = ProfileRepository(db)
+        profiles.get("u1", ["cartTotals"])
+        profiles.get("u1", ["cartItems"])
+        self.assertEqual(profiles.get("u1", ["cartItems", "cartTotals"]), {
+            "cartItems": PROFILE["cartItems"], "cartTotals": PROFILE["cartTotals"]
+        })
+        profiles.get("u1")
+        self.assertEqual(db.reads, [("u1", ["cartTotals"]), ("u1", ["cartItems"]), ("u1", None)])
+        self.assertEqual(profiles.stats()["projectionReads"], 2)
+
+    def test_invalidate_forces_a_fresh_read(self):
+        db = FakeDatabase({"u1": dict(PROFILE)})
+        profiles = ProfileRepository(db)
+        profiles.get("u1")
+        db.documents["u1"]["name"] = "Bea"
+        profiles.invalidate("u1")
+        self.assertEqual(profiles.get("u1")["name"], "Bea")
+        self.assertEqual(len(db.reads), 2)
+
+    def test_zero_ttl_reads_every_time(self):
+        db = FakeDatabase({"u1": dict(PROFILE)})
+        profiles = ProfileRepository(db, ttl=0)
+        profiles.get("u1")
+        db.documents["u1"]["name"] = "Bea"
+        self.assertEqual(profiles.get("u1")["name"], "Bea")
+        self.assertEqual(len(db.reads), 2)
+
+    def test_read_in_flight_during_invalidate_is_not_cached(self):
+        db = FakeDatabase({"u1": dict(PROFILE)})
+        profiles = ProfileRepository(db)
+        db.on_read = profiles.invalidate
+        profiles.get("u1")
+        db.on_read = None
+        profiles.get("u1")
+        self.assertEqual(len(db.reads), 2)
+        profiles.get("u1")
+        self.assertEqual(len(db.reads), 2)
+
+    def test_missing_profiles_are_cached(self):
+        db = FakeDatabase({})
+        profiles = ProfileRepository(db)
+        self.assertIsNone(profiles.get("ghost"))
+        self.assertIsNone(profiles.get("ghost", ["cartTotals"]))
+        self.assertEqual(len(db.reads), 1)
+
+    def test_get_many_reads_misses_in_one_get_all(self):
+        db = FakeDatabase({"u1": dict(PROFILE), "u2": {"name": "Bea"}})
+        profiles = ProfileRepository(db)
+        profiles.get("u1")
+        found = profiles.get_many(["u1", "u2", "u3", "u2"], ["name"])
+        self.assertEqual(found, {"u1": {"name": "Ann"}, "u2": {"name": "Bea"}, "u3": None})
+        self.assertEqual(db.reads[1:], [("u2", ["name"]), ("u3", ["name"])])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import threading
+import time
+import unittest
+from singleflight import SingleFlight
+
+class SingleFlightTestCase(unittest.TestCase):
+    def run_concurrently(self, count, target):
+        barrier = threading.Barrier(count)
+
+        def run():
+            barrier.wait()
+            target()
+
+        threads = [threading.Thread(target=run) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_simultaneous_callers_share_one_execution(self):
+        flight = SingleFlight()
+        calls = []
+        results = []
+
+        def upstream():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"items": ["carrot"]}
+
+        self.run_concurrently(20, lambda: results.append(flight.do("grocery-items", upstream)))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 20)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(flight.stats(), {"executions": 1, "coalesced": 19, "inFlight": 0})
+
+    def test_errors_are_shared_and_key_is_released(self):
+        flight = SingleFlight()
+        errors = []
+
+        def failing():
+            time.sleep(0.1)
+            raise ValueError("USDA unavailable")
+
+        def call():
+            try:
+                flight.do("k", failing)
+            except ValueError as e:
+                errors.append(e)
+
+        self.run_concurrently(5, call)
+        self.assertEqual(len(errors), 5)
+        self.assertEqual(flight.do("k", lambda: "recovered"), "recovered")
+
+    def test_different_keys_run_independently(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do("a", lambda: 1), 1)
+        self.assertEqual(flight.do("b", lambda: 2), 2)
+        self.assertEqual(flight.stats()["executions"], 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import time
+import unittest
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+import spoonacular
+from stub_server import StubServer
+
+ROUND_TRIP = 0.2
+
+def recipe_stub(path, query):
+    recipe_id = int(path.split("/")[2])
+    return {"id": recipe_id, "vegan": recipe_id % 2 == 0}
+
+class RecipeInformationTestCase(unittest.TestCase):
+    def test_wall_time_stays_near_one_round_trip(self):
+        pool = ThreadPoolExecutor(max_workers=10)
+        with StubServer(recipe_stub, delay=ROUND_TRIP) as stub:
+            for number in (2, 5, 10):
+                start = time.perf_counter()
+                infos = spoonacular.get_recipe_information_many(list(range(number)), "key", base_url=stub.url, pool=pool)
+                elapsed = time.perf_counter() - start
+                self.assertEqual(sorted(infos), list(range(number)))
+                self.assertLess(elapsed, ROUND_TRIP * 2, f"number={number} took {elapsed:.2f}s")
+        pool.shutdown()
+
+    def test_concurrency_cap_is_respected(self):
+        pool = ThreadPoolExecutor(max_workers=2)
+        with StubServer(recipe_stub, delay=ROUND_TRIP) as stub:
+            start = time.perf_counter()
+            spoonacular.get_recipe_information_many([1, 2, 3, 4], "key", base_url=stub.url, pool=pool)
+            elapsed = time.perf_counter() - start
+        pool.shutdown()
+        self.assertGreaterEqual(elapsed, ROUND_TRIP * 2)
+
+    def test_duplicate_ids_are_fetched_once(self):
+        with StubServer(recipe_stub) as stub:
+            infos = spoonacular.get_recipe_information_many([7, 7, 8], "key", base_url=stub.url)
+            self.assertEqual(len(stub.requests), 2)
+        self.assertTrue(infos[8]["vegan"])
+
+    def test_failed_lookup_is_raised(self):
+        with StubServer(lambda path, query: (404, {})) as stub:
+            with self.assertRaises(Exception):
+                spoonacular.get_recipe_information_many([1], "key", base_url=stub.url)
+
+    def test_cached_recipes_skip_upstream(self):
+        cache = spoonacular.RecipeInfoCache(maxsize=10, ttl=60)
+        with StubServer(recipe_stub) as stub:
+            spoonacular.get_recipe_information_many([1, 2], "key", base_url=stub.url, cache=cache)
+            infos = spoonacular.get_recipe_information_many([2, 3], "key", base_url=stub.url, cache=cache)
+            # Ids 1 and 2 are fetched concurrently, so they may arrive in either order
+            paths = Counter(path for path, query in stub.requests)
+        self.assertEqual(paths, Counter(["/recipes/1/information", "/recipes/2/information", "/recipes/3/information"]))
+        self.assertEqual(paths["/recipes/2/information"], 1)
+        self.assertEqual(sorted(infos), [2, 3])
+        self.assertEqual(set(infos[2]), set(spoonacular.RECIPE_INFO_FIELDS))
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_firestore_entries_fill_memory_cache(self):
+        db = MagicMock()
+        snapshot = MagicMock(exists=True, id="5")
+        snapshot.to_dict.return_value = {"vegan": True, "cachedAt": time.time()}
+        db.get_all.return_value = [snapshot]
+        cache = spoonacular.RecipeInfoCache(maxsize=10, ttl=60, db=db)
+        self.assertTrue(cache.get_many([5, 6])[5]["vegan"])
+        self.assertTrue(cache.get_many([5])[5]["vegan"])
+        self.assertEqual(db.get_all.call_count, 1)
+        cache.set_many({6: {"vegan": False}})
+        db.batch.return_value.commit.assert_called_once()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from unittest.mock import MagicMock
+from token_cache import TokenCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TokenCacheTestCase(unittest.TestCase):
+    def test_token_is_verified_once_until_exp(self):
+        clock = FakeClock()
+        verify = MagicMock(return_value={"uid": "u1", "exp": 1060})
+        cache = TokenCache(verify, clock=clock)
+        self.assertEqual(cache.verify("tok")["uid"], "u1")
+        self.assertEqual(cache.verify("tok")["uid"], "u1")
+        self.assertEqual(verify.call_count, 1)
+        clock.now = 1061
+        cache.verify("tok")
+        self.assertEqual(verify.call_count, 2)
+
+    def test_tokens_without_exp_are_not_cached(self):
+        verify = MagicMock(return_value={"uid": "u1"})
+        cache = TokenCache(verify)
+        cache.verify("tok")
+        cache.verify("tok")
+        self.assertEqual(verify.call_count, 2)
+
+    def test_invalid_tokens_are_not_cached(self):
+        verify = MagicMock(side_effect=ValueError("expired"))
+        cache = TokenCache(verify)
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                cache.verify("bad")
+        self.assertEqual(verify.call_count, 2)
+
+    def test_revocation_is_rechecked_after_interval(self):
+        clock = FakeClock()
+        verify = MagicMock(return_value={"uid": "u1", "exp": 5000})
+        cache = TokenCache(verify, revocation_check_interval=30, clock=clock)
+        cache.verify("tok")
+        clock.now += 10
+        cache.verify("tok")
+        self.assertEqual(verify.call_count, 1)
+        clock.now += 30
+        cache.verify("tok")
+        self.assertEqual(verify.call_count, 2)
+        verify.assert_called_with("tok", check_revoked=True)
+
+    def test_cache_is_bounded(self):
+        verify = MagicMock(side_effect=lambda token, check_revoked: {"uid": token, "exp": 10 ** 12})
+        cache = TokenCache(verify, maxsize=2)
+        for token in ("a", "b", "c"):
+            cache.verify(token)
+        self.assertEqual(cache.stats()["size"], 2)
+
+if __name__ == "__main__":
+    unittest.main()
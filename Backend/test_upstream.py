@@ -0,0 +1,49 @@
+import unittest
+from stub_server import StubServer
+from upstream import UpstreamClient, _parse_host_timeouts
+
+class UpstreamClientTestCase(unittest.TestCase):
+    def test_connections_are_reused_per_host(self):
+        client = UpstreamClient(pool_size=2)
+        with StubServer(lambda path, query: {"path": path}) as stub:
+            for _ in range(5):
+                response = client.get(f"{stub.url}/foods", params={"query": "vegetables"})
+                self.assertEqual(response.json(), {"path": "/foods"})
+            host = stub.url.split("//")[1]
+            stats = client.stats()[host]
+        client.close()
+        self.assertEqual(stats["requests"], 5)
+        self.assertEqual(stats["newConnections"], 1)
+        self.assertEqual(stats["reusedConnections"], 4)
+
+    def test_default_timeout_comes_from_host_config(self):
+        client = UpstreamClient(timeout=3, host_timeouts={})
+        with StubServer(lambda path, query: {}, delay=0.5) as stub:
+            client.host_timeouts[stub.url.split("//")[1]] = 0.1
+            with self.assertRaises(Exception):
+                client.get(stub.url)
+            self.assertEqual(client.stats()[stub.url.split("//")[1]]["errors"], 1)
+        client.close()
+
+    def test_retries_on_unavailable(self):
+        calls = []
+
+        def flaky(path, query):
+            calls.append(path)
+            return (503, {}) if len(calls) < 2 else {"ok": True}
+
+        client = UpstreamClient(retries=2, backoff_factor=0)
+        with StubServer(flaky) as stub:
+            response = client.get(stub.url)
+        client.close()
+        self.assertEqual(response.json(), {"ok": True})
+        self.assertEqual(len(calls), 2)
+
+    def test_parse_host_timeouts(self):
+        timeouts = _parse_host_timeouts("api.unsplash.com=2.5, example.org=1")
+        self.assertEqual(timeouts["api.unsplash.com"], 2.5)
+        self.assertEqual(timeouts["example.org"], 1.0)
+        self.assertEqual(timeouts["world.openfoodfacts.org"], 15)
+
+if __name__ == "__main__":
+    unittest.main()
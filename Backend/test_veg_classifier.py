@@ -0,0 +1,53 @@
+import unittest
+from veg_classifier import PatternMatcher, canonical_ingredients, classify, extract_keywords, get_veg_type, normalize_name
+
+class VegClassifierTestCase(unittest.TestCase):
+    def test_pattern_matcher_finds_overlapping_patterns(self):
+        matcher = PatternMatcher(["pepper", "bell pepper", "green pepper", "leek"])
+        found = {matcher.patterns[i] for i in matcher.find_all("green bell pepper and leeks")}
+        self.assertEqual(found, {"pepper", "bell pepper", "leek"})
+
+    def test_classify_matches_legacy_rules(self):
+        result = classify("Fresh Green Peppers")
+        self.assertEqual(result.norm_name, "pepper")
+        self.assertEqual(result.veg_type, "fruit_vegetable")
+        self.assertEqual(result.keywords, ("pepper",))
+        self.assertTrue(result.is_english)
+
+    def test_first_vegetable_type_wins(self):
+        # "carrot" precedes "onion" in VEGETABLE_TYPES, as in the old linear scan
+        self.assertEqual(get_veg_type("onion and carrot mix"), "root")
+        self.assertEqual(get_veg_type("plain rice"), "other")
+
+    def test_keywords_use_synonyms_in_mapping_order(self):
+        self.assertEqual(extract_keywords("Courgette Aubergine Coriander"), ["cilantro", "zucchini", "eggplant"])
+        self.assertEqual(extract_keywords("Tomatoes"), [])
+
+    def test_non_english_names(self):
+        self.assertFalse(classify("Épinards hachés").is_english)
+        self.assertFalse(classify("Rice 500g").is_english)
+        self.assertFalse(classify("").is_english)
+        self.assertEqual(normalize_name(""), "")
+
+    def test_classify_is_memoized(self):
+        classify.cache_clear()
+        classify("Red Onions")
+        classify("Red Onions")
+        self.assertEqual(classify.cache_info().hits, 1)
+
+    def test_canonical_ingredients(self):
+        self.assertEqual(canonical_ingredients(["Tomatoes", "Carrots"]), ["carrot", "tomato"])
+        self.assertEqual(canonical_ingredients(["carrot", "tomato", "Tomato", ""]), ["carrot", "tomato"])
+        self.assertEqual(canonical_ingredients(["Apple", None]), ["apple"])
+        self.assertEqual(canonical_ingredients(["Pasta", "Chicken Breasts"]), ["chicken breast", "pasta"])
+        self.assertEqual(canonical_ingredients(["apple", "Apples", "Peppermint", "pasta sauce", "Berries"]), ["apple", "berry", "pasta sauce", "peppermint"])
+        self.assertEqual(canonical_ingredients(["Courgettes", "Brussels Sprouts", "Green Pepper"]),
+                         ["brussels sprout", "pepper", "zucchini"])
+        self.assertEqual(
+            canonical_ingredients(["Curry Paste", "Apple Puree", "Almond paste", "Bean sprouts", "Black pepper",
+                                   "Chicken and carrot soup"]),
+            ["almond paste", "apple puree", "bean sprout", "black pepper", "chicken and carrot soup", "curry paste"]
+        )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+"""Cache of verified Firebase ID tokens for the ``firebase_auth`` decorator.
+
+Decoded tokens are keyed by the SHA-256 of the raw token (the token itself is
+never stored) and kept until the token's ``exp`` claim, so repeated requests
+from one page load verify the signature once. With a revocation check
+interval, cached tokens are re-verified with ``check_revoked=True`` at most
+once per interval.
+"""
+import hashlib
+import time
+
+from ttl_cache import TTLCache
+
+
+class TokenCache:
+    """Bounded cache in front of a token verification function.
+
+    Args:
+        verify (callable): ``verify(token, check_revoked=False)`` returning the
+            decoded claims or raising, e.g. ``auth.verify_id_token``.
+        maxsize (int): Maximum number of cached tokens.
+        revocation_check_interval (float): Seconds between revocation checks of
+            a cached token; 0 disables them.
+    """
+
+    def __init__(self, verify, maxsize=10000, revocation_check_interval=0, clock=time.time):
+        self._verify = verify
+        self.revocation_check_interval = revocation_check_interval
+        self._clock = clock
+        self._cache = TTLCache(maxsize=maxsize, ttl=0, clock=clock)
+
+    def verify(self, token):
+        """Return the decoded claims for ``token``, verifying it only when needed."""
+        key = hashlib.sha256(token.encode()).hexdigest()
+        check_revoked = self.revocation_check_interval > 0
+        entry = self._cache.get(key)
+        now = self._clock()
+        if entry is not None:
+            decoded, checked_at = entry
+            if not check_revoked or now - checked_at < self.revocation_check_interval:
+                return decoded
+        decoded = self._verify(token, check_revoked=check_revoked)
+        expires_in = decoded.get("exp", 0) - now if isinstance(decoded, dict) else 0
+        if expires_in > 0:
+            self._cache.set(key, (decoded, now), ttl=expires_in)
+        return decoded
+
+    def stats(self):
+        stats = self._cache.stats()
+        del stats["ttl"]
+        return {**stats, "revocationCheckInterval": self.revocation_check_interval}
@@ -0,0 +1,161 @@
+"""Pooled, keep-alive HTTP client for the upstream APIs.
+
+One ``requests.Session`` is kept per host so USDA, OpenFoodFacts, Spoonacular
+and Unsplash calls reuse TCP+TLS connections instead of paying a handshake on
+every request. Pool size, timeouts and retry policy come from the environment:
+
+    UPSTREAM_POOL_SIZE       connections kept per host (default 10)
+    UPSTREAM_TIMEOUT         default timeout in seconds (default 10)
+    UPSTREAM_TIMEOUTS        per-host overrides, e.g. "api.unsplash.com=5,api.spoonacular.com=8"
+    UPSTREAM_RETRIES         retries on connection errors and 502/503/504 (default 2)
+    UPSTREAM_BACKOFF_FACTOR  urllib3 backoff factor between retries (default 0.3)
+"""
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+USER_AGENT = "SmartCart - Python - Version 1.0"
+
+DEFAULT_HOST_TIMEOUTS = {
+    "api.nal.usda.gov": 10,
+    "world.openfoodfacts.org": 15,
+    "api.spoonacular.com": 10,
+    "api.unsplash.com": 5,
+}
+
+
+def _parse_host_timeouts(value):
+    timeouts = dict(DEFAULT_HOST_TIMEOUTS)
+    for entry in (value or "").split(","):
+        if "=" in entry:
+            host, seconds = entry.split("=", 1)
+            timeouts[host.strip()] = float(seconds)
+    return timeouts
+
+
+class UpstreamClient:
+    """Per-host pooled sessions with timeouts, retries and connection-reuse stats."""
+
+    def __init__(self, pool_size=10, timeout=10, host_timeouts=None, retries=2, backoff_factor=0.3):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.host_timeouts = dict(DEFAULT_HOST_TIMEOUTS if host_timeouts is None else host_timeouts)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self._sessions = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            pool_size=int(os.getenv("UPSTREAM_POOL_SIZE", "10")),
+            timeout=float(os.getenv("UPSTREAM_TIMEOUT", "10")),
+            host_timeouts=_parse_host_timeouts(os.getenv("UPSTREAM_TIMEOUTS")),
+            retries=int(os.getenv("UPSTREAM_RETRIES", "2")),
+            backoff_factor=float(os.getenv("UPSTREAM_BACKOFF_FACTOR", "0.3")),
+        )
+
+    def _session(self, host):
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                retry = Retry(
+                    total=self.retries,
+                    backoff_factor=self.backoff_factor,
+                    status_forcelist=(502, 503, 504),
+                    allowed_methods=frozenset(["GET"]),
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+                session = requests.Session()
+                session.headers["User-Agent"] = USER_AGENT
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+                self._stats[host] = {
+                    "requests": 0,
+                    "errors": 0,
+                    "new_connections": 0,
+                    "fresh_time": 0.0,
+                    "reused_time": 0.0,
+                }
+            return session
+
+    def _connections_opened(self, session, url):
+        pools = session.get_adapter(url).poolmanager.pools
+        opened = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+        return opened
+
+    def get(self, url, **kwargs):
+        """Issue a GET through the pooled session for ``url``'s host.
+
+        Accepts the same keyword arguments as ``requests.get``; ``timeout``
+        defaults to the host's configured timeout.
+        """
+        host = urlsplit(url).netloc
+        session = self._session(host)
+        kwargs.setdefault("timeout", self.host_timeouts.get(host, self.timeout))
+        opened_before = self._connections_opened(session, url)
+        start = time.perf_counter()
+        try:
+            return session.get(url, **kwargs)
+        except requests.RequestException:
+            with self._lock:
+                self._stats[host]["errors"] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            # Under concurrency another request may open the connection we
+            # attribute here, so the fresh/reused split is an estimate.
+            fresh = self._connections_opened(session, url) > opened_before
+            with self._lock:
+                stats = self._stats[host]
+                stats["requests"] += 1
+                if fresh:
+                    stats["new_connections"] += 1
+                    stats["fresh_time"] += elapsed
+                else:
+                    stats["reused_time"] += elapsed
+
+    def stats(self):
+        """Return per-host request counts, connection reuse and estimated handshake savings."""
+        report = {}
+        with self._lock:
+            for host, stats in self._stats.items():
+                reused = stats["requests"] - stats["new_connections"]
+                avg_fresh = stats["fresh_time"] / stats["new_connections"] if stats["new_connections"] else 0.0
+                avg_reused = stats["reused_time"] / reused if reused else 0.0
+                report[host] = {
+                    "requests": stats["requests"],
+                    "errors": stats["errors"],
+                    "newConnections": stats["new_connections"],
+                    "reusedConnections": reused,
+                    "reuseRatio": round(reused / stats["requests"], 3) if stats["requests"] else 0.0,
+                    "avgFreshMs": round(avg_fresh * 1000, 2),
+                    "avgReusedMs": round(avg_reused * 1000, 2),
+                    "estHandshakeSavedMs": round(reused * max(0.0, avg_fresh - avg_reused) * 1000, 2),
+                }
+        return report
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+default_client = UpstreamClient.from_env()
+
+
+def get(url, **kwargs):
+    return default_client.get(url, **kwargs)
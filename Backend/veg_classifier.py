@@ -0,0 +1,252 @@
+"""Vegetable name classification shared by the catalog endpoints.
+
+The lookup tables are built once at import time. Every product name is scanned
+a single time by a multi-pattern (Aho-Corasick) matcher, and results are
+memoized so repeated names across requests are free.
+"""
+from collections import deque, namedtuple
+from functools import lru_cache
+
+VEGETABLE_TYPES = {
+    "tomato": "fruit_vegetable",
+    "carrot": "root",
+    "potato": "root",
+    "beet": "root",
+    "radish": "root",
+    "spinach": "leafy",
+    "lettuce": "leafy",
+    "kale": "leafy",
+    "cabbage": "leafy",
+    "cilantro": "leafy",
+    "broccoli": "cruciferous",
+    "cauliflower": "cruciferous",
+    "brussels sprout": "cruciferous",
+    "zucchini": "squash",
+    "cucumber": "squash",
+    "squash": "squash",
+    "eggplant": "fruit_vegetable",
+    "pepper": "fruit_vegetable",
+    "onion": "bulb",
+    "garlic": "bulb",
+    "leek": "bulb",
+    "asparagus": "stem",
+    "celery": "stem",
+    "artichoke": "other",
+    "mushroom": "other"
+}
+
+KNOWN_ENGLISH_VEGGIES = {
+    "tomato", "carrot", "potato", "beet", "radish", "spinach", "lettuce", "kale", "cabbage",
+    "cilantro", "broccoli", "cauliflower", "brussels sprout", "zucchini", "cucumber", "squash",
+    "eggplant", "pepper", "bell pepper", "green pepper", "onion", "garlic", "leek", "asparagus",
+    "celery", "artichoke", "mushroom"
+}
+
+KEYWORD_MAPPINGS = {
+    "tomato": ["tomato", "tomaten", "passata", "paste", "puree", "tomatoe"],
+    "potato": ["potato", "potatoes"],
+    "brussels sprout": ["brussels", "brussel", "sprout", "sprouts"],
+    "carrot": ["carrot", "carrots", "carrote", "carottes"],
+    "beet": ["beet", "beets", "beetroot"],
+    "spinach": ["spinach", "spinache"],
+    "lettuce": ["lettuce"],
+    "kale": ["kale"],
+    "cabbage": ["cabbage"],
+    "cilantro": ["cilantro", "coriander"],
+    "broccoli": ["broccoli"],
+    "cauliflower": ["cauliflower"],
+    "zucchini": ["zucchini", "courgette", "courgettes"],
+    "cucumber": ["cucumber", "cucumbers"],
+    "squash": ["squash", "squashes"],
+    "eggplant": ["eggplant", "aubergine", "aubergines"],
+    "pepper": ["pepper", "peppers", "bell pepper", "green pepper"],
+    "onion": ["onion", "onions"],
+    "garlic": ["garlic"],
+    "leek": ["leek", "leeks"],
+    "asparagus": ["asparagus"],
+    "celery": ["celery"],
+    "artichoke": ["artichoke", "artichokes"],
+    "mushroom": ["mushroom", "mushrooms"]
+}
+
+NOISE_PHRASE = "cherry red green yellow purple organic fresh baby plum grape roma heirloom paste concentrate chopped puree passata boiled raw"
+
+CLASSIFY_CACHE_SIZE = 8192
+
+Classification = namedtuple("Classification", ["norm_name", "veg_type", "keywords", "is_english"])
+
+
+class PatternMatcher:
+    """Aho-Corasick automaton reporting every pattern found in a string in one pass."""
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(index)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(char, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_all(self, text):
+        """Return the set of pattern indices occurring anywhere in ``text``."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+_PATTERNS = list(VEGETABLE_TYPES) + sorted(KNOWN_ENGLISH_VEGGIES - set(VEGETABLE_TYPES))
+_MATCHER = PatternMatcher(_PATTERNS)
+_TYPE_PATTERN_COUNT = len(VEGETABLE_TYPES)
+_ENGLISH_PATTERNS = frozenset(index for index, pattern in enumerate(_PATTERNS) if pattern in KNOWN_ENGLISH_VEGGIES)
+_VEG_TYPE_BY_INDEX = list(VEGETABLE_TYPES.values())
+
+
+def _light(name):
+    return " ".join(_stem(word) for word in ''.join(
+        c for c in name.lower() if c.isalnum() or c.isspace()
+    ).split())
+
+
+def _stem(word):
+    if len(word) <= 3 or not word.endswith("s") or word.endswith("ss"):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("oes"):
+        return word[:-2]
+    return word[:-1]
+
+
+_KEYWORD_ORDER = {main_key: order for order, main_key in enumerate(KEYWORD_MAPPINGS)}
+_VARIANT_TO_KEYWORDS = {}
+for _main_key, _variants in KEYWORD_MAPPINGS.items():
+    for _variant in _variants:
+        _VARIANT_TO_KEYWORDS.setdefault(_variant, []).append(_main_key)
+
+# Whole stemmed names ("brussel sprout", "courgette") to the keywords they stand for
+_STEMMED_TO_KEYWORDS = {}
+for _main_key, _variants in KEYWORD_MAPPINGS.items():
+    for _variant in [_main_key] + _variants:
+        _keys = _STEMMED_TO_KEYWORDS.setdefault(_light(_variant), [])
+        if _main_key not in _keys:
+            _keys.append(_main_key)
+
+
+def _normalize(name):
+    normalized = name.lower()
+    normalized = ''.join(c for c in normalized if c.isalnum() or c == ' ')
+    normalized = normalized.replace(NOISE_PHRASE, "").strip()
+    normalized = normalized.replace("ies", "y").replace("s ", " ")
+    if "tomato" in normalized or "passata" in normalized or "pasta" in normalized:
+        return "tomato"
+    if "potato" in normalized:
+        return "potato"
+    if "brussels" in normalized:
+        return "brussels sprout"
+    if "cilantro" in normalized:
+        return "cilantro"
+    if "pepper" in normalized:
+        return "pepper"
+    return normalized
+
+
+def _veg_type_from_matches(found):
+    # VEGETABLE_TYPES keys come first in _PATTERNS, so the lowest matching index
+    # is the first key in dict order, exactly like the old linear scan.
+    type_hits = [index for index in found if index < _TYPE_PATTERN_COUNT]
+    return _VEG_TYPE_BY_INDEX[min(type_hits)] if type_hits else "other"
+
+
+def _keywords(name):
+    matched = set()
+    for token in name.lower().split():
+        matched.update(_VARIANT_TO_KEYWORDS.get(token, ()))
+    return tuple(sorted(matched, key=_KEYWORD_ORDER.__getitem__))
+
+
+@lru_cache(maxsize=CLASSIFY_CACHE_SIZE)
+def classify(name):
+    """Classify a product name.
+
+    Args:
+        name (str): Raw product name from USDA, OpenFoodFacts or mock data.
+
+    Returns:
+        Classification: ``norm_name``, ``veg_type``, ``keywords`` (tuple of
+        canonical vegetable keys) and ``is_english``.
+    """
+    if not name:
+        return Classification("", "other", (), False)
+    norm_name = _normalize(name)
+    found = _MATCHER.find_all(norm_name)
+    veg_type = _veg_type_from_matches(found)
+    cleaned_name = name.replace("'", "").replace("  ", " ")
+    is_english = (
+        all(c.isalpha() or c.isspace() or c == '-' for c in cleaned_name)
+        and not found.isdisjoint(_ENGLISH_PATTERNS)
+    )
+    return Classification(norm_name, veg_type, _keywords(name), is_english)
+
+
+def normalize_name(name):
+    return classify(name).norm_name
+
+
+def is_english_name(name):
+    return classify(name).is_english
+
+
+def extract_keywords(name):
+    return list(classify(name).keywords)
+
+
+def get_veg_type(norm_name):
+    return _veg_type_from_matches(_MATCHER.find_all(norm_name or ""))
+
+
+def canonical_ingredients(names):
+    """Canonicalize cart item names into a sorted, de-duplicated ingredient list.
+
+    Names are lowercased and plural-stemmed word by word ("Apples" becomes
+    "apple"). A name that is, as a whole, a known vegetable or one of its
+    variants collapses onto that keyword ("Carrots" and "carrot" both become
+    "carrot", "Courgettes" becomes "zucchini"); anything else, such as
+    "Curry Paste" or "Black pepper", is kept as it is.
+    """
+    canonical = set()
+    for name in names:
+        if not isinstance(name, str):
+            continue
+        light = _light(name)
+        if not light:
+            continue
+        canonical.update(_STEMMED_TO_KEYWORDS.get(light) or (light,))
+    return sorted(canonical)
@@ -1,7 +1,9 @@
 import { useState, useEffect } from "react";
+import { useAuth } from "../context/AuthContext";
 import styles from "./DailyOffers.module.css";
 
 export default function DailyOffers({ showNotification }) {
+  const { catalog } = useAuth();
   const [offers, setOffers] = useState([]);
   const [loading, setLoading] = useState(true);
 
@@ -36,7 +38,10 @@ export default function DailyOffers({ showNotification }) {
   useEffect(() => {
     const fetchOffers = async () => {
       try {
-        const data = await fetchWithRetry("http://localhost:5000/daily-offers");
+        // Signed-in sessions already carry the offers from /session/bootstrap
+        const data = catalog?.dailyOffers?.length
+          ? { offers: catalog.dailyOffers }
+          : await fetchWithRetry("http://localhost:5000/daily-offers");
         // Failsafe deduplication
         const seenNames = new Set();
         const uniqueOffers = data.offers.filter(offer => {
@@ -58,7 +63,7 @@ export default function DailyOffers({ showNotification }) {
       }
     };
     fetchOffers();
-  }, [showNotification]);
+  }, [showNotification, catalog]);
 
   return (
     <div className={styles.container}>
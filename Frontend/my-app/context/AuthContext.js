@@ -26,6 +26,8 @@ export function AuthProvider({ children }) {
   const [user, setUser] = useState(null);
   const [idToken, setIdToken] = useState(null);
   const [cart, setCart] = useState([]);
+  // Catalog snapshots from /session/bootstrap; null until a session is loaded
+  const [catalog, setCatalog] = useState(null);
   const [dietaryPrefs, setDietaryPrefs] = useState({
     vegan: false,
     glutenFree: false,
@@ -58,51 +60,50 @@ export function AuthProvider({ children }) {
     paleo: false,
   };
 
+  // Profile, cart and catalogs in one request, with a single token check
+  const loadSession = async (firebaseUser, token) => {
+    let session = {
+      profile: {
+        name: firebaseUser.email.split("@")[0],
+        avatarUrl: generateAvatar(firebaseUser.uid),
+        dietaryPrefs: defaultDietaryPrefs,
+      },
+      cart: { items: [] },
+      groceryItems: null,
+      dailyOffers: null,
+    };
+    try {
+      const sessionRes = await fetch("http://localhost:5000/session/bootstrap", {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      if (!sessionRes.ok) {
+        console.error(`Session bootstrap failed: ${sessionRes.status} ${sessionRes.statusText}`);
+        throw new Error("Failed to bootstrap session");
+      }
+      session = await sessionRes.json();
+    } catch (fetchErr) {
+      console.warn(`Using fallback session: ${fetchErr.message}`);
+    }
+    const profile = session.profile;
+    setUser({
+      userId: firebaseUser.uid,
+      name: profile.name || firebaseUser.email.split("@")[0],
+      avatarUrl: profile.avatarUrl || generateAvatar(firebaseUser.uid),
+      email: firebaseUser.email,
+      token,
+    });
+    setDietaryPrefs(profile.dietaryPrefs || defaultDietaryPrefs);
+    setCart(session.cart.items || []);
+    setCatalog({ groceryItems: session.groceryItems, dailyOffers: session.dailyOffers });
+  };
+
   useEffect(() => {
     const unsubscribe = onAuthStateChanged(auth, async (firebaseUser) => {
       if (firebaseUser) {
         try {
           const token = await firebaseUser.getIdToken();
           setIdToken(token);
-          let profile = {
-            name: firebaseUser.email.split("@")[0],
-            avatarUrl: generateAvatar(firebaseUser.uid),
-            dietaryPrefs: defaultDietaryPrefs,
-          };
-          try {
-            const profileRes = await fetch(
-              `http://localhost:5000/profile/${firebaseUser.uid}`,
-              {
-                headers: { Authorization: `Bearer ${token}` },
-              }
-            );
-            if (!profileRes.ok) {
-              console.error(`Profile fetch failed: ${profileRes.status} ${profileRes.statusText}`);
-              throw new Error("Failed to fetch profile");
-            }
-            profile = await profileRes.json();
-          } catch (fetchErr) {
-            console.warn(`Using fallback profile: ${fetchErr.message}`);
-          }
-          setUser({
-            userId: firebaseUser.uid,
-            name: profile.name || firebaseUser.email.split("@")[0],
-            avatarUrl: profile.avatarUrl || generateAvatar(firebaseUser.uid),
-            email: firebaseUser.email,
-            token,
-          });
-          setDietaryPrefs(profile.dietaryPrefs || defaultDietaryPrefs);
-          try {
-            const cartRes = await fetch("http://localhost:5000/cart/get", {
-              headers: { Authorization: `Bearer ${token}` },
-            });
-            if (!cartRes.ok) throw new Error("Failed to fetch cart");
-            const cartData = await cartRes.json();
-            setCart(cartData.items || []);
-          } catch (cartErr) {
-            console.warn(`Failed to fetch cart: ${cartErr.message}`);
-            setCart([]);
-          }
+          await loadSession(firebaseUser, token);
         } catch (err) {
           console.error("Auth error:", err);
           setUser(null);
@@ -144,43 +145,7 @@ export function AuthProvider({ children }) {
         console.warn(`Backend login log error: ${err.message}`);
       }
 
-      let profile = {
-        name: firebaseUser.email.split("@")[0],
-        avatarUrl: generateAvatar(firebaseUser.uid),
-        dietaryPrefs: defaultDietaryPrefs,
-      };
-      try {
-        const profileRes = await fetch(
-          `http://localhost:5000/profile/${firebaseUser.uid}`,
-          {
-            headers: { Authorization: `Bearer ${token}` },
-          }
-        );
-        if (profileRes.ok) {
-          profile = await profileRes.json();
-        }
-      } catch (err) {
-        console.warn(`Login profile fetch failed: ${err.message}`);
-      }
-      setUser({
-        userId: firebaseUser.uid,
-        name: profile.name || email.split("@")[0],
-        avatarUrl: profile.avatarUrl || generateAvatar(firebaseUser.uid),
-        email: firebaseUser.email,
-        token,
-      });
-      setDietaryPrefs(profile.dietaryPrefs || defaultDietaryPrefs);
-      try {
-        const cartRes = await fetch("http://localhost:5000/cart/get", {
-          headers: { Authorization: `Bearer ${token}` },
-        });
-        if (cartRes.ok) {
-          const cartData = await cartRes.json();
-          setCart(cartData.items || []);
-        }
-      } catch (err) {
-        console.warn(`Login cart fetch failed: ${err.message}`);
-      }
+      await loadSession(firebaseUser, token);
     } catch (err) {
       console.error("Login error:", err);
       throw err;
@@ -244,17 +209,11 @@ export function AuthProvider({ children }) {
           "Content-Type": "application/json",
           Authorization: `Bearer ${idToken}`,
         },
-        body: JSON.stringify({ item: { ...item, price: Number(item.price) } }),
+        body: JSON.stringify({ item: { ...item, price: Number(item.price) }, return_state: true }),
       });
       if (response.ok) {
         const data = await response.json();
-        const cartRes = await fetch("http://localhost:5000/cart/get", {
-          headers: { Authorization: `Bearer ${idToken}` },
-        });
-        if (cartRes.ok) {
-          const cartData = await cartRes.json();
-          setCart(cartData.items || []);
-        }
+        setCart(data.items || []);
         return true;
       }
       return false;
@@ -273,16 +232,11 @@ export function AuthProvider({ children }) {
           "Content-Type": "application/json",
           Authorization: `Bearer ${idToken}`,
         },
-        body: JSON.stringify({ item_id: itemId }),
+        body: JSON.stringify({ item_id: itemId, return_state: true }),
       });
       if (response.ok) {
-        const cartRes = await fetch("http://localhost:5000/cart/get", {
-          headers: { Authorization: `Bearer ${idToken}` },
-        });
-        if (cartRes.ok) {
-          const cartData = await cartRes.json();
-          setCart(cartData.items || []);
-        }
+        const data = await response.json();
+        setCart(data.items || []);
       }
     } catch (err) {
       console.error(`Remove from cart error: ${err.message}`);
@@ -321,6 +275,7 @@ export function AuthProvider({ children }) {
         signup,
         logout,
         cart,
+        catalog,
         addToCart,
         removeFromCart,
         dietaryPrefs,
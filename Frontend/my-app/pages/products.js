@@ -8,7 +8,7 @@ import styles from "../styles/Products.module.css";
 import { filterProducts } from "../utils/filterLogic";
 
 export default function Products({ showNotification }) {
-  const { user, addToCart, dietaryPrefs } = useAuth();
+  const { user, addToCart, dietaryPrefs, catalog } = useAuth();
   const [products, setProducts] = useState([]);
   const [filters, setFilters] = useState({
     vegan: false,
@@ -62,7 +62,10 @@ export default function Products({ showNotification }) {
   useEffect(() => {
     const fetchProducts = async () => {
       try {
-        const data = await fetchWithRetry("http://localhost:5000/grocery-items");
+        // Signed-in sessions already carry the catalog from /session/bootstrap
+        const data = catalog?.groceryItems?.length
+          ? { items: catalog.groceryItems }
+          : await fetchWithRetry("http://localhost:5000/grocery-items");
         const vegetables = data.items.map((item, index) => {
           const baseTags = item.tags || ["vegan", "gluten-free", "nut-free"];
           
@@ -99,7 +102,7 @@ export default function Products({ showNotification }) {
           }
 
           const product = {
-            id: index + 1,
+            id: item.id || index + 1,
             name: item.name,
             price: item.price,
             tags: [...baseTags, ...additionalTags],
@@ -122,7 +125,7 @@ export default function Products({ showNotification }) {
       }
     };
     fetchProducts();
-  }, [showNotification]);
+  }, [showNotification, catalog]);
 
   const filteredProducts = filterProducts(products, filters);
 